@@ -1,10 +1,27 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from app.config import Config
+from app.utils.scheduler import Scheduler
+from app.utils.cache import Cache
+from app.utils.jobs import JobRunner
+from app.utils.heartbeat import HeartbeatBuffer
+from app.utils.audit import AuditSink
+from app.utils.metrics import MetricsSampler
+from app.utils.request_metrics import RequestMetrics
+from app.utils.query_profiler import QueryProfiler
 
 db = SQLAlchemy()
 migrate = Migrate()
+scheduler = Scheduler()
+cache = Cache()
+job_runner = JobRunner()
+heartbeat_buffer = HeartbeatBuffer()
+audit_sink = AuditSink()
+metrics_sampler = MetricsSampler()
+request_metrics = RequestMetrics()
+query_profiler = QueryProfiler()
 
 
 def create_app():
@@ -14,6 +31,14 @@ def create_app():
     # 初始化扩展
     db.init_app(app)
     migrate.init_app(app, db)
+    scheduler.init_app(app)
+    cache.init_app(app)
+    job_runner.init_app(app)
+    heartbeat_buffer.init_app(app)
+    audit_sink.init_app(app)
+    metrics_sampler.init_app(app)
+    request_metrics.init_app(app)
+    query_profiler.init_app(app)
 
     # 注册蓝图
     from app.routes import api_bp
@@ -22,9 +47,32 @@ def create_app():
     # 注册CLI命令
     register_cli_commands(app)
 
+    # 注册定时任务
+    register_scheduled_jobs(app)
+
     return app
 
 
+def register_scheduled_jobs(app):
+    """注册定时任务，调度线程由启动脚本调用 scheduler.start() 启动"""
+    from app.utils.statistics_aggregator import aggregate_statistics
+    from app.utils.equipment_transitions import complete_equipment_transitions
+
+    scheduler.add_job('aggregate_statistics', aggregate_statistics,
+                      app.config['STATS_AGGREGATION_INTERVAL'])
+    scheduler.add_job('complete_equipment_transitions', complete_equipment_transitions,
+                      app.config['EQUIPMENT_TRANSITION_INTERVAL'])
+    scheduler.add_job('flush_heartbeats', heartbeat_buffer.flush,
+                      app.config['HEARTBEAT_FLUSH_INTERVAL'])
+    scheduler.add_job('recover_interrupted_jobs', job_runner.recover_interrupted,
+                      app.config['JOB_STALE_TIMEOUT'])
+    scheduler.add_job('expire_finished_jobs', job_runner.expire_finished,
+                      app.config['JOB_CLEANUP_INTERVAL'])
+    if app.config['RETENTION_ENABLED']:
+        from app.utils.log_retention import purge_expired_logs
+        scheduler.add_job('purge_expired_logs', purge_expired_logs, app.config['RETENTION_INTERVAL'])
+
+
 def register_cli_commands(app):
     """注册CLI命令"""
 
@@ -155,3 +203,91 @@ def register_cli_commands(app):
             print('✓ 查看者用户创建完成 (viewer/viewer123)')
 
         print('✓ 测试用户创建完成！')
+
+    @app.cli.command('hash-courseware')
+    def hash_courseware():
+        """为缺少内容哈希的历史课件计算 SHA-256"""
+        from app.models.courseware import Courseware
+        from app.utils.blob_store import hash_file
+        import os
+
+        updated = 0
+        for courseware in Courseware.query.filter(Courseware.file_hash.is_(None)).all():
+            if not os.path.exists(courseware.file_path):
+                print(f'✗ 文件不存在: {courseware.file_path}')
+                continue
+            courseware.file_hash = hash_file(courseware.file_path)
+            updated += 1
+        db.session.commit()
+        print(f'✓ 已计算 {updated} 个课件的内容哈希')
+
+    @app.cli.command('generate-thumbnails')
+    def generate_thumbnails():
+        """为缺少缩略图的课件生成缩略图"""
+        from app.models.courseware import Courseware
+        from app.utils.thumbnails import supports_thumbnail, generate_courseware_thumbnail
+
+        rows = db.session.query(Courseware.file_path, Courseware.file_type).filter(
+            Courseware.thumbnail_path.is_(None)
+        ).distinct().all()
+        generated = 0
+        for file_path, file_type in rows:
+            if supports_thumbnail(file_type) and generate_courseware_thumbnail(file_path, file_type):
+                generated += 1
+        print(f'✓ 已生成 {generated} 个缩略图，跳过 {len(rows) - generated} 个文件')
+
+    @app.cli.command('purge-logs')
+    @click.option('--days', type=int, default=None, help='保留天数，默认使用配置 retention.days')
+    @click.option('--table', 'tables', multiple=True, help='只清理指定的日志表，可重复指定')
+    def purge_logs(days, tables):
+        """分块清理过期的操作日志和设备日志"""
+        from app.utils.log_retention import LogRetention, RETENTION_TABLES
+
+        days = app.config['RETENTION_DAYS'] if days is None else days
+        deleted = LogRetention(app.config).run(days, tables or RETENTION_TABLES)
+        for table, count in deleted.items():
+            print(f'✓ {table}: 删除 {count} 条')
+
+    @app.cli.command('index-report')
+    @click.option('--fail-on-warning', is_flag=True, help='存在全表扫描或文件排序时以非零状态退出')
+    def index_report(fail_on_warning):
+        """对热点查询执行 EXPLAIN，标记全表扫描和文件排序"""
+        from app.utils.index_advisor import build_index_report
+
+        report = build_index_report()
+        warning_count = 0
+        for item in report:
+            if item.get('error'):
+                print(f'✗ {item["name"]}: EXPLAIN 失败 - {item["error"]}')
+                warning_count += 1
+            elif item['warnings']:
+                print(f'! {item["name"]}: {"；".join(item["warnings"])}')
+                warning_count += 1
+            else:
+                keys = ', '.join(str(step.get('key') or step.get('detail')) for step in item['plan'])
+                print(f'✓ {item["name"]}: {keys}')
+        print(f'共 {len(report)} 个热点查询，{warning_count} 个需要关注')
+        if fail_on_warning and warning_count:
+            raise SystemExit(1)
+
+    @app.cli.command('backfill-operation-logs')
+    @click.option('--chunk-size', type=int, default=1000, help='每批更新的日志条数')
+    def backfill_operation_logs(chunk_size):
+        """为历史操作日志补全操作类型和操作对象"""
+        from app.models.operation_log import OperationLog
+
+        updated = OperationLog.backfill_structured_fields(chunk_size)
+        print(f'✓ 已补全 {updated} 条操作日志')
+
+    @app.cli.command('aggregate-stats')
+    @click.option('--rebuild', is_flag=True, help='清空水位线并全量重算')
+    def aggregate_stats(rebuild):
+        """增量汇总看板统计数据"""
+        from app.utils.statistics_aggregator import aggregate_statistics, rebuild_statistics
+
+        if rebuild:
+            rebuild_statistics()
+            print('✓ 统计水位线已清空')
+
+        hours = aggregate_statistics()
+        print(f'✓ 看板统计汇总完成，重算 {hours} 个小时')
@@ -1,9 +1,127 @@
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from functools import wraps
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
 import jwt
 import os
+from app import db
 from app.models.result import Result
 from app.models.user import User
+from app.utils.cache import MemoryBackend
+from app.utils.db_events import register_commit_listener
+
+# 认证主体缓存: (用户ID, 会话ID) -> 用户快照和权限集合，按进程独立
+_principal_cache = MemoryBackend(max_entries=4096)
+
+# 影响权限计算的模型，变更后清空全部主体缓存
+_PERMISSION_MODELS = ('Role', 'RolePermission', 'Permission')
+
+
+class AuthError(Exception):
+    """认证失败"""
+
+    def __init__(self, result):
+        super().__init__(result.message)
+        self.result = result
+
+
+def _principal_key(user_id, session_id):
+    # 版本号变化后旧键自然失效，由 LRU/TTL 淘汰
+    global_version = _principal_cache.get_counter('all')
+    user_version = _principal_cache.get_counter(f'user:{user_id}')
+    return f'{global_version}:{user_version}:{user_id}:{session_id}'
+
+
+@register_commit_listener
+def _invalidate_principals(changes):
+    """用户、角色或角色权限变更后使主体缓存失效"""
+    if any(name in changes for name in _PERMISSION_MODELS) or changes.get('User', set()) is None:
+        _principal_cache.incr('all')
+        return
+    for user_id in changes.get('User', ()):
+        _principal_cache.incr(f'user:{user_id}')
+
+
+def _restore_user(columns):
+    """由缓存的列快照还原出绑定到当前会话的用户对象，不产生查询"""
+    existing = db.session.identity_map.get(db.session.identity_key(User, columns['id']))
+    if existing is not None:
+        return existing
+    user = User(**columns)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load_principal(data):
+    """
+    根据Token载荷获取当前用户及其权限集合
+    命中缓存时不查询数据库，未命中时查询用户和权限并写入缓存
+    """
+    timeout = current_app.config.get('AUTH_CACHE_TIMEOUT', 30)
+    key = _principal_key(data['user_id'], data.get('session_id'))
+
+    snapshot = _principal_cache.get(key) if timeout else None
+    if snapshot is not None:
+        return _restore_user(snapshot['user']), snapshot['permissions']
+
+    user = User.query.get(data['user_id'])
+    if not user:
+        return None, frozenset()
+    permissions = frozenset(user.get_permissions())
+
+    if timeout:
+        columns = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+        _principal_cache.set(key, {'user': columns, 'permissions': permissions}, timeout)
+    return user, permissions
+
+
+def _get_request_token():
+    """从请求头获取Token"""
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+
+def _authenticate(check_status=False):
+    """校验请求Token，返回当前用户和权限集合，失败时抛出 AuthError"""
+    token = _get_request_token()
+    # 如果没有Token
+    if not token:
+        raise AuthError(Result.unauthorized(message="缺少Token"))
+
+    try:
+        # 解码Token
+        data = jwt.decode(
+            token,
+            os.getenv('SECRET_KEY', 'dev_key'),
+            algorithms=["HS256"]
+        )
+        # 获取用户
+        current_user, permissions = load_principal(data)
+    except jwt.ExpiredSignatureError:
+        raise AuthError(Result.unauthorized(message="Token已过期"))
+    except Exception:
+        raise AuthError(Result.unauthorized(message="无效的Token"))
+
+    if not current_user:
+        raise AuthError(Result.unauthorized(message="无效的Token"))
+
+    # 检查用户状态
+    if check_status and not current_user.status:
+        raise AuthError(Result.forbidden(message="账户已被禁用"))
+
+    return current_user, permissions
+
+
+def get_request_user():
+    """获取当前请求Token对应的有效用户，未登录、Token无效或账户已禁用时返回 None"""
+    try:
+        current_user, _ = _authenticate(check_status=True)
+    except AuthError:
+        return None
+    return current_user
+
 
 def require_auth(f):
     """
@@ -12,34 +130,11 @@ def require_auth(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        # 获取Token
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        # 如果没有Token
-        if not token:
-            return jsonify(Result.unauthorized(message="缺少Token").to_dict())
-        
         try:
-            # 解码Token
-            data = jwt.decode(
-                token, 
-                os.getenv('SECRET_KEY', 'dev_key'),
-                algorithms=["HS256"]
-            )
-            # 获取用户
-            current_user = User.query.get(data['user_id'])
-            if not current_user:
-                return jsonify(Result.unauthorized(message="无效的Token").to_dict())
-                
-        except jwt.ExpiredSignatureError:
-            return jsonify(Result.unauthorized(message="Token已过期").to_dict())
-        except Exception:
-            return jsonify(Result.unauthorized(message="无效的Token").to_dict())
-            
+            current_user, _ = _authenticate()
+        except AuthError as e:
+            return jsonify(e.result.to_dict())
+
         # 将用户信息传递给被装饰的函数
         return f(current_user, *args, **kwargs)
 
@@ -53,41 +148,14 @@ def require_role(allowed_roles):
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
-            token = None
-            # 获取Token
-            if 'Authorization' in request.headers:
-                auth_header = request.headers['Authorization']
-                if auth_header.startswith('Bearer '):
-                    token = auth_header.split(' ')[1]
-
-            # 如果没有Token
-            if not token:
-                return jsonify(Result.unauthorized(message="缺少Token").to_dict())
-
             try:
-                # 解码Token
-                data = jwt.decode(
-                    token,
-                    os.getenv('SECRET_KEY', 'dev_key'),
-                    algorithms=["HS256"]
-                )
-                # 获取用户
-                current_user = User.query.get(data['user_id'])
-                if not current_user:
-                    return jsonify(Result.unauthorized(message="无效的Token").to_dict())
-
-                # 检查用户状态
-                if not current_user.status:
-                    return jsonify(Result.forbidden(message="账户已被禁用").to_dict())
-
-                # 检查角色权限
-                if current_user.role not in allowed_roles:
-                    return jsonify(Result.forbidden(message="权限不足").to_dict())
-
-            except jwt.ExpiredSignatureError:
-                return jsonify(Result.unauthorized(message="Token已过期").to_dict())
-            except Exception:
-                return jsonify(Result.unauthorized(message="无效的Token").to_dict())
+                current_user, _ = _authenticate(check_status=True)
+            except AuthError as e:
+                return jsonify(e.result.to_dict())
+
+            # 检查角色权限
+            if current_user.role not in allowed_roles:
+                return jsonify(Result.forbidden(message="权限不足").to_dict())
 
             # 将用户信息传递给被装饰的函数
             return f(current_user, *args, **kwargs)
@@ -103,41 +171,14 @@ def require_permission(permission_code):
     def decorator(f):
         @wraps(f)
         def decorated(*args, **kwargs):
-            token = None
-            # 获取Token
-            if 'Authorization' in request.headers:
-                auth_header = request.headers['Authorization']
-                if auth_header.startswith('Bearer '):
-                    token = auth_header.split(' ')[1]
-
-            # 如果没有Token
-            if not token:
-                return jsonify(Result.unauthorized(message="缺少Token").to_dict())
-
             try:
-                # 解码Token
-                data = jwt.decode(
-                    token,
-                    os.getenv('SECRET_KEY', 'dev_key'),
-                    algorithms=["HS256"]
-                )
-                # 获取用户
-                current_user = User.query.get(data['user_id'])
-                if not current_user:
-                    return jsonify(Result.unauthorized(message="无效的Token").to_dict())
-
-                # 检查用户状态
-                if not current_user.status:
-                    return jsonify(Result.forbidden(message="账户已被禁用").to_dict())
-
-                # 检查权限
-                if not current_user.has_permission(permission_code):
-                    return jsonify(Result.forbidden(message=f"缺少权限: {permission_code}").to_dict())
-
-            except jwt.ExpiredSignatureError:
-                return jsonify(Result.unauthorized(message="Token已过期").to_dict())
-            except Exception:
-                return jsonify(Result.unauthorized(message="无效的Token").to_dict())
+                current_user, permissions = _authenticate(check_status=True)
+            except AuthError as e:
+                return jsonify(e.result.to_dict())
+
+            # 检查权限
+            if permission_code not in permissions:
+                return jsonify(Result.forbidden(message=f"缺少权限: {permission_code}").to_dict())
 
             # 将用户信息传递给被装饰的函数
             return f(current_user, *args, **kwargs)
@@ -157,9 +198,9 @@ def verify_token(token):
             algorithms=["HS256"]
         )
         # 获取用户
-        current_user = User.query.get(data['user_id'])
+        current_user, _ = load_principal(data)
         if not current_user or not current_user.status:
             return None
         return current_user
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, Exception):
-        return None
\ No newline at end of file
+        return None
@@ -20,3 +20,86 @@ class Config(object):
 
     # JSON配置
     JSON_AS_ASCII = False
+
+    # 定时任务配置
+    SCHEDULER_ENABLED = get_config_value('scheduler.enabled', True)
+    STATS_AGGREGATION_INTERVAL = get_config_value('scheduler.stats_aggregation_interval', 300)
+    # 每次汇总都重算的最近小时数，覆盖ID低于水位线但较晚提交的记录
+    STATS_RESCAN_HOURS = get_config_value('scheduler.stats_rescan_hours', 2)
+    EQUIPMENT_TRANSITION_INTERVAL = get_config_value('scheduler.equipment_transition_interval', 5)
+
+    # 设备重启时长(秒)，超过该时长仍未收到心跳时由定时任务完成重启
+    EQUIPMENT_RESTART_DURATION = get_config_value('equipment.restart_duration', 30)
+
+    # 设备心跳写缓冲：写入间隔(秒)和单次请求允许的最大心跳条数
+    HEARTBEAT_FLUSH_INTERVAL = get_config_value('equipment.heartbeat_flush_interval', 2)
+    HEARTBEAT_MAX_BATCH = get_config_value('equipment.heartbeat_max_batch', 1000)
+
+    # 缓存配置: memory 为进程内 LRU+TTL，redis 为多进程共享缓存
+    CACHE_TYPE = get_config_value('cache.type', 'memory')
+    CACHE_REDIS_URL = get_config_value('cache.redis_url', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TIMEOUT = get_config_value('cache.default_timeout', 60)
+    CACHE_MAX_ENTRIES = get_config_value('cache.max_entries', 1024)
+
+    # 认证主体缓存有效期(秒)，0 表示不缓存
+    AUTH_CACHE_TIMEOUT = get_config_value('auth.cache_timeout', 30)
+
+    # 后台任务配置
+    JOB_MAX_WORKERS = get_config_value('jobs.max_workers', 2)
+    JOB_FOLDER = get_config_value(
+        'jobs.folder',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads', 'jobs')
+    )
+    # 执行中任务的心跳间隔(秒)，超过 stale_timeout 未更新的未完成任务视为中断
+    JOB_HEARTBEAT_INTERVAL = get_config_value('jobs.heartbeat_interval', 30)
+    JOB_STALE_TIMEOUT = get_config_value('jobs.stale_timeout', 300)
+    # 已结束任务的记录和文件保留天数，按 cleanup_interval(秒)定时清理
+    JOB_RETENTION_DAYS = get_config_value('jobs.retention_days', 7)
+    JOB_CLEANUP_INTERVAL = get_config_value('jobs.cleanup_interval', 3600)
+
+    # 操作日志异步写入：队列容量、批量条数、写入间隔(毫秒)和本地 journal 文件
+    AUDIT_ASYNC = get_config_value('audit.async', False)
+    AUDIT_QUEUE_SIZE = get_config_value('audit.queue_size', 10000)
+    AUDIT_BATCH_SIZE = get_config_value('audit.batch_size', 200)
+    AUDIT_FLUSH_INTERVAL = get_config_value('audit.flush_interval', 500)
+    AUDIT_JOURNAL = get_config_value(
+        'audit.journal',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'audit_journal.jsonl')
+    )
+
+    # 日志保留清理：保留天数、执行间隔(秒)、每块删除条数、块间暂停(秒)、是否归档及归档目录
+    RETENTION_ENABLED = get_config_value('retention.enabled', False)
+    RETENTION_DAYS = get_config_value('retention.days', 90)
+    RETENTION_INTERVAL = get_config_value('retention.interval', 86400)
+    RETENTION_CHUNK_SIZE = get_config_value('retention.chunk_size', 1000)
+    RETENTION_PAUSE = get_config_value('retention.pause', 0.2)
+    RETENTION_ARCHIVE = get_config_value('retention.archive', True)
+    RETENTION_FOLDER = get_config_value(
+        'retention.folder',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'archive')
+    )
+
+    # 系统指标采样：采样间隔(秒)和环形缓冲区保留的采样点数
+    METRICS_ENABLED = get_config_value('metrics.enabled', True)
+    METRICS_INTERVAL = get_config_value('metrics.interval', 5)
+    METRICS_CAPACITY = get_config_value('metrics.capacity', 2880)
+
+    # 接口请求指标：超过阈值(毫秒)的请求写入慢请求日志，内存中保留最近的慢请求条数
+    REQUEST_METRICS_ENABLED = get_config_value('monitoring.enabled', True)
+    SLOW_REQUEST_THRESHOLD = get_config_value('monitoring.slow_request_threshold', 1000)
+    SLOW_REQUEST_LOG_SIZE = get_config_value('monitoring.slow_request_log_size', 100)
+
+    # SQL 分析：全部请求开启、允许管理员用 X-Query-Profile 请求头开启、抽样比例，以及同一语句重复多少次记为疑似 N+1
+    PROFILER_ENABLED = get_config_value('profiler.enabled', False)
+    PROFILER_ALLOW_HEADER = get_config_value('profiler.header', False)
+    PROFILER_SAMPLE_RATE = get_config_value('profiler.sample_rate', 0.0)
+    PROFILER_N_PLUS_ONE_THRESHOLD = get_config_value('profiler.n_plus_one_threshold', 5)
+
+    # 课件文件发送方式: direct 由 Python 发送，x-accel 交给 nginx 发送，x-sendfile 交给 Apache/lighttpd 发送
+    FILE_DELIVERY_MODE = get_config_value('files.delivery', 'direct')
+    # x-accel 模式下 nginx 内部 location 前缀及其对应的文件根目录
+    FILE_ACCEL_PREFIX = get_config_value('files.accel_prefix', '/protected-files')
+    FILE_DELIVERY_ROOT = get_config_value(
+        'files.root',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+    )
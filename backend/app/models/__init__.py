@@ -14,6 +14,7 @@ from app.models.operation_log import OperationLog
 from app.models.system_settings import SystemSettings
 from app.models.knowledge_base import KnowledgeBase
 from app.models.prompt_template import PromptTemplate
+from app.models.job import Job
 
 __all__ = [
     'User',
@@ -31,5 +32,6 @@ __all__ = [
     'OperationLog',
     'SystemSettings',
     'KnowledgeBase',
-    'PromptTemplate'
+    'PromptTemplate',
+    'Job'
 ]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class Courseware(db.Model):
@@ -8,10 +9,11 @@ class Courseware(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='课件ID')
     title = db.Column(db.String(255), nullable=False, comment='课件标题')
     category_id = db.Column(db.Integer, db.ForeignKey('courseware_categories.id', ondelete='SET NULL'), comment='分类ID')
-    file_path = db.Column(db.String(500), nullable=False, comment='文件存储路径')
+    file_path = db.Column(db.String(500), nullable=False, index=True, comment='文件存储路径')
     file_name = db.Column(db.String(255), nullable=False, comment='原始文件名')
     file_type = db.Column(db.String(50), nullable=False, comment='文件类型')
     file_size = db.Column(db.BigInteger, nullable=False, comment='文件大小(字节)')
+    file_hash = db.Column(db.String(64), index=True, comment='文件内容SHA-256')
     mime_type = db.Column(db.String(100), comment='MIME类型')
     description = db.Column(db.Text, comment='课件描述')
     tags = db.Column(db.String(500), comment='标签，逗号分隔')
@@ -34,13 +36,13 @@ class Courseware(db.Model):
     def save(self):
         """保存课件"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除课件"""
         db.session.delete(self)
-        db.session.commit()
-        
+        commit()
+    
     def to_dict(self):
         """将课件对象转换为字典"""
         return {
@@ -50,6 +52,7 @@ class Courseware(db.Model):
             'category_name': self.category.name if self.category else None,
             'file_path': self.file_path,
             'file_name': self.file_name,
+            'file_hash': self.file_hash,
             'file_type': self.file_type,
             'file_size': self.file_size,
             'file_size_mb': self.get_file_size_mb(),
@@ -60,6 +63,7 @@ class Courseware(db.Model):
             'grade_level': self.grade_level,
             'duration': self.duration,
             'thumbnail_path': self.thumbnail_path,
+            'thumbnail_url': self.get_thumbnail_url(),
             'download_count': self.download_count,
             'view_count': self.view_count,
             'is_public': self.is_public,
@@ -69,7 +73,7 @@ class Courseware(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
-        
+    
     def __repr__(self):
         return f'<Courseware {self.title}>'
     
@@ -83,6 +87,30 @@ class Courseware(db.Model):
         """根据标题获取课件"""
         return cls.query.filter_by(title=title).first()
     
+    def get_thumbnail_url(self):
+        """获取缩略图地址，未生成缩略图时返回 None"""
+        if not self.thumbnail_path:
+            return None
+        return f"/api/courseware/{self.id}/thumbnail"
+    
+    @classmethod
+    def count_file_references(cls, file_path):
+        """统计引用同一存储文件的课件数量"""
+        return cls.query.filter_by(file_path=file_path).count()
+    
+    @classmethod
+    def count_committed_file_references(cls, file_path):
+        """使用独立连接统计已提交的引用数，可在事务提交回调中调用"""
+        with db.engine.connect() as conn:
+            return conn.execute(
+                db.select(db.func.count(cls.id)).where(cls.file_path == file_path)
+            ).scalar()
+    
+    @classmethod
+    def get_uploaded_by_hash(cls, user_id, file_hash, file_type):
+        """获取用户自己上传过的相同内容课件，用于秒传"""
+        return cls.query.filter_by(uploaded_by=user_id, file_hash=file_hash, file_type=file_type).first()
+    
     @classmethod
     def get_by_uploader(cls, user_id):
         """根据上传者获取课件"""
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class CoursewareCategory(db.Model):
@@ -21,15 +22,19 @@ class CoursewareCategory(db.Model):
     def save(self):
         """保存分类"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除分类"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
-    def to_dict(self):
-        """将分类对象转换为字典"""
+    def to_dict(self, courseware_count=None, children_count=None):
+        """
+        将分类对象转换为字典
+        :param courseware_count: 预先批量统计的课件数量，未提供时单独查询
+        :param children_count: 预先批量统计的子分类数量，未提供时单独查询
+        """
         return {
             'id': self.id,
             'name': self.name,
@@ -38,8 +43,8 @@ class CoursewareCategory(db.Model):
             'parent_name': self.parent.name if self.parent else None,
             'sort_order': self.sort_order,
             'is_active': self.is_active,
-            'children_count': self.children.count(),
-            'courseware_count': len(self.courseware_items),
+            'children_count': self.children.count() if children_count is None else children_count,
+            'courseware_count': len(self.courseware_items) if courseware_count is None else courseware_count,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -1,9 +1,15 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime, timedelta
 
 class CoursewareUsage(db.Model):
     """课件使用记录模型"""
     __tablename__ = 'courseware_usage'
+    __table_args__ = (
+        db.Index('idx_courseware_usage_created_at', 'created_at'),
+        db.Index('idx_courseware_usage_courseware_created', 'courseware_id', 'created_at'),
+        db.Index('idx_courseware_usage_action_created', 'action', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='使用记录ID')
     courseware_id = db.Column(db.Integer, db.ForeignKey('courseware.id', ondelete='CASCADE'), nullable=False, comment='课件ID')
@@ -22,12 +28,12 @@ class CoursewareUsage(db.Model):
     def save(self):
         """保存使用记录"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除使用记录"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将使用记录对象转换为字典"""
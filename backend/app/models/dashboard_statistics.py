@@ -1,6 +1,8 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime, date, timedelta
 import json
+from app.utils.time_series import align_to_bucket, bucket_label, fill_buckets
 
 class DashboardStatistics(db.Model):
     """系统看板统计数据模型"""
@@ -36,12 +38,12 @@ class DashboardStatistics(db.Model):
     def save(self):
         """保存统计数据"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除统计数据"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将统计数据对象转换为字典"""
@@ -135,8 +137,8 @@ class DashboardStatistics(db.Model):
     
     @classmethod
     def get_by_date(cls, statistic_date):
-        """根据日期获取统计数据"""
-        return cls.query.filter_by(statistic_date=statistic_date).first()
+        """根据日期获取天统计数据"""
+        return cls.query.filter_by(statistic_date=statistic_date, statistic_hour=None).first()
     
     @classmethod
     def get_today_stats(cls):
@@ -146,12 +148,44 @@ class DashboardStatistics(db.Model):
     
     @classmethod
     def get_date_range_stats(cls, start_date, end_date):
-        """获取日期范围内的统计数据"""
+        """获取日期范围内的天统计数据"""
         return cls.query.filter(
             cls.statistic_date >= start_date,
-            cls.statistic_date <= end_date
+            cls.statistic_date <= end_date,
+            cls.statistic_hour.is_(None)
         ).order_by(cls.statistic_date.desc()).all()
     
+    @classmethod
+    def get_series(cls, metric, start, end, granularity='day'):
+        """
+        从汇总行读取 [start, end) 内的指标序列，空桶补0
+        :param metric: 计数字段名或 additional_metrics 中的指标名
+        :param granularity: hour 读取小时行，day/week 读取天行
+        """
+        query = cls.query.filter(
+            cls.statistic_date >= start.date(),
+            cls.statistic_date < (end + timedelta(days=1)).date()
+        )
+        if granularity == 'hour':
+            query = query.filter(cls.statistic_hour.isnot(None))
+        else:
+            query = query.filter(cls.statistic_hour.is_(None))
+        
+        counts = {}
+        for row in query.all():
+            point = datetime.combine(row.statistic_date, datetime.min.time())
+            if granularity == 'hour':
+                point = point.replace(hour=row.statistic_hour)
+            if point < start or point >= end:
+                continue
+            if hasattr(cls, metric):
+                value = getattr(row, metric) or 0
+            else:
+                value = row.get_additional_metrics().get(metric, 0)
+            label = bucket_label(align_to_bucket(point, granularity), granularity)
+            counts[label] = counts.get(label, 0) + value
+        return fill_buckets(counts, start, end, granularity)
+    
     @classmethod
     def get_recent_stats(cls, days=7):
         """获取最近几天的统计数据"""
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class EducationSettings(db.Model):
@@ -24,12 +25,12 @@ class EducationSettings(db.Model):
     def save(self):
         """保存教育设置"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除教育设置"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将教育设置对象转换为字典"""
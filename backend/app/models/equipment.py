@@ -1,9 +1,14 @@
 from app import db
-from datetime import datetime
+from app.utils.unit_of_work import commit
+from datetime import datetime, timedelta
 
 class Equipment(db.Model):
     """设备模型"""
     __tablename__ = 'equipment'
+    __table_args__ = (
+        db.Index('idx_equipment_status_updated', 'status', 'updated_at'),
+        db.Index('idx_equipment_updated_at', 'updated_at'),
+    )
     
     id = db.Column(db.String(50), primary_key=True, comment='设备唯一标识，如G1-EDU-001')
     location = db.Column(db.String(255), nullable=False, comment='设备所在位置')
@@ -13,10 +18,14 @@ class Equipment(db.Model):
     usage_rate = db.Column(db.String(10), comment='使用率')
     is_offline = db.Column(db.Boolean, default=False, comment='离线状态: 1-离线, 0-在线')
     has_error = db.Column(db.Boolean, default=False, comment='错误状态: 1-有错误, 0-正常')
+    transition_started_at = db.Column(db.DateTime, comment='进入重启类过渡状态的时间')
     # maintenance_mode = db.Column(db.Boolean, default=False, comment='维护模式: 1-维护中, 0-正常')  # TODO: Add via migration
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='创建时间')
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
     
+    # 重启类过渡状态，由设备心跳或定时完成任务推进到 online
+    TRANSITION_STATUSES = ('restarting', 'rebooting')
+    
     # 关系定义
     equipment_logs = db.relationship('EquipmentLog', backref='equipment', lazy=True, cascade='all, delete-orphan')
     education_settings = db.relationship('EducationSettings', backref='equipment', lazy=True, cascade='all, delete-orphan')
@@ -26,13 +35,13 @@ class Equipment(db.Model):
     def save(self):
         """保存设备"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除设备"""
         db.session.delete(self)
-        db.session.commit()
-        
+        commit()
+    
     def to_dict(self):
         """将设备对象转换为字典"""
         return {
@@ -50,7 +59,7 @@ class Equipment(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
-        
+    
     def __repr__(self):
         return f'<Equipment {self.id}>'
     
@@ -59,6 +68,11 @@ class Equipment(db.Model):
         """根据ID获取设备"""
         return cls.query.get(equipment_id)
     
+    @classmethod
+    def get_all(cls):
+        """获取所有设备"""
+        return cls.query.all()
+    
     @classmethod
     def get_online_equipment(cls):
         """获取所有在线设备"""
@@ -98,7 +112,9 @@ class Equipment(db.Model):
         self.save()
     
     def update_last_active(self):
-        """更新最后活跃时间"""
+        """更新最后活跃时间，处于重启类过渡状态时视为重启完成"""
+        if self.complete_transition():
+            return
         self.last_active = datetime.utcnow()
         self.save()
     
@@ -138,7 +154,9 @@ class Equipment(db.Model):
             'teaching': '教学中',
             'touring': '导览中',
             'standby': '待机中',
-            'maintenance': '维护中'
+            'maintenance': '维护中',
+            'restarting': '重启中',
+            'rebooting': '重新启动中'
         }
         return status_map.get(self.status, '未知')
     
@@ -212,20 +230,68 @@ class Equipment(db.Model):
         self.updated_at = datetime.utcnow()
         self.save()
     
-    def restart(self):
-        """重启设备"""
-        self.status = 'offline'
+    def begin_transition(self, status, changed_by=None, reason=None):
+        """
+        进入重启类过渡状态并记录状态历史
+        只记录状态转换后立即返回，完成由设备心跳或定时任务推进
+        """
+        from app.models.equipment_status_history import EquipmentStatusHistory
+        
+        previous_status = self.status
+        self.status = status
+        self.is_offline = True
+        self.transition_started_at = datetime.utcnow()
         self.updated_at = datetime.utcnow()
+        db.session.add(EquipmentStatusHistory(
+            equipment_id=self.id,
+            previous_status=previous_status,
+            current_status=status,
+            change_reason=reason,
+            changed_by=changed_by
+        ))
         self.save()
-        # 模拟重启过程
-        import time
-        time.sleep(1)
+    
+    def complete_transition(self, reason=None):
+        """
+        完成重启类过渡状态，设备恢复在线
+        :return: 设备不处于过渡状态时返回 False
+        """
+        from app.models.equipment_status_history import EquipmentStatusHistory
+        
+        if not self.is_in_transition():
+            return False
+        previous_status = self.status
         self.is_offline = False
         self.has_error = False
         self.status = 'online'
+        self.transition_started_at = None
         self.last_active = datetime.utcnow()
         self.updated_at = datetime.utcnow()
+        db.session.add(EquipmentStatusHistory(
+            equipment_id=self.id,
+            previous_status=previous_status,
+            current_status='online',
+            change_reason=reason or '重启完成'
+        ))
         self.save()
+        return True
+    
+    def is_in_transition(self):
+        """是否处于重启类过渡状态"""
+        return self.status in self.TRANSITION_STATUSES
+    
+    @classmethod
+    def get_expired_transitions(cls, duration):
+        """获取进入过渡状态超过指定秒数的设备，按进入过渡状态的时间判断，过渡期间编辑设备不会推迟完成"""
+        deadline = datetime.utcnow() - timedelta(seconds=duration)
+        return cls.query.filter(
+            cls.status.in_(cls.TRANSITION_STATUSES),
+            cls.transition_started_at <= deadline
+        ).all()
+    
+    def restart(self, changed_by=None):
+        """重启设备，进入 restarting 状态后立即返回"""
+        self.begin_transition('restarting', changed_by, '设备重启')
     
     def shutdown(self):
         """关闭设备"""
@@ -234,9 +300,9 @@ class Equipment(db.Model):
         self.updated_at = datetime.utcnow()
         self.save()
     
-    def reboot(self):
-        """重新启动设备"""
-        self.restart()
+    def reboot(self, changed_by=None):
+        """重新启动设备，进入 rebooting 状态后立即返回"""
+        self.begin_transition('rebooting', changed_by, '设备重新启动')
     
     def diagnose(self):
         """设备诊断"""
@@ -1,9 +1,15 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class EquipmentLog(db.Model):
     """设备诊断/日志模型"""
     __tablename__ = 'equipment_logs'
+    __table_args__ = (
+        db.Index('idx_equipment_logs_created_at', 'created_at'),
+        db.Index('idx_equipment_logs_equipment_created', 'equipment_id', 'created_at'),
+        db.Index('idx_equipment_logs_type_created', 'log_type', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     equipment_id = db.Column(db.String(50), db.ForeignKey('equipment.id', ondelete='CASCADE'), nullable=False)
@@ -14,12 +20,12 @@ class EquipmentLog(db.Model):
     def save(self):
         """保存日志"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除日志"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将日志对象转换为字典"""
@@ -1,9 +1,14 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class EquipmentStatusHistory(db.Model):
     """设备状态历史模型"""
     __tablename__ = 'equipment_status_history'
+    __table_args__ = (
+        db.Index('idx_equipment_status_history_created_at', 'created_at'),
+        db.Index('idx_equipment_status_history_equipment_created', 'equipment_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='历史记录ID')
     equipment_id = db.Column(db.String(50), db.ForeignKey('equipment.id', ondelete='CASCADE'), nullable=False, comment='设备ID')
@@ -20,12 +25,12 @@ class EquipmentStatusHistory(db.Model):
     def save(self):
         """保存状态历史"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除状态历史"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将状态历史对象转换为字典"""
@@ -0,0 +1,122 @@
+from app import db
+from app.utils.unit_of_work import commit
+from datetime import datetime
+import json
+import uuid
+
+class Job(db.Model):
+    """后台任务模型"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()), comment='任务ID')
+    job_type = db.Column(db.String(100), nullable=False, comment='任务类型')
+    status = db.Column(db.Enum('pending', 'running', 'succeeded', 'failed', 'cancelled'), nullable=False,
+                       default='pending', comment='任务状态')
+    params = db.Column(db.Text, comment='任务参数(JSON)')
+    total = db.Column(db.Integer, default=0, comment='总项数')
+    processed = db.Column(db.Integer, default=0, comment='已处理项数')
+    success_count = db.Column(db.Integer, default=0, comment='成功项数')
+    failed_count = db.Column(db.Integer, default=0, comment='失败项数')
+    results = db.Column(db.Text(4294967295), comment='逐项结果(JSON)')
+    summary = db.Column(db.Text, comment='任务结果摘要(JSON)')
+    result_file = db.Column(db.String(500), comment='结果文件路径')
+    error_message = db.Column(db.Text, comment='错误信息')
+    cancel_requested = db.Column(db.Boolean, default=False, comment='是否请求取消')
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), comment='创建用户ID')
+    started_at = db.Column(db.DateTime, comment='开始时间')
+    finished_at = db.Column(db.DateTime, comment='结束时间')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='创建时间')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+    
+    __table_args__ = (
+        db.Index('idx_jobs_created_by', 'created_by', 'created_at'),
+        db.Index('idx_jobs_status', 'status'),
+    )
+    
+    # 关系定义
+    creator = db.relationship('User', backref='jobs', lazy=True)
+    
+    # 已结束的任务状态
+    FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+    
+    def save(self):
+        """保存任务"""
+        db.session.add(self)
+        commit()
+    
+    def delete(self):
+        """删除任务"""
+        db.session.delete(self)
+        commit()
+    
+    def to_dict(self, include_results=False):
+        """将任务对象转换为字典"""
+        data = {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'params': self.get_params(),
+            'total': self.total,
+            'processed': self.processed,
+            'success_count': self.success_count,
+            'failed_count': self.failed_count,
+            'progress': self.get_progress(),
+            'summary': self.get_summary(),
+            'has_result_file': bool(self.result_file),
+            'error_message': self.error_message,
+            'cancel_requested': self.cancel_requested,
+            'created_by': self.created_by,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_results:
+            data['results'] = self.get_results()
+        return data
+    
+    def __repr__(self):
+        return f'<Job {self.id}: {self.job_type} {self.status}>'
+    
+    def get_params(self):
+        """获取任务参数"""
+        try:
+            return json.loads(self.params) if self.params else {}
+        except json.JSONDecodeError:
+            return {}
+    
+    def get_results(self):
+        """获取逐项结果"""
+        try:
+            return json.loads(self.results) if self.results else []
+        except json.JSONDecodeError:
+            return []
+    
+    def get_summary(self):
+        """获取结果摘要"""
+        try:
+            return json.loads(self.summary) if self.summary else {}
+        except json.JSONDecodeError:
+            return {}
+    
+    def get_progress(self):
+        """获取进度百分比"""
+        if self.status == 'succeeded':
+            return 100
+        if not self.total:
+            return 0
+        return round(min(self.processed / self.total, 1) * 100, 2)
+    
+    def is_finished(self):
+        """任务是否已结束"""
+        return self.status in self.FINISHED_STATUSES
+    
+    @classmethod
+    def get_by_id(cls, job_id):
+        """根据ID获取任务"""
+        return cls.query.get(job_id)
+    
+    @classmethod
+    def get_by_user(cls, user_id, limit=50):
+        """获取用户最近的任务"""
+        return cls.query.filter_by(created_by=user_id).order_by(cls.created_at.desc()).limit(limit).all()
@@ -1,9 +1,22 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects.mysql import match
+
+# 全文索引名称，索引由迁移创建（仅 MySQL），使用 ngram 分词器以支持中文
+FULLTEXT_INDEX_NAME = 'ft_knowledge_base_search'
+
+# 各数据库是否支持全文检索，值为 ngram 分词长度，None 表示不支持
+_fulltext_support = {}
 
 class KnowledgeBase(db.Model):
     """知识库模型"""
     __tablename__ = 'knowledge_base'
+    __table_args__ = (
+        db.Index(FULLTEXT_INDEX_NAME, 'title', 'content', 'description', 'tags',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='知识库ID')
     title = db.Column(db.String(255), nullable=False, comment='标题')
@@ -31,12 +44,12 @@ class KnowledgeBase(db.Model):
     def save(self):
         """保存知识库"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除知识库"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将知识库对象转换为字典"""
@@ -87,19 +100,71 @@ class KnowledgeBase(db.Model):
         return cls.query.filter_by(category=category, status='published').order_by(cls.created_at.desc()).all()
     
     @classmethod
-    def search_by_keyword(cls, keyword):
-        """根据关键词搜索知识库"""
-        return cls.query.filter(
-            db.and_(
-                cls.status == 'published',
-                db.or_(
-                    cls.title.contains(keyword),
-                    cls.content.contains(keyword),
-                    cls.description.contains(keyword),
-                    cls.tags.contains(keyword)
-                )
-            )
-        ).order_by(cls.created_at.desc()).all()
+    def get_fulltext_token_size(cls):
+        """
+        获取全文索引的 ngram 分词长度
+        仅 MySQL 且已创建全文索引时可用，结果按数据库缓存
+        :return: 分词长度，不支持全文检索时返回 None
+        """
+        engine = db.engine
+        key = str(engine.url)
+        if key not in _fulltext_support:
+            token_size = None
+            try:
+                if engine.dialect.name == 'mysql':
+                    indexes = inspect(engine).get_indexes(cls.__tablename__)
+                    if any(index['name'] == FULLTEXT_INDEX_NAME for index in indexes):
+                        with engine.connect() as conn:
+                            token_size = int(conn.execute(text('SELECT @@ngram_token_size')).scalar() or 2)
+            except Exception:
+                token_size = None
+            _fulltext_support[key] = token_size
+        return _fulltext_support[key]
+    
+    @classmethod
+    def _keyword_terms(cls, keyword):
+        """按空白拆分搜索词，去掉双引号"""
+        return [term for term in keyword.replace('"', ' ').split() if term]
+    
+    @classmethod
+    def _fulltext_terms(cls, keyword, token_size):
+        """
+        拆分搜索词，任一词短于分词长度时无法通过全文索引匹配，返回 None
+        """
+        terms = cls._keyword_terms(keyword)
+        if not terms or any(len(term) < token_size for term in terms):
+            return None
+        return terms
+    
+    @classmethod
+    def filter_by_keyword(cls, query, keyword):
+        """
+        按关键词过滤并排序
+        关键词按空白拆分，每个词都须出现在标题、内容、描述或标签中的任一字段（不要求在同一字段）。
+        支持全文检索时用 BOOLEAN MODE 的 +"词" 条件过滤，按相关度排序；
+        否则对每个词使用 LIKE 匹配，按创建时间倒序，两种方式的匹配规则一致
+        :return: (query, 是否使用全文检索)
+        """
+        columns = (cls.title, cls.content, cls.description, cls.tags)
+        token_size = cls.get_fulltext_token_size()
+        terms = cls._fulltext_terms(keyword, token_size) if token_size else None
+        if terms:
+            condition = match(*columns, against=' '.join(f'+"{term}"' for term in terms)).in_boolean_mode()
+            relevance = match(*columns, against=' '.join(terms)).in_natural_language_mode()
+            return query.filter(condition).order_by(relevance.desc(), cls.created_at.desc()), True
+        
+        terms = cls._keyword_terms(keyword) or [keyword]
+        return query.filter(
+            db.and_(*[db.or_(*[column.contains(term) for column in columns]) for term in terms])
+        ).order_by(cls.created_at.desc()), False
+    
+    @classmethod
+    def search_by_keyword(cls, keyword, limit=None):
+        """根据关键词搜索已发布的知识库，按相关度排序"""
+        query, _ = cls.filter_by_keyword(cls.query.filter(cls.status == 'published'), keyword)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
     
     @classmethod
     def get_all_ordered(cls):
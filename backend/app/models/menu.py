@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class Menu(db.Model):
@@ -31,12 +32,12 @@ class Menu(db.Model):
     def save(self):
         """保存菜单"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除菜单"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self, include_children=False):
         """将菜单对象转换为字典"""
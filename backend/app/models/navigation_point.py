@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class NavigationPoint(db.Model):
@@ -17,12 +18,12 @@ class NavigationPoint(db.Model):
     def save(self):
         """保存点位"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除点位"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将点位对象转换为字典"""
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class NavigationSettings(db.Model):
@@ -28,12 +29,12 @@ class NavigationSettings(db.Model):
     def save(self):
         """保存导览设置"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除导览设置"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将导览设置对象转换为字典"""
@@ -1,16 +1,83 @@
 from app import db
+from app.utils.unit_of_work import commit, after_commit
 from datetime import datetime, timedelta
+from sqlalchemy import update
 import json
+import re
+
+# 按操作描述推断操作类型的关键词，按顺序匹配
+ACTION_TYPE_KEYWORDS = (
+    ('登录', 'login'),
+    ('登出', 'logout'),
+    ('批量', 'batch'),
+    ('导入', 'import'),
+    ('导出', 'export'),
+    ('删除', 'delete'),
+    ('清理', 'delete'),
+    ('注册', 'create'),
+    ('创建', 'create'),
+    ('上传', 'create'),
+    ('添加', 'create'),
+    ('复制', 'create'),
+    ('更新', 'update'),
+    ('修改', 'update'),
+    ('编辑', 'update'),
+    ('移动', 'update'),
+    ('重置', 'update'),
+    ('分配', 'update'),
+    ('下线', 'update'),
+    ('终止', 'update'),
+    ('重启', 'system'),
+    ('优化', 'system'),
+    ('备份', 'system'),
+)
+
+# 从操作详情中解析操作对象，如 "设备ID: G1-EDU-001"
+ENTITY_PATTERNS = (
+    ('equipment', re.compile(r'设备ID[:：]\s*([^\s,，]+)')),
+    ('courseware', re.compile(r'课件ID[:：]\s*([^\s,，]+)')),
+    ('user', re.compile(r'用户ID[:：]\s*([^\s,，]+)')),
+)
+
+
+def infer_action_type(action):
+    """根据操作描述推断操作类型，无法推断时返回 other"""
+    for keyword, action_type in ACTION_TYPE_KEYWORDS:
+        if keyword in (action or ''):
+            return action_type
+    return 'other'
+
+
+def parse_entity(details):
+    """
+    从操作详情中解析操作对象
+    :return: (对象类型, 对象ID)，无法解析时返回 (None, None)
+    """
+    for entity_type, pattern in ENTITY_PATTERNS:
+        found = pattern.search(details or '')
+        if found:
+            return entity_type, found.group(1)
+    return None, None
+
 
 class OperationLog(db.Model):
     """操作日志模型"""
     __tablename__ = 'operation_logs'
+    __table_args__ = (
+        db.Index('idx_operation_logs_created_at', 'created_at'),
+        db.Index('idx_operation_logs_user_created', 'user_id', 'created_at'),
+        db.Index('idx_operation_logs_type_created', 'action_type', 'created_at'),
+        db.Index('idx_operation_logs_entity', 'entity_type', 'entity_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True, comment='日志ID')
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), comment='用户ID')
     action = db.Column(db.String(255), nullable=False, comment='操作描述')
     details = db.Column(db.Text, comment='操作详情')
     ip_address = db.Column(db.String(50), comment='IP地址')
+    action_type = db.Column(db.String(50), comment='操作类型，如 login/create/update/delete/export')
+    entity_type = db.Column(db.String(50), comment='操作对象类型，如 equipment/courseware/user')
+    entity_id = db.Column(db.String(100), comment='操作对象ID')
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='创建时间')
     
     # 关系定义
@@ -19,13 +86,13 @@ class OperationLog(db.Model):
     def save(self):
         """保存操作日志"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除操作日志"""
         db.session.delete(self)
-        db.session.commit()
-        
+        commit()
+    
     def to_dict(self):
         """将操作日志对象转换为字典"""
         return {
@@ -34,11 +101,14 @@ class OperationLog(db.Model):
             'username': self.user.username if self.user else None,
             'real_name': self.user.real_name if self.user else None,
             'action': self.action,
+            'action_type': self.action_type,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
             'details': self.details,
             'ip_address': self.ip_address,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
-        
+    
     def __repr__(self):
         return f'<OperationLog {self.action} by {self.user.username if self.user else "Unknown"}>'
     
@@ -81,14 +151,47 @@ class OperationLog(db.Model):
         ).order_by(cls.created_at.desc()).all()
     
     @classmethod
-    def create_log(cls, user_id, action, details=None, ip_address=None):
-        """创建操作日志"""
+    def create_log(cls, user_id, action, details=None, ip_address=None, action_type=None,
+                   entity_type=None, entity_id=None, target_type=None, target_id=None, sync=False):
+        """
+        创建操作日志
+        未指定操作类型时按操作描述推断，未指定操作对象时从操作详情中解析；target_type/target_id 为 entity_type/entity_id 的别名。
+        操作日志写入线程运行时，日志在当前变更提交后进入异步写入队列，此时返回 None；
+        写入线程未运行或 sync=True 时在当前会话中同步保存并返回日志对象，需要日志ID的调用方应传 sync=True
+        :return: 已保存的 OperationLog，异步写入时为 None
+        """
+        entity_type = entity_type or target_type
+        entity_id = entity_id if entity_id is not None else target_id
+        if entity_type is None:
+            entity_type, entity_id = parse_entity(details)
+        
         log = cls(
             user_id=user_id,
             action=action,
             details=details,
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type=action_type or infer_action_type(action),
+            entity_type=entity_type,
+            entity_id=str(entity_id) if entity_id is not None else None,
+            created_at=datetime.utcnow()
         )
+        
+        from app import audit_sink
+        if audit_sink.running and not sync:
+            row = {
+                'user_id': log.user_id,
+                'action': log.action,
+                'details': log.details,
+                'ip_address': log.ip_address,
+                'action_type': log.action_type,
+                'entity_type': log.entity_type,
+                'entity_id': log.entity_id,
+                'created_at': log.created_at
+            }
+            # 请求回滚时不记录；队列已满时用独立连接同步写入
+            after_commit(lambda: audit_sink.enqueue(row) or audit_sink.write_now(row))
+            return None
+        
         log.save()
         return log
     
@@ -98,7 +201,10 @@ class OperationLog(db.Model):
         return cls.create_log(
             user_id=user_id,
             action='用户登录',
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type='login',
+            entity_type='user',
+            entity_id=user_id
         )
     
     @classmethod
@@ -107,37 +213,90 @@ class OperationLog(db.Model):
         return cls.create_log(
             user_id=user_id,
             action='用户登出',
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type='logout',
+            entity_type='user',
+            entity_id=user_id
         )
     
     @classmethod
-    def log_operation(cls, user_id, action, details=None, ip_address=None):
+    def log_operation(cls, user_id, action, details=None, ip_address=None, action_type=None,
+                      entity_type=None, entity_id=None):
         """记录操作日志"""
         return cls.create_log(
             user_id=user_id,
             action=action,
             details=details,
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type=action_type,
+            entity_type=entity_type,
+            entity_id=entity_id
         )
     
     @classmethod
-    def log_equipment_operation(cls, user_id, equipment_id, operation, ip_address=None):
+    def log_equipment_operation(cls, user_id, equipment_id, operation, ip_address=None, action_type=None):
         """记录设备操作日志"""
         details = f"设备ID: {equipment_id}"
         return cls.create_log(
             user_id=user_id,
             action=operation,
             details=details,
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type=action_type,
+            entity_type='equipment',
+            entity_id=equipment_id
         )
     
     @classmethod
-    def log_courseware_operation(cls, user_id, courseware_id, operation, ip_address=None):
+    def log_courseware_operation(cls, user_id, courseware_id, operation, ip_address=None, action_type=None):
         """记录课件操作日志"""
         details = f"课件ID: {courseware_id}"
         return cls.create_log(
             user_id=user_id,
             action=operation,
             details=details,
-            ip_address=ip_address
+            ip_address=ip_address,
+            action_type=action_type,
+            entity_type='courseware',
+            entity_id=courseware_id
         )
+    
+    @classmethod
+    def get_by_entity(cls, entity_type, entity_id, limit=100):
+        """获取指定对象的操作记录"""
+        return cls.query.filter_by(entity_type=entity_type, entity_id=str(entity_id)).order_by(
+            cls.created_at.desc(), cls.id.desc()
+        ).limit(limit).all()
+    
+    @classmethod
+    def backfill_structured_fields(cls, chunk_size=1000):
+        """
+        为历史日志补全操作类型和操作对象
+        按主键分块读取 action_type 为空的日志，从操作描述和详情中解析后批量更新，每块独立提交
+        :return: 更新的日志条数
+        """
+        updated = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(cls.id, cls.action, cls.details).filter(
+                cls.id > last_id,
+                cls.action_type.is_(None)
+            ).order_by(cls.id).limit(chunk_size).all()
+            if not rows:
+                break
+            
+            values = []
+            for log_id, action, details in rows:
+                entity_type, entity_id = parse_entity(details)
+                values.append({
+                    'id': log_id,
+                    'action_type': infer_action_type(action),
+                    'entity_type': entity_type,
+                    'entity_id': entity_id
+                })
+            db.session.execute(update(cls), values)
+            db.session.commit()
+            
+            updated += len(rows)
+            last_id = rows[-1].id
+        return updated
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class Permission(db.Model):
@@ -27,15 +28,18 @@ class Permission(db.Model):
     def save(self):
         """保存权限"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除权限"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
-    def to_dict(self):
-        """将权限对象转换为字典"""
+    def to_dict(self, role_count=None):
+        """
+        将权限对象转换为字典
+        :param role_count: 预先批量统计的角色数量，未提供时单独查询
+        """
         return {
             'id': self.id,
             'name': self.name,
@@ -52,7 +56,7 @@ class Permission(db.Model):
             'creator_name': self.creator.real_name if self.creator else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'role_count': len(self.role_permissions)
+            'role_count': len(self.role_permissions) if role_count is None else role_count
         }
         
     def __repr__(self):
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class PromptTemplate(db.Model):
@@ -35,12 +36,12 @@ class PromptTemplate(db.Model):
     def save(self):
         """保存模板"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除模板"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将模板对象转换为字典"""
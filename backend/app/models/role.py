@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 
 class Role(db.Model):
@@ -24,15 +25,19 @@ class Role(db.Model):
     def save(self):
         """保存角色"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除角色"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
-    def to_dict(self):
-        """将角色对象转换为字典"""
+    def to_dict(self, permission_count=None, user_count=None):
+        """
+        将角色对象转换为字典
+        :param permission_count: 预先批量统计的权限数量，未提供时单独查询
+        :param user_count: 预先批量统计的用户数量，未提供时单独查询
+        """
         return {
             'id': self.id,
             'name': self.name,
@@ -45,8 +50,8 @@ class Role(db.Model):
             'creator_name': self.creator.real_name if self.creator else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'permission_count': len(self.role_permissions),
-            'user_count': len(self.users)
+            'permission_count': len(self.role_permissions) if permission_count is None else permission_count,
+            'user_count': len(self.users) if user_count is None else user_count
         }
         
     def __repr__(self):
@@ -133,12 +138,12 @@ class RolePermission(db.Model):
     def save(self):
         """保存角色权限关联"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除角色权限关联"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def to_dict(self):
         """将对象转换为字典"""
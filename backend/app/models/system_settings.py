@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 import json
 
@@ -24,13 +25,13 @@ class SystemSettings(db.Model):
     def save(self):
         """保存设置"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除设置"""
         if not self.is_system:
             db.session.delete(self)
-            db.session.commit()
+            commit()
             return True
         return False
         
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -23,7 +24,7 @@ class User(db.Model):
     # 完成save
     def save(self):
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     # 完成delete
     def delete(self):
@@ -34,7 +35,7 @@ class User(db.Model):
         
         # 删除用户
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def set_password(self, password):
         """设置密码"""
@@ -174,31 +175,14 @@ class User(db.Model):
     
     def get_permissions(self):
         """获取用户权限列表"""
-        # 如果用户有具体的角色ID，使用RBAC权限
-        if self.role_id:
-            from app.models.role import Role
-            from app.models.permission import Permission
-            from app.models.role import RolePermission
-            
-            role = Role.get_by_id(self.role_id)
-            if role:
-                permissions = db.session.query(Permission).join(
-                    RolePermission, Permission.id == RolePermission.permission_id
-                ).filter(RolePermission.role_id == role.id, Permission.status == True).all()
-                return [p.code for p in permissions]
-        
-        # 兼容旧的角色系统
-        if self.role == 'admin':
-            return ['read', 'write', 'delete', 'manage']
-        elif self.role == 'operator':
-            return ['read', 'write']
-        else:
-            return ['read']
+        # 有具体角色ID时使用RBAC权限，否则兼容旧的角色系统
+        from app.utils.rbac import get_rbac_snapshot
+        return get_rbac_snapshot().permissions_for(self.role_id, self.role)
     
     def has_permission(self, permission_code):
         """检查用户是否有指定权限"""
-        user_permissions = self.get_permissions()
-        return permission_code in user_permissions
+        from app.utils.rbac import get_rbac_snapshot
+        return get_rbac_snapshot().has_permission(self.role_id, self.role, permission_code)
     
     def get_menus(self):
         """获取用户可访问的菜单"""
@@ -1,11 +1,19 @@
 from app import db
+from app.utils.unit_of_work import commit
 from datetime import datetime, timedelta
+from sqlalchemy import func, and_
 import json
 import uuid
 
 class UserSession(db.Model):
     """用户会话模型"""
     __tablename__ = 'user_sessions'
+    __table_args__ = (
+        db.Index('idx_user_sessions_user_active', 'user_id', 'is_active'),
+        db.Index('idx_user_sessions_active_expires', 'is_active', 'expires_at'),
+        db.Index('idx_user_sessions_expires_at', 'expires_at'),
+        db.Index('idx_user_sessions_login_time', 'login_time'),
+    )
     
     id = db.Column(db.String(128), primary_key=True, comment='会话ID')
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, comment='用户ID')
@@ -31,12 +39,12 @@ class UserSession(db.Model):
     def save(self):
         """保存会话"""
         db.session.add(self)
-        db.session.commit()
+        commit()
     
     def delete(self):
         """删除会话"""
         db.session.delete(self)
-        db.session.commit()
+        commit()
         
     def update_activity(self):
         """更新最后活动时间"""
@@ -116,6 +124,48 @@ class UserSession(db.Model):
             query = query.filter_by(is_active=True)
         return query.order_by(cls.last_activity.desc()).all()
     
+    @classmethod
+    def online_criteria(cls):
+        """在线判定条件：会话活跃且未过期"""
+        return and_(cls.is_active == True, cls.expires_at > datetime.utcnow())
+    
+    @classmethod
+    def count_online_users(cls):
+        """统计在线用户数（单次聚合查询）"""
+        return db.session.query(
+            func.count(func.distinct(cls.user_id))
+        ).filter(cls.online_criteria()).scalar() or 0
+    
+    @classmethod
+    def get_online_users(cls):
+        """
+        获取在线用户及其最新会话（单次查询）
+        :return: [(user, session), ...]，按最后活动时间倒序
+        """
+        from app.models.user import User
+        
+        online = cls.online_criteria()
+        latest = db.session.query(
+            cls.user_id.label('user_id'),
+            func.max(cls.last_activity).label('last_activity')
+        ).filter(online).group_by(cls.user_id).subquery()
+        
+        rows = db.session.query(User, cls).join(
+            cls, cls.user_id == User.id
+        ).join(
+            latest, and_(latest.c.user_id == cls.user_id, latest.c.last_activity == cls.last_activity)
+        ).filter(online).order_by(cls.last_activity.desc()).all()
+        
+        # 同一用户可能存在最后活动时间相同的多个会话，只保留一个
+        result = []
+        seen = set()
+        for user, session in rows:
+            if user.id in seen:
+                continue
+            seen.add(user.id)
+            result.append((user, session))
+        return result
+    
     @classmethod
     def cleanup_expired_sessions(cls):
         """清理过期会话"""
@@ -1,8 +1,13 @@
 from flask import Blueprint
+from app import request_metrics, query_profiler
 
 # 创建API蓝图
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# 记录全部接口的请求延迟、错误数和慢请求，按配置分析请求执行的 SQL
+request_metrics.instrument(api_bp)
+query_profiler.instrument(api_bp)
+
 # 导入所有API路由
 from .auth_routes import auth_bp
 from .user_routes import user_bp
@@ -18,6 +23,7 @@ from .permission_routes import permission_bp
 from .menu_routes import menu_bp
 from .knowledge_routes import knowledge_bp
 from .prompt_routes import prompt_bp
+from .job_routes import job_bp
 
 # 注册所有蓝图
 api_bp.register_blueprint(auth_bp, url_prefix='/auth')
@@ -34,5 +40,6 @@ api_bp.register_blueprint(permission_bp, url_prefix='/permissions')
 api_bp.register_blueprint(menu_bp, url_prefix='/menus')
 api_bp.register_blueprint(knowledge_bp, url_prefix='/knowledge')
 api_bp.register_blueprint(prompt_bp, url_prefix='/prompt')
+api_bp.register_blueprint(job_bp, url_prefix='/jobs')
 
 __all__ = ['api_bp']
\ No newline at end of file
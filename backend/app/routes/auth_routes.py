@@ -4,12 +4,15 @@ from app.models import User, OperationLog, UserSession
 from app.models.result import Result
 from app.auth import require_auth, require_role
 from app import db
+from app.utils.unit_of_work import enable_unit_of_work
 import jwt
 import datetime
 import os
 
 # 创建认证蓝图
 auth_bp = Blueprint('auth', __name__)
+# 请求内的写操作在请求结束时统一提交
+enable_unit_of_work(auth_bp)
 
 
 @auth_bp.route('/login', methods=['POST'])
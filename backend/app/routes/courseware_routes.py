@@ -1,23 +1,35 @@
-from flask import request, jsonify, Blueprint, send_file
+from flask import request, jsonify, Blueprint
 from app.models import Courseware, OperationLog, CoursewareCategory, CoursewareUsage
 from app.models.result import Result
 from app.auth import require_auth, require_role
-from app import db
+from app import db, job_runner
+from app.utils.unit_of_work import enable_unit_of_work, savepoint, rollback_savepoint, after_commit, after_rollback
+from app.utils.loaders import count_loader
+from app.utils.blob_store import BlobStore
+from app.utils.thumbnails import thumbnail_path_for, supports_thumbnail, generate_courseware_thumbnail
+from app.utils.file_delivery import (
+    get_file_validators, is_not_modified, not_modified_response, is_initial_request, send_file_conditional
+)
 from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 import os
 import datetime
-import uuid
 import mimetypes
 
 # 创建课件蓝图
 courseware_bp = Blueprint('courseware', __name__)
+# 请求内的写操作在请求结束时统一提交
+enable_unit_of_work(courseware_bp)
 
 # 文件上传配置
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads', 'courseware')
 ALLOWED_EXTENSIONS = ['.pdf', '.ppt', '.pptx', '.doc', '.docx', '.mp4', '.mp3', '.jpg', '.png', '.jpeg', '.gif', '.zip', '.rar']
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 
+# 内容寻址文件存储，相同内容的课件共用一个文件
+blob_store = BlobStore(os.path.join(UPLOAD_FOLDER, 'blobs'))
+
 def allowed_file(filename):
     """检查文件是否允许上传"""
     return '.' in filename and \
@@ -30,30 +42,71 @@ def get_file_size(file):
     file.seek(0)
     return size
 
+def _delete_courseware(courseware):
+    """删除课件记录，存储文件的最后一个引用删除后随事务提交删除文件"""
+    file_path = courseware.file_path
+    courseware.delete()
+    blob_store.release(file_path, Courseware.count_file_references(file_path),
+                       Courseware.count_committed_file_references)
+
+def _is_sha256(value):
+    """是否为十六进制 SHA-256 字符串"""
+    return len(value) == 64 and all(c in '0123456789abcdef' for c in value)
+
+@courseware_bp.route('/upload/check', methods=['GET'])
+@require_role(['admin', 'operator'])
+def check_courseware_upload(current_user):
+    """检查当前用户是否上传过相同内容的文件，上传过时可直接用 file_hash 秒传"""
+    try:
+        file_hash = request.args.get('file_hash', '').lower()
+        file_name = request.args.get('file_name', '')
+        if not _is_sha256(file_hash):
+            return jsonify(Result.error(message="文件哈希格式错误", code=400).to_dict())
+        
+        # 只回答当前用户自己上传过的内容，不暴露其他用户的文件是否存在
+        file_ext = os.path.splitext(file_name)[1].lower()
+        uploaded = Courseware.get_uploaded_by_hash(current_user.id, file_hash, file_ext[1:])
+        return jsonify(Result.success(
+            message="检查完成",
+            data={"file_hash": file_hash, "exists": uploaded is not None and os.path.exists(uploaded.file_path)}
+        ).to_dict())
+        
+    except Exception as e:
+        return jsonify(Result.error(message=f"检查文件失败: {str(e)}").to_dict())
+
 @courseware_bp.route('/upload', methods=['POST'])
 @require_role(['admin', 'operator'])
 def upload_courseware(current_user):
-    """上传课件文件"""
+    """
+    上传课件文件
+    文件边写入边计算 SHA-256，内容相同的文件只保存一份；
+    不带文件而提供 file_hash 和 file_name 时，当前用户上传过相同内容则秒传
+    """
     try:
+        file = request.files.get('file')
+        file_hash = request.form.get('file_hash', '').lower()
+        
         # 检查请求中是否包含文件
-        if 'file' not in request.files:
+        if file is None and not file_hash:
             return jsonify(Result.error(message="请选择要上传的文件", code=400).to_dict())
         
-        file = request.files['file']
+        original_name = file.filename if file is not None else request.form.get('file_name', '')
         
         # 检查文件是否为空
-        if file.filename == '':
+        if original_name == '':
             return jsonify(Result.error(message="请选择要上传的文件", code=400).to_dict())
         
         # 检查文件类型
-        if not allowed_file(file.filename):
+        if not allowed_file(original_name):
             return jsonify(Result.error(message="不支持的文件类型", code=400).to_dict())
         
         # 检查文件大小
-        file_size = get_file_size(file)
-        if file_size > MAX_FILE_SIZE:
+        if file is not None and get_file_size(file) > MAX_FILE_SIZE:
             return jsonify(Result.error(message="文件大小超出限制（最大100MB）", code=400).to_dict())
         
+        if file is None and not _is_sha256(file_hash):
+            return jsonify(Result.error(message="文件哈希格式错误", code=400).to_dict())
+        
         # 获取其他表单数据
         title = request.form.get('title')
         description = request.form.get('description', '')
@@ -62,7 +115,7 @@ def upload_courseware(current_user):
         
         # 如果没有提供标题，使用文件名
         if not title:
-            title = os.path.splitext(file.filename)[0]
+            title = os.path.splitext(original_name)[0]
         
         # 检查标题是否已存在
         if Courseware.get_by_title(title):
@@ -75,21 +128,32 @@ def upload_courseware(current_user):
                 return jsonify(Result.error(message="课件分类不存在", code=400).to_dict())
         
         # 生成安全的文件名
-        filename = secure_filename(file.filename)
-        file_ext = os.path.splitext(filename)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}{file_ext}"
-        
-        # 确保上传目录存在
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-        
-        # 构建完整的文件路径
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        
-        # 保存文件
-        file.save(file_path)
+        filename = secure_filename(original_name)
+        file_ext = os.path.splitext(original_name)[1].lower()
+        
+        if file is not None:
+            # 保存文件，内容已存在时复用已有文件
+            blob = blob_store.save(file.stream, file_ext)
+            # 请求失败或提交失败回滚时清理本次新建的文件
+            after_rollback(lambda: blob_store.discard(blob))
+            file_hash, file_path, file_size = blob.digest, blob.path, blob.size
+            instant = not blob.created
+        else:
+            # 秒传：只允许引用当前用户自己上传过的内容，客户端仅凭哈希无法获取他人的文件
+            uploaded = Courseware.get_uploaded_by_hash(current_user.id, file_hash, file_ext[1:])
+            if uploaded is None or not blob_store.claim(uploaded.file_path):
+                return jsonify(Result.error(message="文件内容不存在，请上传文件", code=404).to_dict())
+            file_path = uploaded.file_path
+            file_size = uploaded.file_size
+            instant = True
         
         # 获取文件MIME类型
-        mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        mime_type = mimetypes.guess_type(original_name)[0] or 'application/octet-stream'
+        
+        # 相同内容已有缩略图时直接复用
+        thumbnail_path = thumbnail_path_for(file_path)
+        if not os.path.exists(thumbnail_path):
+            thumbnail_path = None
         
         # 创建课件记录
         courseware = Courseware(
@@ -98,6 +162,8 @@ def upload_courseware(current_user):
             file_name=filename,
             file_type=file_ext[1:],  # 去掉点号
             file_size=file_size,
+            file_hash=file_hash,
+            thumbnail_path=thumbnail_path,
             mime_type=mime_type,
             description=description,
             category_id=int(category_id) if category_id else None,
@@ -107,6 +173,10 @@ def upload_courseware(current_user):
         )
         courseware.save()
         
+        # 提交后在后台线程池中生成缩略图
+        if thumbnail_path is None and supports_thumbnail(courseware.file_type):
+            after_commit(lambda: job_runner.dispatch(generate_courseware_thumbnail, file_path, courseware.file_type))
+        
         # 记录操作日志
         client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         OperationLog.log_courseware_operation(
@@ -116,16 +186,14 @@ def upload_courseware(current_user):
             ip_address=client_ip
         )
         
+        data = courseware.to_dict()
+        data['instant'] = instant
         return jsonify(Result.success(
-            message="课件上传成功",
-            data=courseware.to_dict()
+            message="课件秒传成功" if instant else "课件上传成功",
+            data=data
         ).to_dict())
         
     except Exception as e:
-        # 如果保存文件失败，清理已上传的文件
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
         return jsonify(Result.error(message=f"课件上传失败: {str(e)}").to_dict())
 
 @courseware_bp.route('', methods=['GET'])
@@ -161,23 +229,34 @@ def get_courseware_list(current_user):
                 Courseware.description.contains(keyword)
             ))
         
-        # 分页
-        pagination = query.order_by(Courseware.created_at.desc()).paginate(
+        # 分页，分类、父分类和上传者随课件一起加载
+        pagination = query.options(
+            joinedload(Courseware.category).joinedload(CoursewareCategory.parent),
+            joinedload(Courseware.uploader)
+        ).order_by(Courseware.created_at.desc()).paginate(
             page=page, 
             per_page=per_page, 
             error_out=False
         )
         
+        # 批量统计本页课件的使用次数和分类计数，每项统计一次分组查询
+        category_ids = [cw.category_id for cw in pagination.items]
+        usage_counts = count_loader(CoursewareUsage.courseware_id).load_many([cw.id for cw in pagination.items])
+        category_courseware_counts = count_loader(Courseware.category_id).load_many(category_ids)
+        category_children_counts = count_loader(CoursewareCategory.parent_id).load_many(category_ids)
+        
         # 获取详细信息
         courseware_data = []
         for cw in pagination.items:
             cw_dict = cw.to_dict()
             # 获取分类信息
             if cw.category:
-                cw_dict['category'] = cw.category.to_dict()
+                cw_dict['category'] = cw.category.to_dict(
+                    courseware_count=category_courseware_counts[cw.category_id],
+                    children_count=category_children_counts[cw.category_id]
+                )
             # 获取使用统计
-            usage_count = CoursewareUsage.query.filter_by(courseware_id=cw.id).count()
-            cw_dict['usage_count'] = usage_count
+            cw_dict['usage_count'] = usage_counts[cw.id]
             courseware_data.append(cw_dict)
         
         return jsonify(Result.success(
@@ -338,7 +417,7 @@ def delete_courseware(current_user, courseware_id):
             return jsonify(Result.error(message="没有权限删除此课件", code=403).to_dict())
         
         title = courseware.title
-        courseware.delete()
+        _delete_courseware(courseware)
         
         # 记录操作日志
         client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
@@ -403,14 +482,19 @@ def get_courseware_categories(current_user):
     """获取课件分类列表"""
     try:
         categories = CoursewareCategory.get_all()
-        categories_data = []
         
-        for category in categories:
-            category_dict = category.to_dict()
-            # 获取该分类下的课件数量
-            courseware_count = Courseware.query.filter_by(category_id=category.id).count()
-            category_dict['courseware_count'] = courseware_count
-            categories_data.append(category_dict)
+        # 批量统计各分类的课件数量和子分类数量
+        category_ids = [category.id for category in categories]
+        courseware_counts = count_loader(Courseware.category_id).load_many(category_ids)
+        children_counts = count_loader(CoursewareCategory.parent_id).load_many(category_ids)
+        
+        categories_data = [
+            category.to_dict(
+                courseware_count=courseware_counts[category.id],
+                children_count=children_counts[category.id]
+            )
+            for category in categories
+        ]
         
         return jsonify(Result.success(
             message="获取分类列表成功",
@@ -645,6 +729,34 @@ def get_courseware_usage(current_user, courseware_id):
     except Exception as e:
         return jsonify(Result.error(message=f"获取使用统计失败: {str(e)}").to_dict())
 
+def _record_courseware_usage(current_user, courseware, action):
+    """记录课件下载/预览的使用记录、统计次数和操作日志"""
+    equipment_id = request.args.get('equipment_id', 'WEB-CLIENT')  # 默认设备ID为网页客户端
+    client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+    usage = CoursewareUsage(
+        courseware_id=courseware.id,
+        user_id=current_user.id,
+        equipment_id=equipment_id,
+        action=action,
+        ip_address=client_ip
+    )
+    usage.save()
+    
+    if action == 'download':
+        courseware.download_count = (courseware.download_count or 0) + 1
+        operation = "下载课件"
+    else:
+        courseware.view_count = (courseware.view_count or 0) + 1
+        operation = "预览课件"
+    courseware.save()
+    
+    OperationLog.log_courseware_operation(
+        user_id=current_user.id,
+        courseware_id=courseware.id,
+        operation=operation,
+        ip_address=client_ip
+    )
+
 # 文件下载
 @courseware_bp.route('/<int:courseware_id>/download', methods=['GET'])
 @require_auth
@@ -658,32 +770,18 @@ def download_courseware(current_user, courseware_id):
         if not os.path.exists(courseware.file_path):
             return jsonify(Result.error(message="文件不存在", code=404).to_dict())
         
-        # 记录下载使用
-        equipment_id = request.args.get('equipment_id', 'WEB-CLIENT')  # 默认设备ID为网页客户端
-        usage = CoursewareUsage(
-            courseware_id=courseware_id,
-            user_id=current_user.id,
-            equipment_id=equipment_id,
-            action='download',
-            ip_address=request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        )
-        usage.save()
+        # 客户端缓存仍有效时直接返回 304，不写使用记录
+        validators = get_file_validators(courseware.file_path, courseware.file_hash)
+        if is_not_modified(validators):
+            return not_modified_response(validators)
         
-        # 更新下载统计
-        courseware.download_count = (courseware.download_count or 0) + 1
-        courseware.save()
+        # 断点续传的后续分段不重复记录下载
+        if is_initial_request():
+            _record_courseware_usage(current_user, courseware, 'download')
         
-        # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        OperationLog.log_courseware_operation(
-            user_id=current_user.id,
-            courseware_id=courseware_id,
-            operation="下载课件",
-            ip_address=client_ip
-        )
-        
-        return send_file(
+        return send_file_conditional(
             courseware.file_path,
+            validators,
             as_attachment=True,
             download_name=courseware.title + '.' + courseware.file_type
         )
@@ -720,29 +818,14 @@ def preview_courseware(courseware_id):
         if not os.path.exists(courseware.file_path):
             return jsonify(Result.error(message="文件不存在", code=404).to_dict())
         
-        # 记录预览使用
-        equipment_id = request.args.get('equipment_id', 'WEB-CLIENT')  # 默认设备ID为网页客户端
-        usage = CoursewareUsage(
-            courseware_id=courseware_id,
-            user_id=current_user.id,
-            equipment_id=equipment_id,
-            action='view',
-            ip_address=request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        )
-        usage.save()
+        # 客户端缓存仍有效时直接返回 304，不写使用记录
+        validators = get_file_validators(courseware.file_path, courseware.file_hash)
+        if is_not_modified(validators):
+            return not_modified_response(validators)
         
-        # 更新查看统计
-        courseware.view_count = (courseware.view_count or 0) + 1
-        courseware.save()
-        
-        # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        OperationLog.log_courseware_operation(
-            user_id=current_user.id,
-            courseware_id=courseware_id,
-            operation="预览课件",
-            ip_address=client_ip
-        )
+        # 音视频拖动进度产生的后续分段请求不重复记录预览
+        if is_initial_request():
+            _record_courseware_usage(current_user, courseware, 'view')
         
         # 获取文件的MIME类型
         mime_type, _ = mimetypes.guess_type(courseware.file_path)
@@ -776,15 +859,16 @@ def preview_courseware(courseware_id):
         
         if mime_type in previewable_types:
             # 直接返回文件用于预览
-            return send_file(
+            return send_file_conditional(
                 courseware.file_path,
+                validators,
                 mimetype=mime_type,
                 as_attachment=False,  # 关键：不作为附件，允许浏览器内联预览
                 download_name=courseware.title + '.' + courseware.file_type
             )
         else:
             # 对于不支持直接预览的文件，返回预览信息
-            file_size = os.path.getsize(courseware.file_path)
+            file_size = validators.size
             return jsonify(Result.success(
                 message="获取预览信息成功",
                 data={
@@ -852,7 +936,8 @@ def get_courseware_preview_info(current_user, courseware_id):
                     "preview_type": "direct",
                     "file_type": courseware.file_type,
                     "mime_type": mime_type,
-                    "preview_url": f"/api/courseware/{courseware_id}/preview"
+                    "preview_url": f"/api/courseware/{courseware_id}/preview",
+                    "thumbnail_url": courseware.get_thumbnail_url()
                 }
             ).to_dict())
         else:
@@ -867,18 +952,102 @@ def get_courseware_preview_info(current_user, courseware_id):
                     "file_size": file_size,
                     "mime_type": mime_type,
                     "message": "该文件类型不支持在线预览，请下载后查看",
-                    "download_url": f"/api/courseware/{courseware_id}/download"
+                    "download_url": f"/api/courseware/{courseware_id}/download",
+                    "thumbnail_url": courseware.get_thumbnail_url()
                 }
             ).to_dict())
         
     except Exception as e:
         return jsonify(Result.error(message=f"获取预览信息失败: {str(e)}").to_dict())
 
+@courseware_bp.route('/<int:courseware_id>/thumbnail', methods=['GET'])
+def get_courseware_thumbnail(courseware_id):
+    """获取课件缩略图，支持从URL参数传递token以便直接用于图片地址"""
+    try:
+        from app.auth import verify_token
+        
+        token = request.headers.get('Authorization', '').replace('Bearer ', '') or request.args.get('token', '')
+        if not token:
+            return jsonify(Result.error(message="需要认证", code=401).to_dict())
+        
+        current_user = verify_token(token)
+        if not current_user:
+            return jsonify(Result.error(message="无效的Token", code=401).to_dict())
+        
+        courseware = Courseware.get_by_id(courseware_id)
+        if not courseware:
+            return jsonify(Result.error(message="课件不存在", code=404).to_dict())
+        
+        if not courseware.thumbnail_path or not os.path.exists(courseware.thumbnail_path):
+            return jsonify(Result.error(message="缩略图不存在", code=404).to_dict())
+        
+        # 缩略图随内容哈希确定，允许客户端缓存一天
+        validators = get_file_validators(
+            courseware.thumbnail_path,
+            f"{courseware.file_hash}-thumb" if courseware.file_hash else None
+        )
+        if is_not_modified(validators):
+            return not_modified_response(validators)
+        
+        return send_file_conditional(courseware.thumbnail_path, validators, mimetype='image/jpeg', max_age=86400)
+        
+    except Exception as e:
+        return jsonify(Result.error(message=f"获取缩略图失败: {str(e)}").to_dict())
+
+@savepoint()
+def _apply_courseware_operation(courseware_id, operation, category_id=None):
+    """对单个课件执行批量操作，返回该课件的处理结果，单项失败只回滚该项的变更"""
+    try:
+        courseware = Courseware.get_by_id(courseware_id)
+        if not courseware:
+            return {"courseware_id": courseware_id, "status": "failed", "message": "课件不存在"}
+        
+        if operation == 'delete':
+            _delete_courseware(courseware)
+        elif operation == 'activate':
+            courseware.status = 'published'  # 修改为正确的枚举值
+            courseware.save()
+        elif operation == 'deactivate':
+            courseware.status = 'archived'  # 修改为正确的枚举值
+            courseware.save()
+        elif operation == 'change_category':
+            if category_id:
+                category = CoursewareCategory.get_by_id(category_id)
+                if not category:
+                    return {"courseware_id": courseware_id, "status": "failed", "message": "分类不存在"}
+                courseware.category_id = category_id
+                courseware.save()
+        else:
+            return {"courseware_id": courseware_id, "status": "failed", "message": "不支持的操作"}
+        
+        return {"courseware_id": courseware_id, "status": "success", "message": "操作成功"}
+        
+    except Exception as e:
+        rollback_savepoint()
+        return {"courseware_id": courseware_id, "status": "failed", "message": str(e)}
+
+@job_runner.handler('courseware.batch_operation')
+def _courseware_batch_operation_job(context, courseware_ids, operation, category_id=None,
+                                    user_id=None, ip_address=None):
+    """后台执行批量课件操作"""
+    context.set_total(len(courseware_ids))
+    for courseware_id in courseware_ids:
+        context.check_cancelled()
+        context.add_result(_apply_courseware_operation(courseware_id, operation, category_id))
+    
+    OperationLog.create_log(
+        user_id=user_id,
+        action_type='config',
+        action=f"批量课件操作: {operation}",
+        details=f"成功: {context.success_count}, 失败: {context.failed_count}",
+        ip_address=ip_address
+    )
+
 # 批量操作
 @courseware_bp.route('/batch-operation', methods=['POST'])
 @require_role(['admin', 'operator'])
 def batch_courseware_operation(current_user):
-    """批量课件操作"""
+    """批量课件操作，async=true 时提交后台任务并立即返回任务ID"""
     try:
         data = request.get_json()
         courseware_ids = data.get('courseware_ids', [])
@@ -887,50 +1056,26 @@ def batch_courseware_operation(current_user):
         if not courseware_ids or not operation:
             return jsonify(Result.error(message="课件ID列表和操作类型不能为空", code=400).to_dict())
         
-        success_count = 0
-        failed_count = 0
-        results = []
-        
-        for courseware_id in courseware_ids:
-            try:
-                courseware = Courseware.get_by_id(courseware_id)
-                if not courseware:
-                    results.append({"courseware_id": courseware_id, "status": "failed", "message": "课件不存在"})
-                    failed_count += 1
-                    continue
-                
-                if operation == 'delete':
-                    courseware.delete()
-                elif operation == 'activate':
-                    courseware.status = 'published'  # 修改为正确的枚举值
-                    courseware.save()
-                elif operation == 'deactivate':
-                    courseware.status = 'archived'  # 修改为正确的枚举值
-                    courseware.save()
-                elif operation == 'change_category':
-                    category_id = data.get('category_id')
-                    if category_id:
-                        category = CoursewareCategory.get_by_id(category_id)
-                        if not category:
-                            results.append({"courseware_id": courseware_id, "status": "failed", "message": "分类不存在"})
-                            failed_count += 1
-                            continue
-                        courseware.category_id = category_id
-                        courseware.save()
-                else:
-                    results.append({"courseware_id": courseware_id, "status": "failed", "message": "不支持的操作"})
-                    failed_count += 1
-                    continue
-                
-                results.append({"courseware_id": courseware_id, "status": "success", "message": "操作成功"})
-                success_count += 1
+        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+        
+        if str(data.get('async', request.args.get('async'))).lower() in ('true', '1', 'yes'):
+            job = job_runner.submit('courseware.batch_operation', {
+                'courseware_ids': courseware_ids,
+                'operation': operation,
+                'category_id': data.get('category_id'),
+                'user_id': current_user.id,
+                'ip_address': client_ip
+            }, user_id=current_user.id)
+            return jsonify(Result.success(message="批量操作任务已提交", data=job.to_dict()).to_dict())
                 
-            except Exception as e:
-                results.append({"courseware_id": courseware_id, "status": "failed", "message": str(e)})
-                failed_count += 1
+        results = [
+            _apply_courseware_operation(courseware_id, operation, data.get('category_id'))
+            for courseware_id in courseware_ids
+        ]
+        success_count = sum(1 for item in results if item['status'] == 'success')
+        failed_count = len(results) - success_count
         
         # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         OperationLog.create_log(
             user_id=current_user.id,
             action_type='config',
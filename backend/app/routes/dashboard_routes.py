@@ -1,17 +1,20 @@
 from flask import request, jsonify, Blueprint
 from app.models import (Equipment, User, Courseware, OperationLog, NavigationSettings, 
-                       EducationSettings, UserSession, CoursewareUsage, EquipmentStatusHistory)
+                       EducationSettings, UserSession, CoursewareUsage, EquipmentStatusHistory, DashboardStatistics)
 from app.models.result import Result
 from app.auth import require_auth, require_role
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, desc, and_, or_
-from app import db
+from app import db, cache, metrics_sampler, request_metrics
+from app.utils.time_series import GRANULARITIES, count_by_bucket, resolve_range
 
 # 创建仪表板蓝图
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/overview', methods=['GET'])
 @require_auth
+@cache.cached('dashboard.overview', depends_on=(User, Equipment, Courseware, OperationLog, UserSession,
+                                                  NavigationSettings, EducationSettings), timeout=30)
 def get_overview(current_user):
     """获取仪表板概览数据"""
     try:
@@ -23,11 +26,7 @@ def get_overview(current_user):
         total_education_settings = EducationSettings.query.count()
         
         # 在线用户统计
-        online_users = 0
-        for user in User.get_all():
-            active_sessions = UserSession.get_user_sessions(user.id, active_only=True)
-            if active_sessions:
-                online_users += 1
+        online_users = UserSession.count_online_users()
         
         # 设备状态统计
         equipment_online = Equipment.query.filter_by(status='online').count()
@@ -53,7 +52,7 @@ def get_overview(current_user):
         today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         today_operations = OperationLog.query.filter(OperationLog.created_at >= today_start).count()
         today_logins = OperationLog.query.filter(
-            and_(OperationLog.action.contains('登录'), OperationLog.created_at >= today_start)
+            and_(OperationLog.action_type == 'login', OperationLog.created_at >= today_start)
         ).count()
         
         return jsonify(Result.success(
@@ -93,65 +92,41 @@ def get_overview(current_user):
 
 @dashboard_bp.route('/statistics', methods=['GET'])
 @require_auth
+@cache.cached('dashboard.statistics', depends_on=(User, Courseware, OperationLog, CoursewareUsage,
+                                                    EquipmentStatusHistory, DashboardStatistics))
 def get_statistics(current_user):
     """获取仪表板统计数据"""
     try:
         # 获取时间范围参数
         days = request.args.get('days', 7, type=int)  # 默认7天
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        # 用户注册趋势
-        user_registrations = []
-        for i in range(days):
-            date_obj = start_date + timedelta(days=i)
-            next_date = date_obj + timedelta(days=1)
-            count = User.query.filter(
-                and_(User.created_at >= date_obj, User.created_at < next_date)
-            ).count()
-            user_registrations.append({
-                "date": date_obj.strftime('%Y-%m-%d'),
-                "count": count
-            })
-        
-        # 设备状态变更趋势
-        equipment_changes = []
-        for i in range(days):
-            date_obj = start_date + timedelta(days=i)
-            next_date = date_obj + timedelta(days=1)
-            count = EquipmentStatusHistory.query.filter(
-                and_(EquipmentStatusHistory.created_at >= date_obj, EquipmentStatusHistory.created_at < next_date)
-            ).count()
-            equipment_changes.append({
-                "date": date_obj.strftime('%Y-%m-%d'),
-                "count": count
-            })
-        
-        # 课件使用趋势
-        courseware_usage = []
-        for i in range(days):
-            date_obj = start_date + timedelta(days=i)
-            next_date = date_obj + timedelta(days=1)
-            count = CoursewareUsage.query.filter(
-                and_(CoursewareUsage.used_at >= date_obj, CoursewareUsage.used_at < next_date)
-            ).count()
-            courseware_usage.append({
-                "date": date_obj.strftime('%Y-%m-%d'),
-                "count": count
-            })
-        
-        # 操作日志趋势
-        operation_logs = []
-        for i in range(days):
-            date_obj = start_date + timedelta(days=i)
-            next_date = date_obj + timedelta(days=1)
-            count = OperationLog.query.filter(
-                and_(OperationLog.created_at >= date_obj, OperationLog.created_at < next_date)
-            ).count()
-            operation_logs.append({
-                "date": date_obj.strftime('%Y-%m-%d'),
-                "count": count
-            })
+        granularity = request.args.get('granularity', 'day')  # hour/day/week
+        if granularity not in GRANULARITIES:
+            return jsonify(Result.error(message=f"不支持的时间粒度: {granularity}").to_dict())
+        if days < 1:
+            return jsonify(Result.error(message="统计天数必须大于0").to_dict())
+        
+        # 按粒度换算周期数，统计区间包含当前时间桶
+        if granularity == 'hour':
+            periods = days * 24
+        elif granularity == 'week':
+            periods = (days + 6) // 7
+        else:
+            periods = days
+        start_date, end_date = resolve_range(periods, granularity)
+        
+        # 数据来源: raw 直接统计原始表，rollup 读取定时汇总的统计行
+        source = request.args.get('source', 'raw')
+        
+        # 各趋势序列均为单次 GROUP BY 查询，空桶补0
+        user_registrations = count_by_bucket(User.created_at, start_date, end_date, granularity)
+        if source == 'rollup':
+            equipment_changes = DashboardStatistics.get_series('equipment_changes', start_date, end_date, granularity)
+            courseware_usage = DashboardStatistics.get_series('total_interactions', start_date, end_date, granularity)
+            operation_logs = DashboardStatistics.get_series('total_operations', start_date, end_date, granularity)
+        else:
+            equipment_changes = count_by_bucket(EquipmentStatusHistory.created_at, start_date, end_date, granularity)
+            courseware_usage = count_by_bucket(CoursewareUsage.created_at, start_date, end_date, granularity)
+            operation_logs = count_by_bucket(OperationLog.created_at, start_date, end_date, granularity)
         
         # 热门课件统计
         popular_courseware = db.session.query(
@@ -176,8 +151,10 @@ def get_statistics(current_user):
             data={
                 "time_range": {
                     "start_date": start_date.strftime('%Y-%m-%d'),
-                    "end_date": end_date.strftime('%Y-%m-%d'),
-                    "days": days
+                    "end_date": (end_date - timedelta(seconds=1)).strftime('%Y-%m-%d'),
+                    "days": days,
+                    "granularity": granularity,
+                    "source": source
                 },
                 "trends": {
                     "user_registrations": user_registrations,
@@ -240,6 +217,7 @@ def update_statistics(current_user):
 
 @dashboard_bp.route('/equipment-status', methods=['GET'])
 @require_auth
+@cache.cached('dashboard.equipment_status', depends_on=(Equipment,), timeout=30)
 def get_equipment_status(current_user):
     """获取设备状态分布"""
     try:
@@ -301,6 +279,7 @@ def get_recent_activities(current_user):
 
 @dashboard_bp.route('/alerts', methods=['GET'])
 @require_auth
+@cache.cached('dashboard.alerts', depends_on=(Equipment,), timeout=30)
 def get_alerts(current_user):
     """获取系统警报"""
     try:
@@ -346,18 +325,15 @@ def get_realtime_data(current_user):
     try:
         # 当前在线用户
         current_online_users = []
-        for user in User.get_all():
-            active_sessions = UserSession.get_user_sessions(user.id, active_only=True)
-            if active_sessions:
-                session = active_sessions[0]  # 取最新的会话
-                current_online_users.append({
-                    "user_id": user.id,
-                    "username": user.username,
-                    "role": user.role,
-                    "login_time": session.created_at.isoformat(),
-                    "last_activity": session.last_activity.isoformat() if session.last_activity else None,
-                    "ip_address": session.ip_address
-                })
+        for user, session in UserSession.get_online_users():
+            current_online_users.append({
+                "user_id": user.id,
+                "username": user.username,
+                "role": user.role,
+                "login_time": session.login_time.isoformat() if session.login_time else None,
+                "last_activity": session.last_activity.isoformat() if session.last_activity else None,
+                "ip_address": session.ip_address
+            })
         
         # 设备实时状态
         equipment_realtime = []
@@ -376,19 +352,27 @@ def get_realtime_data(current_user):
             OperationLog.created_at.desc()
         ).limit(20).all()
         
-        # 系统性能指标（模拟数据）
-        import random
+        # 系统性能指标，取自后台采样线程的最新采样点
+        metrics = metrics_sampler.get_current()
         performance_metrics = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "cpu_usage": round(random.uniform(20, 80), 2),
-            "memory_usage": round(random.uniform(40, 90), 2),
-            "disk_usage": round(random.uniform(30, 70), 2),
+            "timestamp": datetime.utcfromtimestamp(metrics['timestamp']).isoformat(),
+            "cpu_usage": metrics['cpu_percent'],
+            "memory_usage": metrics['memory_percent'],
+            "disk_usage": metrics['disk_percent'],
+            "load_average": [metrics['load_1'], metrics['load_5'], metrics['load_15']],
             "network_io": {
-                "bytes_sent": random.randint(1000000, 10000000),
-                "bytes_received": random.randint(2000000, 20000000)
+                "bytes_sent": metrics.get('net_bytes_sent', 0),
+                "bytes_received": metrics.get('net_bytes_recv', 0),
+                "send_rate": round(metrics['net_sent_rate'], 2),
+                "receive_rate": round(metrics['net_recv_rate'], 2)
+            },
+            "process": {
+                "rss": int(metrics['process_rss']),
+                "threads": int(metrics['process_threads'])
             },
             "active_connections": len(current_online_users),
-            "response_time": round(random.uniform(50, 200), 2)
+            "active_requests": request_metrics.in_flight,
+            "response_time": request_metrics.get_summary()['response_time_avg']
         }
         
         # 告警信息
@@ -436,6 +420,7 @@ def get_realtime_data(current_user):
 
 @dashboard_bp.route('/charts', methods=['GET'])
 @require_auth
+@cache.cached('dashboard.charts', depends_on=(User, Equipment, Courseware))
 def get_chart_data(current_user):
     """获取图表数据"""
     try:
@@ -544,9 +529,13 @@ def export_dashboard_data(current_user):
 def refresh_dashboard_cache(current_user):
     """刷新仪表板缓存"""
     try:
+        # 清除仪表板全部缓存
+        cleared = cache.invalidate_prefix('dashboard.')
+        
         refresh_info = {
             "timestamp": datetime.utcnow().isoformat(),
             "cache_cleared": True,
+            "cleared_namespaces": cleared,
             "data_refreshed": True
         }
         
@@ -1,8 +1,13 @@
-from flask import request, jsonify, Blueprint, send_file
+from flask import request, jsonify, Blueprint, send_file, current_app
 from app.models import Equipment, EquipmentLog, OperationLog, EquipmentStatusHistory
 from app.models.result import Result
 from app.auth import require_auth, require_role
-from app import db
+from app import db, job_runner, scheduler, heartbeat_buffer
+from app.utils.equipment_import import import_equipment, REQUIRED_COLUMNS, IMPORT_MODES
+from app.utils.tabular import read_table_header
+from app.utils.heartbeat import parse_heartbeat
+from app.utils.unit_of_work import enable_unit_of_work, savepoint, rollback_savepoint
+from app.utils.export import ExportColumn, EXPORT_FORMATS, select_columns, export_response, iter_csv, write_xlsx
 from sqlalchemy import or_, and_
 import datetime
 import pandas as pd
@@ -11,6 +16,54 @@ import os
 
 # 创建设备蓝图
 equipment_bp = Blueprint('equipment', __name__)
+# 请求内的写操作在请求结束时统一提交
+enable_unit_of_work(equipment_bp)
+
+# 设备导出列定义
+EQUIPMENT_EXPORT_COLUMNS = [
+    ExportColumn('id', '设备ID', lambda eq: eq.id, 15),
+    ExportColumn('location', '设备位置', lambda eq: eq.location, 20),
+    ExportColumn('ip_address', 'IP地址', lambda eq: eq.ip_address or '', 18),
+    ExportColumn('status', '状态', lambda eq: eq.status, 12),
+    ExportColumn('usage_rate', '使用率', lambda eq: eq.usage_rate or '0%', 12),
+    ExportColumn('is_offline', '是否离线', lambda eq: '是' if eq.is_offline else '否', 12),
+    ExportColumn('has_error', '是否有错误', lambda eq: '是' if eq.has_error else '否', 12),
+    ExportColumn('created_at', '创建时间',
+                 lambda eq: eq.created_at.strftime('%Y-%m-%d %H:%M:%S') if eq.created_at else '', 20),
+    ExportColumn('updated_at', '更新时间',
+                 lambda eq: eq.updated_at.strftime('%Y-%m-%d %H:%M:%S') if eq.updated_at else '', 20),
+]
+
+def _is_async_request(data=None):
+    """是否请求以后台任务方式执行（查询参数或请求体中 async=true）"""
+    value = request.args.get('async')
+    if value is None and data:
+        value = data.get('async')
+    return str(value).lower() in ('true', '1', 'yes')
+
+def _filter_equipment_query(query, args):
+    """按列表/导出接口的查询参数过滤设备"""
+    status = args.get('status')
+    location = args.get('location')
+    search = args.get('search', '').strip()
+    
+    # 搜索过滤
+    if search:
+        query = query.filter(or_(
+            Equipment.id.contains(search),
+            Equipment.location.contains(search),
+            Equipment.ip_address.contains(search)
+        ))
+    
+    # 状态过滤（维护模式字段不存在，maintenance 不过滤）
+    if status in ('online', 'offline', 'error'):
+        query = query.filter_by(status=status)
+    
+    # 位置过滤
+    if location:
+        query = query.filter(Equipment.location.contains(location))
+    
+    return query
 
 @equipment_bp.route('', methods=['GET'])
 @require_auth
@@ -19,39 +72,8 @@ def get_equipment_list(current_user):
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
-        status = request.args.get('status')
-        location = request.args.get('location')
-        search = request.args.get('search', '').strip()
-        maintenance_mode = request.args.get('maintenance_mode')
-        
-        query = Equipment.query
-        
-        # 搜索过滤
-        if search:
-            query = query.filter(or_(
-                Equipment.id.contains(search),
-                Equipment.location.contains(search),
-                Equipment.ip_address.contains(search)
-            ))
-        
-        # 状态过滤 
-        if status == 'online':
-            query = query.filter_by(status='online')
-        elif status == 'offline':
-            query = query.filter_by(status='offline')
-        elif status == 'error':
-            query = query.filter_by(status='error')
-        elif status == 'maintenance':
-            # 维护模式字段不存在，跳过
-            pass
-        
-        # 位置过滤
-        if location:
-            query = query.filter(Equipment.location.contains(location))
-            
-        # 维护模式过滤（字段不存在，跳过）
-        # if maintenance_mode is not None:
-        #     query = query.filter_by(maintenance_mode=bool(int(maintenance_mode)))
+        
+        query = _filter_equipment_query(Equipment.query, request.args)
         
         # 按更新时间排序
         query = query.order_by(Equipment.updated_at.desc())
@@ -403,17 +425,17 @@ def control_equipment(current_user, equipment_id):
             equipment.stop()
             result_message = "设备停止成功"
         elif action == 'restart':
-            # 重启设备
-            equipment.restart()
-            result_message = "设备重启成功"
+            # 重启设备，进入 restarting 状态后立即返回，完成由心跳或定时任务推进
+            equipment.restart(changed_by=current_user.id)
+            result_message = "设备正在重启"
         elif action == 'shutdown':
             # 关闭设备
             equipment.shutdown()
             result_message = "设备关闭成功"
         elif action == 'reboot':
             # 重新启动
-            equipment.reboot()
-            result_message = "设备重新启动成功"
+            equipment.reboot(changed_by=current_user.id)
+            result_message = "设备正在重新启动"
         elif action == 'diagnose':
             # 设备诊断
             diagnosis = equipment.diagnose()
@@ -438,6 +460,46 @@ def control_equipment(current_user, equipment_id):
     except Exception as e:
         return jsonify(Result.error(message=f"设备控制失败: {str(e)}").to_dict())
 
+@equipment_bp.route('/heartbeat', methods=['POST'])
+@require_auth
+def report_heartbeat(current_user):
+    """
+    设备心跳上报，支持单条或 heartbeats 列表批量上报
+    心跳先在内存中按设备合并，由定时任务批量写入数据库
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify(Result.error(message="心跳数据不能为空", code=400).to_dict())
+        
+        heartbeats = data.get('heartbeats') if 'heartbeats' in data else [data]
+        if not isinstance(heartbeats, list) or not heartbeats:
+            return jsonify(Result.error(message="心跳数据格式错误", code=400).to_dict())
+        
+        max_batch = current_app.config['HEARTBEAT_MAX_BATCH']
+        if len(heartbeats) > max_batch:
+            return jsonify(Result.error(message=f"单次最多上报 {max_batch} 条心跳", code=400).to_dict())
+        
+        try:
+            parsed = [parse_heartbeat(item) for item in heartbeats]
+        except ValueError as e:
+            return jsonify(Result.error(message=str(e), code=400).to_dict())
+        
+        for equipment_id, values in parsed:
+            heartbeat_buffer.record(equipment_id, values)
+        
+        # 调度线程未运行时（如关闭定时任务）在请求中按间隔兜底写入
+        if not scheduler.running:
+            heartbeat_buffer.flush_if_due(current_app.config['HEARTBEAT_FLUSH_INTERVAL'])
+        
+        return jsonify(Result.success(
+            message="心跳上报成功",
+            data={"accepted": len(parsed)}
+        ).to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"心跳上报失败: {str(e)}").to_dict())
+
 @equipment_bp.route('/<equipment_id>/status-history', methods=['GET'])
 @require_auth
 def get_equipment_status_history(current_user, equipment_id):
@@ -502,10 +564,50 @@ def get_equipment_statistics(current_user):
     except Exception as e:
         return jsonify(Result.error(message=f"获取设备统计失败: {str(e)}").to_dict())
 
+@savepoint()
+def _apply_equipment_operation(equipment_id, operation):
+    """对单个设备执行批量操作，返回该设备的处理结果，单项失败只回滚该项的变更"""
+    try:
+        equipment = Equipment.get_by_id(equipment_id)
+        if not equipment:
+            return {"equipment_id": equipment_id, "status": "failed", "message": "设备不存在"}
+        
+        if operation == 'delete':
+            equipment.delete()
+        elif operation == 'maintenance_on':
+            equipment.set_maintenance_mode(True)
+        elif operation == 'maintenance_off':
+            equipment.set_maintenance_mode(False)
+        elif operation == 'restart':
+            equipment.restart()
+        else:
+            return {"equipment_id": equipment_id, "status": "failed", "message": "不支持的操作"}
+        
+        return {"equipment_id": equipment_id, "status": "success", "message": "操作成功"}
+    
+    except Exception as e:
+        rollback_savepoint()
+        return {"equipment_id": equipment_id, "status": "failed", "message": str(e)}
+
+@job_runner.handler('equipment.batch_operation')
+def _equipment_batch_operation_job(context, equipment_ids, operation, user_id=None, ip_address=None):
+    """后台执行批量设备操作"""
+    context.set_total(len(equipment_ids))
+    for equipment_id in equipment_ids:
+        context.check_cancelled()
+        context.add_result(_apply_equipment_operation(equipment_id, operation))
+    
+    OperationLog.create_log(
+        user_id=user_id,
+        action=f"批量设备操作: {operation}",
+        details=f"成功: {context.success_count}, 失败: {context.failed_count}",
+        ip_address=ip_address
+    )
+
 @equipment_bp.route('/batch-operation', methods=['POST'])
 @require_role(['admin', 'operator'])
 def batch_equipment_operation(current_user):
-    """批量设备操作"""
+    """批量设备操作，async=true 时提交后台任务并立即返回任务ID"""
     try:
         data = request.get_json()
         equipment_ids = data.get('equipment_ids', [])
@@ -514,40 +616,22 @@ def batch_equipment_operation(current_user):
         if not equipment_ids or not operation:
             return jsonify(Result.error(message="设备ID列表和操作类型不能为空", code=400).to_dict())
         
-        success_count = 0
-        failed_count = 0
-        results = []
-        
-        for equipment_id in equipment_ids:
-            try:
-                equipment = Equipment.get_by_id(equipment_id)
-                if not equipment:
-                    results.append({"equipment_id": equipment_id, "status": "failed", "message": "设备不存在"})
-                    failed_count += 1
-                    continue
-                
-                if operation == 'delete':
-                    equipment.delete()
-                elif operation == 'maintenance_on':
-                    equipment.set_maintenance_mode(True)
-                elif operation == 'maintenance_off':
-                    equipment.set_maintenance_mode(False)
-                elif operation == 'restart':
-                    equipment.restart()
-                else:
-                    results.append({"equipment_id": equipment_id, "status": "failed", "message": "不支持的操作"})
-                    failed_count += 1
-                    continue
-                
-                results.append({"equipment_id": equipment_id, "status": "success", "message": "操作成功"})
-                success_count += 1
+        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+        
+        if _is_async_request(data):
+            job = job_runner.submit('equipment.batch_operation', {
+                'equipment_ids': equipment_ids,
+                'operation': operation,
+                'user_id': current_user.id,
+                'ip_address': client_ip
+            }, user_id=current_user.id)
+            return jsonify(Result.success(message="批量操作任务已提交", data=job.to_dict()).to_dict())
                 
-            except Exception as e:
-                results.append({"equipment_id": equipment_id, "status": "failed", "message": str(e)})
-                failed_count += 1
+        results = [_apply_equipment_operation(equipment_id, operation) for equipment_id in equipment_ids]
+        success_count = sum(1 for item in results if item['status'] == 'success')
+        failed_count = len(results) - success_count
         
         # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         OperationLog.create_log(
             user_id=current_user.id,
             action=f"批量设备操作: {operation}",
@@ -567,99 +651,89 @@ def batch_equipment_operation(current_user):
     except Exception as e:
         return jsonify(Result.error(message=f"批量操作失败: {str(e)}").to_dict())
 
+@job_runner.handler('equipment.export')
+def _equipment_export_job(context, export_format, column_keys, filters, user_id=None, ip_address=None):
+    """后台导出设备列表到任务目录"""
+    columns = select_columns(EQUIPMENT_EXPORT_COLUMNS, column_keys)
+    query = _filter_equipment_query(Equipment.query, filters)
+    context.set_total(query.count())
+    
+    def records():
+        for equipment in query.order_by(Equipment.created_at.desc()).yield_per(1000):
+            context.processed += 1
+            if context.processed % 1000 == 0:
+                context.check_cancelled()
+                context.update(context.processed, context.processed, 0)
+            yield equipment
+    
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"设备列表_{timestamp}.{export_format}"
+    path = os.path.join(context.folder, filename)
+    with open(path, 'wb') as output:
+        if export_format == 'csv':
+            for chunk in iter_csv(columns, records()):
+                output.write(chunk)
+        else:
+            write_xlsx(output, columns, records(), sheet_name='设备列表')
+    count = context.processed
+    context.update(count, count, 0)
+    context.result_file = path
+    
+    OperationLog.create_log(
+        user_id=user_id,
+        action="导出设备列表",
+        details=f"导出了 {count} 条设备记录",
+        ip_address=ip_address
+    )
+    return {'filename': filename, 'count': count}
+
 @equipment_bp.route('/export', methods=['GET'])
 @require_auth
 def export_equipment_list(current_user):
     """导出设备列表"""
     try:
-        # 获取过滤参数
-        status = request.args.get('status')
-        search = request.args.get('search', '').strip()
-        
-        query = Equipment.query
-        
-        # 应用过滤条件
-        if search:
-            query = query.filter(or_(
-                Equipment.id.contains(search),
-                Equipment.location.contains(search),
-                Equipment.ip_address.contains(search)
-            ))
-        
-        if status and status != 'all':
-            if status == 'online':
-                query = query.filter_by(status='online')
-            elif status == 'offline':
-                query = query.filter_by(status='offline')
-            elif status == 'error':
-                query = query.filter_by(status='error')
-        
-        # 获取设备列表
-        equipment_list = query.order_by(Equipment.created_at.desc()).all()
-        
-        # 准备导出数据
-        export_data = []
-        for eq in equipment_list:
-            export_data.append({
-                '设备ID': eq.id,
-                '设备位置': eq.location,
-                'IP地址': eq.ip_address or '',
-                '状态': eq.status,
-                '使用率': eq.usage_rate or '0%',
-                '是否离线': '是' if eq.is_offline else '否',
-                '是否有错误': '是' if eq.has_error else '否',
-                '创建时间': eq.created_at.strftime('%Y-%m-%d %H:%M:%S') if eq.created_at else '',
-                '更新时间': eq.updated_at.strftime('%Y-%m-%d %H:%M:%S') if eq.updated_at else ''
-            })
-        
-        # 创建Excel文件
-        df = pd.DataFrame(export_data)
+        export_format = request.args.get('format', 'xlsx').lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify(Result.error(message=f"不支持的导出格式: {export_format}", code=400).to_dict())
         
-        # 创建BytesIO对象
-        output = io.BytesIO()
+        # 导出列选择，如 columns=id,location,status
+        column_keys = [key.strip() for key in request.args.get('columns', '').split(',') if key.strip()]
+        try:
+            columns = select_columns(EQUIPMENT_EXPORT_COLUMNS, column_keys)
+        except ValueError as e:
+            return jsonify(Result.error(message=str(e), code=400).to_dict())
         
-        # 使用ExcelWriter写入数据
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='设备列表', index=False)
-            
-            # 获取工作表并设置列宽
-            workbook = writer.book
-            worksheet = writer.sheets['设备列表']
-            
-            # 自动调整列宽
-            for column in worksheet.columns:
-                max_length = 0
-                column_name = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_name].width = adjusted_width
+        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         
-        output.seek(0)
+        if _is_async_request():
+            filters = {key: request.args.get(key) for key in ('status', 'location', 'search') if request.args.get(key)}
+            job = job_runner.submit('equipment.export', {
+                'export_format': export_format,
+                'column_keys': column_keys,
+                'filters': filters,
+                'user_id': current_user.id,
+                'ip_address': client_ip
+            }, user_id=current_user.id)
+            return jsonify(Result.success(message="导出任务已提交", data=job.to_dict()).to_dict())
+        
+        # 与列表接口相同的过滤条件
+        query = _filter_equipment_query(Equipment.query, request.args)
+        total = query.count()
         
         # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         OperationLog.create_log(
             user_id=current_user.id,
             action="导出设备列表",
-            details=f"导出了 {len(export_data)} 条设备记录",
+            details=f"导出了 {total} 条设备记录",
             ip_address=client_ip
         )
         
+        # 分批读取设备，避免一次性加载全部记录
+        records = query.order_by(Equipment.created_at.desc()).yield_per(1000)
+        
         # 生成文件名
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"设备列表_{timestamp}.xlsx"
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        return export_response(columns, records, f"设备列表_{timestamp}", export_format, sheet_name='设备列表')
         
     except Exception as e:
         return jsonify(Result.error(message=f"导出设备列表失败: {str(e)}").to_dict())
@@ -766,99 +840,51 @@ def batch_import_equipment(current_user):
         if not file.filename.lower().endswith(('.xlsx', '.xls', '.csv')):
             return jsonify(Result.error(message="文件格式不支持，请上传Excel或CSV文件", code=400).to_dict())
         
-        # 读取文件内容
+        # 导入选项: mode=partial/atomic, dry_run=true 只校验不写入
+        mode = request.form.get('mode', 'partial')
+        dry_run = request.form.get('dry_run', 'false').lower() in ('true', '1', 'yes')
+        if mode not in IMPORT_MODES:
+            return jsonify(Result.error(message=f"不支持的导入模式: {mode}", code=400).to_dict())
+        
+        # 读取表头并验证必需的列
         try:
-            if file.filename.lower().endswith('.csv'):
-                df = pd.read_csv(file)
-            else:
-                df = pd.read_excel(file, sheet_name=0)  # 读取第一个工作表
+            columns = read_table_header(file.stream, file.filename)
         except Exception as e:
             return jsonify(Result.error(message=f"文件读取失败: {str(e)}", code=400).to_dict())
         
-        # 验证必需的列
-        required_columns = ['设备ID', '设备位置']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
         if missing_columns:
             return jsonify(Result.error(
                 message=f"文件缺少必需的列: {', '.join(missing_columns)}",
                 code=400
             ).to_dict())
         
-        # 统计变量
-        success_count = 0
-        failed_count = 0
-        total_count = len(df)
-        failed_items = []
-        
-        # 逐行处理数据
-        for index, row in df.iterrows():
-            try:
-                # 获取设备数据
-                equipment_id = str(row['设备ID']).strip()
-                location = str(row['设备位置']).strip()
-                
-                # 验证必填字段
-                if not equipment_id or equipment_id == 'nan':
-                    failed_items.append({
-                        'row': index + 2,  # Excel行号从2开始（第1行是标题）
-                        'error': '设备ID不能为空'
-                    })
-                    failed_count += 1
-                    continue
-                
-                if not location or location == 'nan':
-                    failed_items.append({
-                        'row': index + 2,
-                        'error': '设备位置不能为空'
-                    })
-                    failed_count += 1
-                    continue
-                
-                # 检查设备ID是否已存在
-                existing_equipment = Equipment.get_by_id(equipment_id)
-                if existing_equipment:
-                    failed_items.append({
-                        'row': index + 2,
-                        'error': '设备ID已存在'
-                    })
-                    failed_count += 1
-                    continue
-                
-                # 获取可选字段
-                ip_address = str(row.get('IP地址', '')).strip()
-                if ip_address == 'nan':
-                    ip_address = None
-                
-                status = str(row.get('状态', 'offline')).strip().lower()
-                if status == 'nan' or status not in ['online', 'offline', 'error']:
-                    status = 'offline'
-                
-                usage_rate = str(row.get('使用率', '0%')).strip()
-                if usage_rate == 'nan':
-                    usage_rate = '0%'
-                
-                # 创建设备
-                equipment = Equipment(
-                    id=equipment_id,
-                    location=location,
-                    ip_address=ip_address,
-                    status=status,
-                    usage_rate=usage_rate,
-                    is_offline=(status == 'offline'),
-                    has_error=(status == 'error')
-                )
-                equipment.save()
-                success_count += 1
+        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+        
+        if _is_async_request(request.form):
+            # 先保存上传文件到任务目录，再提交后台任务
+            job = job_runner.create('equipment.import', {
+                'filename': file.filename,
+                'mode': mode,
+                'dry_run': dry_run,
+                'user_id': current_user.id,
+                'ip_address': client_ip
+            }, user_id=current_user.id)
+            file.stream.seek(0)
+            file.save(os.path.join(job_runner.job_folder(job.id), 'upload' + os.path.splitext(file.filename)[1].lower()))
+            job_runner.submit('equipment.import', job=job)
+            return jsonify(Result.success(message="导入任务已提交", data=job.to_dict()).to_dict())
                 
-            except Exception as e:
-                failed_items.append({
-                    'row': index + 2,
-                    'error': f'处理错误: {str(e)}'
-                })
-                failed_count += 1
+        # 流式分块导入
+        import_result = import_equipment(file.stream, file.filename, mode=mode, dry_run=dry_run)
+        success_count = import_result['success_count']
+        failed_count = import_result['failed_count']
+        total_count = import_result['total_count']
+        
+        if dry_run:
+            return jsonify(Result.success(message="导入校验完成", data=import_result).to_dict())
         
         # 记录操作日志
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
         OperationLog.create_log(
             user_id=current_user.id,
             action="批量导入设备",
@@ -867,14 +893,36 @@ def batch_import_equipment(current_user):
         )
         
         return jsonify(Result.success(
-            message="批量导入完成",
-            data={
-                "success_count": success_count,
-                "failed_count": failed_count,
-                "total_count": total_count,
-                "failed_items": failed_items
-            }
+            message="批量导入完成" if import_result['committed'] else "导入存在错误，未写入任何数据",
+            data=import_result
         ).to_dict())
         
     except Exception as e:
         return jsonify(Result.error(message=f"批量导入失败: {str(e)}").to_dict())
+
+@job_runner.handler('equipment.import')
+def _equipment_import_job(context, filename, mode, dry_run, user_id=None, ip_address=None):
+    """后台执行设备批量导入，上传文件保存在任务目录中"""
+    path = os.path.join(context.folder, 'upload' + os.path.splitext(filename)[1].lower())
+    
+    def progress(processed, success_count, failed_count):
+        context.update(processed, success_count, failed_count)
+        # atomic 模式下取消会在抛出异常时回滚已插入的数据
+        context.check_cancelled()
+    
+    with open(path, 'rb') as stream:
+        import_result = import_equipment(stream, filename, mode=mode, dry_run=dry_run, progress=progress)
+    context.total = import_result['total_count']
+    context.update(import_result['total_count'], import_result['success_count'], import_result['failed_count'])
+    context.results = import_result.pop('failed_items')
+    
+    if not dry_run:
+        OperationLog.create_log(
+            user_id=user_id,
+            action="批量导入设备",
+            details=f"总计: {import_result['total_count']}, 成功: {import_result['success_count']}, "
+                    f"失败: {import_result['failed_count']}",
+            ip_address=ip_address
+        )
+    os.remove(path)
+    return import_result
@@ -0,0 +1,94 @@
+from flask import request, jsonify, Blueprint, send_file
+from app.models.job import Job
+from app.models.result import Result
+from app.auth import require_auth
+from app import job_runner
+import os
+
+# 创建后台任务蓝图
+job_bp = Blueprint('job', __name__)
+
+def _get_accessible_job(current_user, job_id):
+    """获取当前用户可访问的任务，管理员可访问全部任务"""
+    job = Job.get_by_id(job_id)
+    if not job:
+        return None
+    if job.created_by != current_user.id and not current_user.is_admin():
+        return None
+    return job
+
+@job_bp.route('', methods=['GET'])
+@require_auth
+def get_job_list(current_user):
+    """获取当前用户最近的任务列表"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 200)
+        jobs = Job.get_by_user(current_user.id, limit)
+        
+        return jsonify(Result.success(
+            message="获取任务列表成功",
+            data=[job.to_dict() for job in jobs]
+        ).to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"获取任务列表失败: {str(e)}").to_dict())
+
+@job_bp.route('/<job_id>', methods=['GET'])
+@require_auth
+def get_job(current_user, job_id):
+    """获取任务进度和逐项结果"""
+    try:
+        job = _get_accessible_job(current_user, job_id)
+        if not job:
+            return jsonify(Result.error(message="任务不存在", code=404).to_dict())
+        
+        # 逐项结果分页返回
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(request.args.get('limit', 1000, type=int), 5000)
+        
+        data = job.to_dict()
+        results = job.get_results()
+        data['results'] = results[offset:offset + limit]
+        data['results_total'] = len(results)
+        if job.result_file:
+            data['download_url'] = f"/api/jobs/{job.id}/download"
+        
+        return jsonify(Result.success(message="获取任务成功", data=data).to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"获取任务失败: {str(e)}").to_dict())
+
+@job_bp.route('/<job_id>/cancel', methods=['POST'])
+@require_auth
+def cancel_job(current_user, job_id):
+    """取消任务"""
+    try:
+        job = _get_accessible_job(current_user, job_id)
+        if not job:
+            return jsonify(Result.error(message="任务不存在", code=404).to_dict())
+        
+        if not job_runner.cancel(job):
+            return jsonify(Result.error(message="任务已结束，无法取消", code=400).to_dict())
+        
+        return jsonify(Result.success(message="已请求取消任务", data=job.to_dict()).to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"取消任务失败: {str(e)}").to_dict())
+
+@job_bp.route('/<job_id>/download', methods=['GET'])
+@require_auth
+def download_job_result(current_user, job_id):
+    """下载任务结果文件"""
+    try:
+        job = _get_accessible_job(current_user, job_id)
+        if not job:
+            return jsonify(Result.error(message="任务不存在", code=404).to_dict())
+        
+        if job.status != 'succeeded' or not job.result_file or not os.path.exists(job.result_file):
+            return jsonify(Result.error(message="任务结果文件不存在", code=404).to_dict())
+        
+        return send_file(job.result_file, as_attachment=True,
+                         download_name=job.get_summary().get('filename') or os.path.basename(job.result_file))
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"下载任务结果失败: {str(e)}").to_dict())
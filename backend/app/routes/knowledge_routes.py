@@ -23,14 +23,6 @@ def get_knowledge_list(current_user):
         # 构建查询
         query = KnowledgeBase.query
         
-        # 关键词搜索
-        if keyword:
-            query = query.filter(
-                KnowledgeBase.title.contains(keyword) |
-                KnowledgeBase.content.contains(keyword) |
-                KnowledgeBase.description.contains(keyword)
-            )
-        
         # 分类过滤
         if category:
             query = query.filter(KnowledgeBase.category == category)
@@ -39,8 +31,13 @@ def get_knowledge_list(current_user):
         if status:
             query = query.filter(KnowledgeBase.status == status)
         
-        # 按创建时间倒序
-        query = query.order_by(KnowledgeBase.created_at.desc())
+        # 关键词搜索，支持全文索引时按相关度排序，否则按创建时间倒序
+        search_mode = None
+        if keyword:
+            query, fulltext = KnowledgeBase.filter_by_keyword(query, keyword)
+            search_mode = 'fulltext' if fulltext else 'like'
+        else:
+            query = query.order_by(KnowledgeBase.created_at.desc())
         
         # 分页
         pagination = query.paginate(
@@ -56,7 +53,8 @@ def get_knowledge_list(current_user):
             'total': pagination.total,
             'page': page,
             'per_page': per_page,
-            'pages': pagination.pages
+            'pages': pagination.pages,
+            'search_mode': search_mode
         }).to_dict())
         
     except Exception as e:
@@ -202,7 +200,8 @@ def search_knowledge(current_user):
         if not keyword:
             return jsonify(Result.error(message="搜索关键词不能为空").to_dict())
         
-        knowledge_list = KnowledgeBase.search_by_keyword(keyword)
+        limit = request.args.get('limit', 50, type=int)
+        knowledge_list = KnowledgeBase.search_by_keyword(keyword, limit=min(max(limit, 1), 200))
         
         return jsonify(Result.success(data=[knowledge.to_dict() for knowledge in knowledge_list]).to_dict())
         
@@ -1,7 +1,11 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, current_app
 from app.models import OperationLog, EquipmentLog
 from app.models.result import Result
 from app.auth import require_auth, require_role
+from app import job_runner
+from app.utils.pagination import paginate_logs, InvalidCursor
+from app.utils.log_retention import LogRetention, RETENTION_TABLES, submit_retention_job
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
 
 # 创建日志蓝图
@@ -12,23 +16,34 @@ log_bp = Blueprint('logs', __name__)
 def get_operation_logs(current_user):
     """获取操作日志"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
         user_id = request.args.get('user_id', type=int)
         action = request.args.get('action')
+        action_type = request.args.get('action_type')
+        entity_type = request.args.get('entity_type')
+        entity_id = request.args.get('entity_id')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = OperationLog.query
+        query = OperationLog.query.options(joinedload(OperationLog.user))
         
         # 用户过滤
         if user_id:
             query = query.filter_by(user_id=user_id)
         
-        # 操作类型过滤
+        # 操作描述过滤
         if action:
             query = query.filter(OperationLog.action.contains(action))
         
+        # 操作类型过滤
+        if action_type:
+            query = query.filter_by(action_type=action_type)
+        
+        # 操作对象过滤
+        if entity_type:
+            query = query.filter_by(entity_type=entity_type)
+        if entity_id:
+            query = query.filter_by(entity_id=entity_id)
+        
         # 日期范围过滤
         if start_date:
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
@@ -38,24 +53,17 @@ def get_operation_logs(current_user):
             end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
             query = query.filter(OperationLog.created_at < end_dt)
         
-        # 分页
-        pagination = query.order_by(OperationLog.created_at.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # 按 (created_at, id) 游标分页，兼容页码分页
+        data = paginate_logs(query, OperationLog, request.args, 'operation_logs')
+        data['logs'] = [log.to_dict() for log in data.pop('items')]
         
         return jsonify(Result.success(
             message="获取操作日志成功",
-            data={
-                'logs': [log.to_dict() for log in pagination.items],
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'current_page': page,
-                'per_page': per_page
-            }
+            data=data
         ).to_dict())
         
+    except InvalidCursor as e:
+        return jsonify(Result.error(message=str(e), code=400).to_dict())
     except Exception as e:
         return jsonify(Result.error(message=f"获取操作日志失败: {str(e)}").to_dict())
 
@@ -83,8 +91,6 @@ def search_operation_logs(current_user):
 def get_equipment_logs(current_user):
     """获取设备日志"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
         equipment_id = request.args.get('equipment_id')
         log_type = request.args.get('log_type')
         start_date = request.args.get('start_date')
@@ -109,24 +115,17 @@ def get_equipment_logs(current_user):
             end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
             query = query.filter(EquipmentLog.created_at < end_dt)
         
-        # 分页
-        pagination = query.order_by(EquipmentLog.created_at.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # 按 (created_at, id) 游标分页，兼容页码分页
+        data = paginate_logs(query, EquipmentLog, request.args, 'equipment_logs')
+        data['logs'] = [log.to_dict() for log in data.pop('items')]
         
         return jsonify(Result.success(
             message="获取设备日志成功",
-            data={
-                'logs': [log.to_dict() for log in pagination.items],
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'current_page': page,
-                'per_page': per_page
-            }
+            data=data
         ).to_dict())
         
+    except InvalidCursor as e:
+        return jsonify(Result.error(message=str(e), code=400).to_dict())
     except Exception as e:
         return jsonify(Result.error(message=f"获取设备日志失败: {str(e)}").to_dict())
 
@@ -135,29 +134,20 @@ def get_equipment_logs(current_user):
 def get_error_logs(current_user):
     """获取错误日志"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
         
         query = EquipmentLog.query.filter_by(log_type='error')
         
-        # 分页
-        pagination = query.order_by(EquipmentLog.created_at.desc()).paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        # 按 (created_at, id) 游标分页，兼容页码分页
+        data = paginate_logs(query, EquipmentLog, request.args, 'equipment_error_logs')
+        data['logs'] = [log.to_dict() for log in data.pop('items')]
         
         return jsonify(Result.success(
             message="获取错误日志成功",
-            data={
-                'logs': [log.to_dict() for log in pagination.items],
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'current_page': page,
-                'per_page': per_page
-            }
+            data=data
         ).to_dict())
         
+    except InvalidCursor as e:
+        return jsonify(Result.error(message=str(e), code=400).to_dict())
     except Exception as e:
         return jsonify(Result.error(message=f"获取错误日志失败: {str(e)}").to_dict())
 
@@ -239,42 +229,57 @@ def delete_equipment_log(current_user, log_id):
 @log_bp.route('/cleanup', methods=['POST'])
 @require_role(['admin'])
 def cleanup_logs(current_user):
-    """清理旧日志"""
+    """提交旧日志清理任务，由后台分块删除"""
     try:
-        data = request.get_json()
-        days = data.get('days', 30)  # 默认清理30天前的日志
-        
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # 删除旧的操作日志
-        old_operation_logs = OperationLog.query.filter(OperationLog.created_at < cutoff_date)
-        operation_count = old_operation_logs.count()
-        old_operation_logs.delete()
+        data = request.get_json() or {}
+        days = int(data.get('days', 30))  # 默认清理30天前的日志
         
-        # 删除旧的设备日志
-        old_equipment_logs = EquipmentLog.query.filter(EquipmentLog.created_at < cutoff_date)
-        equipment_count = old_equipment_logs.count()
-        old_equipment_logs.delete()
+        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
+        job, created = submit_retention_job({
+            'days': days,
+            'tables': list(RETENTION_TABLES),
+            'user_id': current_user.id,
+            'ip_address': client_ip
+        }, user_id=current_user.id)
+        if not created:
+            return jsonify(Result.error(message="已有日志清理任务在执行中", code=409, data=job.to_dict()).to_dict())
         
-        from app import db
-        db.session.commit()
+        return jsonify(Result.success(message="日志清理任务已提交", data=job.to_dict()).to_dict())
         
-        # 记录清理操作
-        client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        OperationLog.create_log(
-            user_id=current_user.id,
-            action="清理日志",
-            details=f"清理了{days}天前的日志，操作日志: {operation_count}条，设备日志: {equipment_count}条",
-            ip_address=client_ip
-        )
+    except Exception as e:
+        return jsonify(Result.error(message=f"日志清理失败: {str(e)}").to_dict())
         
+@log_bp.route('/retention', methods=['GET'])
+@require_role(['admin'])
+def get_log_retention_status(current_user):
+    """获取日志保留清理的配置和各表清理进度"""
+    try:
+        config = current_app.config
         return jsonify(Result.success(
-            message="日志清理成功",
+            message="获取日志清理状态成功",
             data={
-                'operation_logs_deleted': operation_count,
-                'equipment_logs_deleted': equipment_count
+                'enabled': config['RETENTION_ENABLED'],
+                'days': config['RETENTION_DAYS'],
+                'interval': config['RETENTION_INTERVAL'],
+                'archive': config['RETENTION_ARCHIVE'],
+                'tables': LogRetention(config).load_state()
             }
         ).to_dict())
         
     except Exception as e:
-        return jsonify(Result.error(message=f"日志清理失败: {str(e)}").to_dict())
+        return jsonify(Result.error(message=f"获取日志清理状态失败: {str(e)}").to_dict())
+
+@job_runner.handler('logs.retention')
+def _log_retention_job(context, days, tables=None, user_id=None, ip_address=None):
+    """后台分块清理过期日志，中断后再次执行从上次进度继续"""
+    deleted = LogRetention(current_app.config).run(days, tables or RETENTION_TABLES, context)
+    context.summary = {'days': days, 'deleted': deleted}
+    
+    if user_id:
+        details = '，'.join(f"{table}: {count}条" for table, count in deleted.items())
+        OperationLog.create_log(
+            user_id=user_id,
+            action="清理日志",
+            details=f"清理了{days}天前的日志，{details}",
+            ip_address=ip_address
+        )
@@ -4,6 +4,7 @@ from app.models.menu import Menu
 from app.models.result import Result
 from app.auth import require_auth, require_role, require_permission
 from app import db
+from app.utils.rbac import get_rbac_snapshot
 from sqlalchemy import or_
 import datetime
 
@@ -41,19 +42,8 @@ def get_menu_list(current_user):
 def get_menu_routes(current_user):
     """获取用户可访问的路由菜单"""
     try:
-        # 获取用户权限
-        user_permissions = current_user.get_permissions()
-        
-        # 获取用户可访问的菜单
-        accessible_menus = Menu.get_user_menus(user_permissions)
-        
-        # 转换为路由格式
-        routes = []
-        for menu in accessible_menus:
-            route = menu.to_route_dict()
-            if hasattr(menu, '_filtered_children'):
-                route['children'] = [child.to_route_dict() for child in menu._filtered_children]
-            routes.append(route)
+        # 使用按角色预先构建的路由树
+        routes = get_rbac_snapshot().routes_for(current_user.role_id, current_user.role)
         
         return jsonify(Result.success(
             message="获取用户菜单成功",
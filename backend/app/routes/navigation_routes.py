@@ -4,6 +4,8 @@ from app.models.result import Result
 from app.auth import require_auth, require_role
 from app import db
 from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
+from app.utils.loaders import count_loader
 import datetime
 
 # 创建导览蓝图
@@ -34,19 +36,24 @@ def get_navigation_settings(current_user):
             query = query.filter_by(status=status)
         
         # 分页
-        pagination = query.order_by(NavigationSettings.updated_at.desc()).paginate(
+        pagination = query.options(joinedload(NavigationSettings.updater)).order_by(
+            NavigationSettings.updated_at.desc()
+        ).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
         
+        # 批量统计本页各设备的导览点位数量
+        point_counts = count_loader(NavigationPoint.equipment_id).load_many(
+            [setting.equipment_id for setting in pagination.items]
+        )
+        
         # 获取详细信息
         settings_data = []
         for setting in pagination.items:
             setting_dict = setting.to_dict()
-            # 获取该设置下的导览点位数量
-            point_count = NavigationPoint.query.filter_by(equipment_id=setting.equipment_id).count()
-            setting_dict['point_count'] = point_count
+            setting_dict['point_count'] = point_counts.get(setting.equipment_id, 0)
             settings_data.append(setting_dict)
         
         return jsonify(Result.success(
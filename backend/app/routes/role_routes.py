@@ -6,6 +6,8 @@ from app.models.result import Result
 from app.auth import require_auth, require_role, require_permission
 from app import db
 from sqlalchemy import or_
+from sqlalchemy.orm import joinedload
+from app.utils.loaders import count_loader, group_loader
 import datetime
 
 # 创建角色管理蓝图
@@ -36,18 +38,33 @@ def get_role_list(current_user):
             ))
         
         # 分页
-        pagination = query.order_by(Role.sort_order.asc(), Role.created_at.desc()).paginate(
+        pagination = query.options(joinedload(Role.creator)).order_by(
+            Role.sort_order.asc(), Role.created_at.desc()
+        ).paginate(
             page=page, 
             per_page=per_page, 
             error_out=False
         )
         
+        # 批量加载本页角色的权限和用户数，以及这些权限关联的角色数
+        role_ids = [role.id for role in pagination.items]
+        role_permissions = group_loader(
+            db.session.query(RolePermission.role_id, Permission).join(
+                Permission, Permission.id == RolePermission.permission_id
+            ).options(joinedload(Permission.creator)),
+            RolePermission.role_id
+        ).load_many(role_ids)
+        user_counts = count_loader(User.role_id).load_many(role_ids)
+        permission_role_counts = count_loader(RolePermission.permission_id).load_many(
+            [permission.id for permissions in role_permissions.values() for permission in permissions]
+        )
+        
         roles_data = []
         for role in pagination.items:
-            role_dict = role.to_dict()
+            permissions = role_permissions[role.id]
+            role_dict = role.to_dict(permission_count=len(permissions), user_count=user_counts[role.id])
             # 获取权限信息
-            permissions = role.get_permissions()
-            role_dict['permissions'] = [p.to_dict() for p in permissions]
+            role_dict['permissions'] = [p.to_dict(role_count=permission_role_counts[p.id]) for p in permissions]
             roles_data.append(role_dict)
         
         return jsonify(Result.success(
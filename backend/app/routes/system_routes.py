@@ -1,8 +1,11 @@
 from flask import request, jsonify, Blueprint
-from app.models import SystemSettings, OperationLog
+from app.models import SystemSettings, OperationLog, UserSession
 from app.models.result import Result
 from app.auth import require_auth, require_role
-from app import db
+from app.utils.pagination import paginate_logs, InvalidCursor
+from app.utils.log_retention import submit_retention_job
+from app import metrics_sampler, request_metrics, query_profiler
+from sqlalchemy.orm import joinedload
 from sqlalchemy import or_, and_, func
 import datetime
 import json
@@ -211,23 +214,21 @@ def get_system_info(current_user):
 def get_system_logs(current_user):
     """获取系统日志"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
         log_level = request.args.get('level')
         action_type = request.args.get('action_type')
         user_id = request.args.get('user_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        query = OperationLog.query
+        query = OperationLog.query.options(joinedload(OperationLog.user))
         
         # 日志级别过滤
         if log_level:
             query = query.filter_by(level=log_level)
         
-        # 操作类型过滤 (使用action字段)
+        # 操作类型过滤
         if action_type:
-            query = query.filter_by(action=action_type)
+            query = query.filter_by(action_type=action_type)
         
         # 用户过滤
         if user_id:
@@ -248,26 +249,17 @@ def get_system_logs(current_user):
             except ValueError:
                 pass
         
-        # 分页
-        pagination = query.order_by(OperationLog.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # 按 (created_at, id) 游标分页，兼容页码分页
+        data = paginate_logs(query, OperationLog, request.args, 'system_logs')
+        data['logs'] = [log.to_dict() for log in data.pop('items')]
         
         return jsonify(Result.success(
             message="获取系统日志成功",
-            data={
-                'logs': [log.to_dict() for log in pagination.items],
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'current_page': page,
-                'per_page': per_page,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
+            data=data
         ).to_dict())
         
+    except InvalidCursor as e:
+        return jsonify(Result.error(message=str(e), code=400).to_dict())
     except Exception as e:
         return jsonify(Result.error(message=f"获取系统日志失败: {str(e)}").to_dict())
 
@@ -275,33 +267,24 @@ def get_system_logs(current_user):
 @system_bp.route('/logs/cleanup', methods=['POST'])
 @require_role(['admin'])
 def cleanup_system_logs(current_user):
-    """清理系统日志"""
+    """提交系统日志清理任务，由后台分块删除"""
     try:
-        data = request.get_json()
-        days_to_keep = data.get('days_to_keep', 30)
-        
-        # 计算删除日期
-        cutoff_date = datetime.datetime.utcnow() - datetime.timedelta(days=days_to_keep)
+        data = request.get_json() or {}
+        days_to_keep = int(data.get('days_to_keep', 30))
         
-        # 删除旧日志
-        deleted_count = OperationLog.query.filter(
-            OperationLog.created_at < cutoff_date
-        ).delete()
-        
-        db.session.commit()
-        
-        # 记录操作日志
         client_ip = request.environ.get('HTTP_X_REAL_IP', request.remote_addr)
-        OperationLog.create_log(
-            user_id=current_user.id,
-            action="清理系统日志",
-            details=f"删除了 {deleted_count} 条日志记录",
-            ip_address=client_ip
-        )
+        job, created = submit_retention_job({
+            'days': days_to_keep,
+            'tables': ['operation_logs'],
+            'user_id': current_user.id,
+            'ip_address': client_ip
+        }, user_id=current_user.id)
+        if not created:
+            return jsonify(Result.error(message="已有日志清理任务在执行中", code=409, data=job.to_dict()).to_dict())
         
         return jsonify(Result.success(
-            message=f"系统日志清理完成，删除了 {deleted_count} 条记录",
-            data={"deleted_count": deleted_count}
+            message="系统日志清理任务已提交",
+            data=job.to_dict()
         ).to_dict())
         
     except Exception as e:
@@ -404,12 +387,23 @@ def get_system_backups(current_user):
     except Exception as e:
         return jsonify(Result.error(message=f"获取备份列表失败: {str(e)}").to_dict())
 
+def _threshold_status(percent, warning=80, critical=95):
+    """按使用率阈值判断状态"""
+    if percent >= critical:
+        return "critical"
+    if percent >= warning:
+        return "warning"
+    return "healthy"
+
 # 系统健康检查
 @system_bp.route('/health', methods=['GET'])
 @require_auth
 def get_system_health(current_user):
     """获取系统健康状态"""
     try:
+        metrics = metrics_sampler.get_current()
+        disk_free = metrics['disk_total'] - metrics['disk_used']
+        
         # 检查各个组件的健康状态
         health_status = {
             "overall_status": "healthy",
@@ -421,9 +415,9 @@ def get_system_health(current_user):
                     "connections": 5
                 },
                 "file_system": {
-                    "status": "healthy",
-                    "disk_usage": "45%",
-                    "available_space": "2.5GB"
+                    "status": _threshold_status(metrics['disk_percent']),
+                    "disk_usage": f"{metrics['disk_percent']:.0f}%",
+                    "available_space": f"{disk_free / 1024 ** 3:.1f}GB"
                 },
                 "external_services": {
                     "status": "healthy",
@@ -437,13 +431,24 @@ def get_system_health(current_user):
                 }
             },
             "metrics": {
-                "cpu_usage": "25%",
-                "memory_usage": "60%",
-                "disk_usage": "45%",
+                "cpu_usage": f"{metrics['cpu_percent']:.0f}%",
+                "memory_usage": f"{metrics['memory_percent']:.0f}%",
+                "disk_usage": f"{metrics['disk_percent']:.0f}%",
+                "load_average": [metrics['load_1'], metrics['load_5'], metrics['load_15']],
                 "network_latency": "< 5ms"
             }
         }
         
+        statuses = [
+            health_status["components"]["file_system"]["status"],
+            _threshold_status(metrics['cpu_percent']),
+            _threshold_status(metrics['memory_percent'])
+        ]
+        if "critical" in statuses:
+            health_status["overall_status"] = "critical"
+        elif "warning" in statuses:
+            health_status["overall_status"] = "warning"
+        
         return jsonify(Result.success(
             message="获取系统健康状态成功",
             data=health_status
@@ -491,39 +496,61 @@ def restart_system(current_user):
 def get_system_performance(current_user):
     """获取系统性能数据"""
     try:
-        # 获取性能统计数据
-        # 这些数据可能来自监控系统或实时计算
+        # 当前值取自后台采样线程的最新采样点，history 为环形缓冲区中降采样后的历史序列，
+        # endpoints 为各接口的延迟分位数和错误数，slow_requests 为最近的慢请求
+        points = min(max(request.args.get('points', 60, type=int), 1), 500)
+        minutes = request.args.get('minutes', type=int)
+        # 接口指标排序字段: count/error_count/avg/max/p50/p95/p99
+        sort = request.args.get('sort', 'p95')
+        if sort not in ('count', 'error_count', 'avg', 'max', 'p50', 'p95', 'p99'):
+            return jsonify(Result.error(message=f"不支持的排序字段: {sort}", code=400).to_dict())
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        since = datetime.datetime.utcnow().timestamp() - minutes * 60 if minutes else None
+        
+        metrics = metrics_sampler.get_current()
+        memory_used = metrics['memory_total'] - metrics['memory_available']
         performance_data = {
-            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "timestamp": datetime.datetime.utcfromtimestamp(metrics['timestamp']).isoformat(),
             "cpu": {
-                "usage_percent": 25.5,
-                "load_average": [1.2, 1.1, 1.0],
-                "cores": 4
+                "usage_percent": metrics['cpu_percent'],
+                "load_average": [metrics['load_1'], metrics['load_5'], metrics['load_15']],
+                "cores": metrics['cpu_cores']
             },
             "memory": {
-                "total": 8589934592,  # 8GB
-                "used": 5150765056,   # ~4.8GB
-                "available": 3439169536,  # ~3.2GB
-                "usage_percent": 60.0
+                "total": int(metrics['memory_total']),
+                "used": int(memory_used),
+                "available": int(metrics['memory_available']),
+                "usage_percent": metrics['memory_percent']
             },
             "disk": {
-                "total": 107374182400,  # 100GB
-                "used": 48318382080,    # ~45GB
-                "available": 59055800320,  # ~55GB
-                "usage_percent": 45.0
+                "total": int(metrics['disk_total']),
+                "used": int(metrics['disk_used']),
+                "available": int(metrics['disk_total'] - metrics['disk_used']),
+                "usage_percent": metrics['disk_percent']
             },
             "network": {
-                "bytes_sent": 1048576000,  # 1GB
-                "bytes_received": 2097152000,  # 2GB
-                "packets_sent": 1000000,
-                "packets_received": 1500000
+                "bytes_sent": metrics.get('net_bytes_sent', 0),
+                "bytes_received": metrics.get('net_bytes_recv', 0),
+                "packets_sent": metrics.get('net_packets_sent', 0),
+                "packets_received": metrics.get('net_packets_recv', 0),
+                "send_rate": round(metrics['net_sent_rate'], 2),
+                "receive_rate": round(metrics['net_recv_rate'], 2)
             },
-            "application": {
-                "active_connections": 25,
-                "total_requests": 150000,
-                "response_time_avg": 120,  # ms
-                "error_rate": 0.01  # 1%
-            }
+            "application": dict(
+                request_metrics.get_summary(),
+                active_connections=UserSession.count_online_users(),
+                process_rss=int(metrics['process_rss']),
+                process_threads=int(metrics['process_threads']),
+                uptime=metrics['uptime']
+            ),
+            "endpoints": request_metrics.get_routes(sort, limit),
+            "slow_requests": request_metrics.get_slow_requests(limit),
+            "sampler": {
+                "running": metrics_sampler.running,
+                "interval": metrics_sampler.interval,
+                "samples": len(metrics_sampler.buffer)
+            },
+            "history": metrics_sampler.get_history(points, since)
         }
         
         return jsonify(Result.success(
@@ -534,6 +561,44 @@ def get_system_performance(current_user):
     except Exception as e:
         return jsonify(Result.error(message=f"获取系统性能数据失败: {str(e)}").to_dict())
 
+# SQL 分析
+@system_bp.route('/query-profile', methods=['GET'])
+@require_role(['admin'])
+def get_query_profile(current_user):
+    """获取各接口的 SQL 条数、数据库耗时和疑似 N+1 查询"""
+    try:
+        # 排序字段: queries_avg/queries_max/db_time_avg/db_time_max/n_plus_one_requests
+        sort = request.args.get('sort', 'queries_avg')
+        if sort not in ('queries_avg', 'queries_max', 'db_time_avg', 'db_time_max', 'n_plus_one_requests'):
+            return jsonify(Result.error(message=f"不支持的排序字段: {sort}", code=400).to_dict())
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        
+        config = query_profiler.app.config
+        return jsonify(Result.success(
+            message="获取SQL分析数据成功",
+            data={
+                "enabled": config['PROFILER_ENABLED'],
+                "header": config['PROFILER_ALLOW_HEADER'],
+                "sample_rate": config['PROFILER_SAMPLE_RATE'],
+                "n_plus_one_threshold": config['PROFILER_N_PLUS_ONE_THRESHOLD'],
+                "routes": query_profiler.get_routes(sort, limit)
+            }
+        ).to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"获取SQL分析数据失败: {str(e)}").to_dict())
+
+@system_bp.route('/query-profile', methods=['DELETE'])
+@require_role(['admin'])
+def reset_query_profile(current_user):
+    """清空SQL分析数据"""
+    try:
+        query_profiler.reset()
+        return jsonify(Result.success(message="SQL分析数据已清空").to_dict())
+    
+    except Exception as e:
+        return jsonify(Result.error(message=f"清空SQL分析数据失败: {str(e)}").to_dict())
+
 # 系统设置重置
 @system_bp.route('/reset', methods=['POST'])
 @require_role(['admin'])
@@ -5,6 +5,7 @@ from app.models.result import Result
 from app.auth import require_auth, require_role
 from app import db
 from sqlalchemy import or_
+from app.utils.loaders import count_loader
 import datetime
 
 # 创建用户蓝图
@@ -50,14 +51,15 @@ def get_users(current_user):
             error_out=False
         )
         
-        # 获取用户在线状态
+        # 批量统计本页用户的活跃会话数，获取用户在线状态
+        active_sessions = count_loader(UserSession.user_id, UserSession.is_active == True).load_many(
+            [user.id for user in pagination.items]
+        )
         users_data = []
         for user in pagination.items:
             user_dict = user.to_dict()
-            # 检查是否有活跃会话
-            active_sessions = UserSession.get_user_sessions(user.id, active_only=True)
-            user_dict['is_online'] = len(active_sessions) > 0
-            user_dict['active_sessions'] = len(active_sessions)
+            user_dict['is_online'] = active_sessions[user.id] > 0
+            user_dict['active_sessions'] = active_sessions[user.id]
             users_data.append(user_dict)
         
         return jsonify(Result.success(
@@ -281,11 +283,7 @@ def get_user_statistics(current_user):
         recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
         
         # 在线用户统计
-        online_count = 0
-        for user in User.get_all():
-            active_sessions = UserSession.get_user_sessions(user.id, active_only=True)
-            if active_sessions:
-                online_count += 1
+        online_count = UserSession.count_online_users()
         
         return jsonify(Result.success(
             message="获取用户统计成功",
@@ -0,0 +1,255 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 写入失败后重试的等待时间(秒)
+RETRY_INTERVAL = 5
+
+
+def _encode(row):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+
+def _decode(data):
+    row = dict(data)
+    if row.get('created_at'):
+        row['created_at'] = datetime.fromisoformat(row['created_at'])
+    return row
+
+
+class AuditSink(object):
+    """
+    操作日志异步写入器
+    日志先追加到本地日志文件(journal)再放入有界队列，写入线程每隔一段时间或攒够一批后批量 INSERT，
+    写入成功后记录检查点；进程崩溃后下次启动时从检查点重放未写入的日志（至少写入一次）。
+    写入线程由启动脚本调用 start() 启动，未启动或队列已满时由调用方同步写入。
+    启动时对 journal 加独占文件锁，多进程部署时只有取得锁的进程异步写入，其余进程同步写入
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._journal = None
+        self._journal_lock = None
+        self._journal_offset = 0
+        self.enqueued = 0
+        self.written = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config['AUDIT_QUEUE_SIZE'])
+        app.extensions['audit_sink'] = self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def journal_path(self):
+        return self.app.config['AUDIT_JOURNAL']
+
+    @property
+    def checkpoint_path(self):
+        return self.journal_path + '.checkpoint'
+
+    def start(self):
+        """
+        重放上次未写入的日志并启动写入线程
+        使用 reloader 时只应在重载子进程中启动（WERKZEUG_RUN_MAIN=true）；journal 已被其他进程锁定时不启动
+        """
+        if self.app is None or self.running:
+            return False
+        if not self.app.config.get('AUDIT_ASYNC', False):
+            return False
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.journal_path)), exist_ok=True)
+        if not self._lock_journal():
+            logger.warning(f"操作日志 journal 已被其他进程使用，本进程同步写入操作日志: {self.journal_path}")
+            return False
+        with self.app.app_context():
+            self.replay()
+
+        self._journal = open(self.journal_path, 'ab')
+        self._journal_offset = self._journal.tell()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+        return True
+
+    def _lock_journal(self):
+        """对 journal 加独占锁，避免多个进程重放或截断同一个 journal"""
+        try:
+            import fcntl
+        except ImportError:
+            return True
+
+        lock_file = open(self.journal_path + '.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._journal_lock = lock_file
+        return True
+
+    def shutdown(self, timeout=10):
+        """停止写入线程，队列中剩余的日志写入后退出，未写入的日志保留在 journal 中"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._journal_lock is not None:
+                self._journal_lock.close()
+                self._journal_lock = None
+
+    def enqueue(self, row):
+        """
+        日志进入写入队列
+        :param row: operation_logs 行数据，需包含 created_at
+        :return: 是否已进入队列，返回 False 时调用方应同步写入
+        """
+        with self._lock:
+            if self._journal is None or not self.running or self._queue.full():
+                self.rejected += 1
+                return False
+            line = (json.dumps(_encode(row), ensure_ascii=False) + '\n').encode('utf-8')
+            self._journal.write(line)
+            self._journal.flush()
+            self._journal_offset += len(line)
+            self._queue.put_nowait((row, self._journal_offset))
+            self.enqueued += 1
+        return True
+
+    def write_now(self, row):
+        """使用独立连接同步写入一条日志，不影响当前会话的事务"""
+        self._insert([row])
+        self.written += 1
+        return True
+
+    def replay(self):
+        """
+        将 journal 中检查点之后的日志写入数据库，完成后清空 journal
+        :return: 重放的日志条数
+        """
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        offset = 0
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, 'r') as f:
+                offset = int(f.read().strip() or 0)
+
+        rows = []
+        with open(self.journal_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    rows.append(_decode(json.loads(line)))
+                except ValueError:
+                    # 崩溃时写了一半的最后一行
+                    logger.warning("跳过无法解析的操作日志记录")
+
+        batch_size = self.app.config['AUDIT_BATCH_SIZE']
+        for start in range(0, len(rows), batch_size):
+            self._insert(rows[start:start + batch_size])
+
+        with open(self.journal_path, 'wb'):
+            pass
+        self._save_checkpoint(0)
+        if rows:
+            logger.info(f"已重放 {len(rows)} 条未写入的操作日志")
+        self.replayed += len(rows)
+        return len(rows)
+
+    def get_stats(self):
+        """写入器统计"""
+        return {
+            'running': self.running,
+            'pending': self._queue.qsize() if self._queue is not None else 0,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'replayed': self.replayed,
+            'rejected': self.rejected,
+            'failed_batches': self.failed_batches
+        }
+
+    def _insert(self, rows):
+        from app import db
+        from app.models.operation_log import OperationLog
+        with db.engine.begin() as conn:
+            conn.execute(OperationLog.__table__.insert(), rows)
+
+    def _save_checkpoint(self, offset):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _collect(self, batch):
+        """等待日志直到攒够一批或到达写入间隔"""
+        batch_size = self.app.config['AUDIT_BATCH_SIZE']
+        deadline = time.monotonic() + self.app.config['AUDIT_FLUSH_INTERVAL'] / 1000.0
+        while len(batch) < batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+    def _run(self):
+        batch = []
+        while True:
+            self._collect(batch)
+            if not batch:
+                if self._stop_event.is_set():
+                    break
+                continue
+
+            if self._write(batch):
+                batch = []
+            elif self._stop_event.is_set():
+                break
+            else:
+                self._stop_event.wait(RETRY_INTERVAL)
+
+    def _write(self, batch):
+        try:
+            with self.app.app_context():
+                self._insert([row for row, _ in batch])
+        except Exception:
+            self.failed_batches += 1
+            logger.exception(f"操作日志批量写入失败，{len(batch)} 条日志稍后重试")
+            return False
+
+        self.written += len(batch)
+        offset = batch[-1][1]
+        with self._lock:
+            # 已全部写入时清空 journal，避免文件无限增长
+            if self._journal is not None and offset == self._journal_offset and self._queue.empty():
+                self._journal.truncate(0)
+                self._journal_offset = 0
+                offset = 0
+            self._save_checkpoint(offset)
+        return True
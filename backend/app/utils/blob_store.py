@@ -0,0 +1,157 @@
+import glob
+import hashlib
+import os
+import threading
+import time
+import uuid
+from app.utils.unit_of_work import after_commit
+
+# 流式写入和计算哈希的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 上传占用文件后的保护时长(秒)，需长于一次上传请求从保存文件到提交记录的时间
+CLAIM_TTL = 300
+
+
+class Blob(object):
+    """已保存的内容寻址文件"""
+
+    def __init__(self, digest, path, size, created, claim=None):
+        self.digest = digest
+        self.path = path
+        self.size = size
+        # 本次保存是否新建了文件，内容已存在时为 False
+        self.created = created
+        # 本次保存对文件的占用标记，discard 时释放
+        self.claim = claim
+
+
+def hash_file(path):
+    """计算文件的 SHA-256"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class BlobStore(object):
+    """
+    内容寻址文件存储
+    文件按 SHA-256 保存为 <root>/<哈希前两位>/<哈希><扩展名>，内容相同的上传只保存一份，
+    引用计数由引用该路径的记录数决定
+    """
+
+    def __init__(self, root):
+        self.root = root
+        # 最近被上传占用的文件: 路径 -> {占用标记: 占用时间}，占用期间不删除，避免删除与引用同一内容的上传并发
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest, ext=''):
+        """获取哈希对应的文件路径"""
+        return os.path.join(self.root, digest[:2], f"{digest}{ext.lower()}")
+
+    def exists(self, digest, ext=''):
+        """哈希对应的文件是否已存在"""
+        return os.path.exists(self.blob_path(digest, ext))
+
+    def contains(self, path):
+        """路径是否位于本存储中"""
+        return os.path.abspath(path).startswith(os.path.abspath(self.root) + os.sep)
+
+    def claim(self, path):
+        """
+        声明即将引用该文件，CLAIM_TTL 内不会被 release 删除
+        :return: 文件是否存在
+        """
+        with self._lock:
+            self._add_claim(path)
+            return os.path.exists(path)
+
+    def _add_claim(self, path):
+        token = uuid.uuid4().hex
+        self._claims.setdefault(path, {})[token] = time.monotonic()
+        return token
+
+    def _is_claimed(self, path):
+        now = time.monotonic()
+        for claimed_path, claims in list(self._claims.items()):
+            for token, claimed_at in list(claims.items()):
+                if now - claimed_at > CLAIM_TTL:
+                    del claims[token]
+            if not claims:
+                del self._claims[claimed_path]
+        return path in self._claims
+
+    def save(self, stream, ext=''):
+        """
+        流式写入临时文件并同时计算哈希，内容已存在时丢弃临时文件
+        :return: Blob
+        """
+        tmp_folder = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_folder, exist_ok=True)
+        tmp_path = os.path.join(tmp_folder, uuid.uuid4().hex)
+
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    sha256.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            digest = sha256.hexdigest()
+            path = self.blob_path(digest, ext)
+            # 先占用再判断是否存在，与 release 的删除互斥
+            with self._lock:
+                claim = self._add_claim(path)
+                if os.path.exists(path):
+                    os.remove(tmp_path)
+                    return Blob(digest, path, size, created=False, claim=claim)
+
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                return Blob(digest, path, size, created=True, claim=claim)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def discard(self, blob):
+        """
+        释放本次保存的占用并丢弃新建的文件，用于保存记录失败时清理
+        文件仍被其他上传占用时保留，与 release 一样在锁内判断
+        """
+        with self._lock:
+            claims = self._claims.get(blob.path, {})
+            claims.pop(blob.claim, None)
+            if not claims:
+                self._claims.pop(blob.path, None)
+            if not blob.created or self._is_claimed(blob.path):
+                return
+            if os.path.exists(blob.path):
+                os.remove(blob.path)
+
+    def release(self, path, ref_count, recount=None):
+        """
+        释放一次引用，最后一个引用删除后在事务提交时删除文件及其派生文件
+        删除前在锁内重新检查：文件被并发上传占用，或 recount 返回的已提交引用数大于 0 时保留文件
+        :param ref_count: 删除当前记录后剩余的引用数
+        :param recount: 事务提交后统计已提交引用数的函数，参数为路径
+        """
+        if not path or not self.contains(path) or ref_count > 0:
+            return False
+
+        def remove():
+            with self._lock:
+                if self._is_claimed(path) or (recount is not None and recount(path) > 0):
+                    return
+                # 同时删除保存在文件旁边的派生文件（缩略图等）
+                for target in [path] + glob.glob(glob.escape(path) + '.*'):
+                    if os.path.exists(target):
+                        os.remove(target)
+
+        after_commit(remove)
+        return True
@@ -0,0 +1,215 @@
+import json
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from app.utils.db_events import register_commit_listener
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend(object):
+    """进程内 LRU + TTL 缓存，多进程部署时各进程独立"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        # 命名空间版本号单独保存，不参与 LRU 淘汰
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'type': 'memory', 'entries': len(self._data), 'max_entries': self.max_entries}
+
+
+class RedisBackend(object):
+    """Redis 共享缓存，多进程/多实例部署时使用"""
+
+    def __init__(self, url, key_prefix='g1edu:cache:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def get(self, key):
+        value = self.client.get(self.key_prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.key_prefix + key, pickle.dumps(value), ex=timeout or None)
+
+    def delete(self, key):
+        self.client.delete(self.key_prefix + key)
+
+    def get_counter(self, key):
+        value = self.client.get(self.key_prefix + 'counter:' + key)
+        return int(value) if value is not None else 0
+
+    def incr(self, key):
+        return self.client.incr(self.key_prefix + 'counter:' + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.key_prefix + '*'):
+            self.client.delete(key)
+
+    def stats(self):
+        return {'type': 'redis'}
+
+
+class Cache(object):
+    """
+    响应缓存
+    按命名空间组织缓存键，命名空间通过版本号失效；
+    声明了依赖模型的命名空间会在这些模型的写入事务提交后自动失效
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_timeout = 60
+        # 模型类名 -> 依赖该模型的命名空间
+        self._dependencies = {}
+        self._namespaces = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.default_timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+        self.backend = self._create_backend(app.config)
+        app.extensions['cache'] = self
+        register_commit_listener(self._on_commit)
+
+    def _create_backend(self, config):
+        if config.get('CACHE_TYPE') == 'redis':
+            try:
+                return RedisBackend(config.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+            except ImportError:
+                logger.warning("未安装 redis，缓存回退为进程内存储")
+        return MemoryBackend(config.get('CACHE_MAX_ENTRIES', 1024))
+
+    def version(self, namespace):
+        """获取命名空间当前版本号，可用于判断进程内派生数据是否需要重建"""
+        return self.backend.get_counter(f'ns:{namespace}')
+
+    def _versioned_key(self, namespace, key):
+        return f'{namespace}:{self.version(namespace)}:{key}'
+
+    def get(self, namespace, key):
+        """获取缓存值，后端异常时视为未命中"""
+        try:
+            return self.backend.get(self._versioned_key(namespace, key))
+        except Exception:
+            logger.exception("读取缓存失败")
+            return None
+
+    def set(self, namespace, key, value, timeout=None):
+        """写入缓存值"""
+        try:
+            self.backend.set(self._versioned_key(namespace, key), value, timeout or self.default_timeout)
+        except Exception:
+            logger.exception("写入缓存失败")
+
+    def invalidate(self, *namespaces):
+        """使命名空间下的全部缓存失效"""
+        for namespace in namespaces:
+            try:
+                self.backend.incr(f'ns:{namespace}')
+            except Exception:
+                logger.exception(f"缓存失效失败: {namespace}")
+
+    def invalidate_prefix(self, prefix):
+        """使指定前缀的全部已注册命名空间失效，返回失效的命名空间"""
+        namespaces = sorted(ns for ns in self._namespaces if ns.startswith(prefix))
+        self.invalidate(*namespaces)
+        return namespaces
+
+    def depends_on(self, namespace, *models):
+        """声明命名空间依赖的模型，模型写入提交后该命名空间自动失效"""
+        self._namespaces.add(namespace)
+        for model in models:
+            name = model if isinstance(model, str) else model.__name__
+            self._dependencies.setdefault(name, set()).add(namespace)
+
+    def _on_commit(self, changes):
+        namespaces = set()
+        for class_name in changes:
+            namespaces.update(self._dependencies.get(class_name, ()))
+        if namespaces:
+            self.invalidate(*namespaces)
+
+    def stats(self):
+        """获取缓存状态"""
+        return self.backend.stats() if self.backend else {}
+
+    def cached(self, namespace, depends_on=(), timeout=None):
+        """
+        缓存接口响应的装饰器，放在 require_auth 等鉴权装饰器之下
+        缓存键为请求路径和排序后的查询参数，只缓存 code 为 200 的响应
+        """
+        self.depends_on(namespace, *depends_on)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                key = request.path + '?' + '&'.join(
+                    f'{k}={v}' for k, v in sorted(request.args.items(multi=True))
+                )
+                body = self.get(namespace, key)
+                if body is not None:
+                    response = current_app.response_class(body, mimetype='application/json')
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code == 200 and response.mimetype == 'application/json':
+                    body = response.get_data()
+                    try:
+                        cacheable = json.loads(body).get('code') == 200
+                    except ValueError:
+                        cacheable = False
+                    if cacheable:
+                        self.set(namespace, key, body, timeout)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+
+            return decorated
+        return decorator
@@ -0,0 +1,116 @@
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 事务提交后的回调列表
+_commit_listeners = []
+
+# 本事务内的变更记录保存在 session.info 中
+_CHANGES_KEY = 'committed_changes'
+
+# 本事务提交后执行一次的回调
+_ON_COMMIT_KEY = 'on_commit_callbacks'
+
+# 本事务回滚后执行一次的回调
+_ON_ROLLBACK_KEY = 'on_rollback_callbacks'
+
+
+def register_commit_listener(callback):
+    """
+    注册事务提交回调
+    回调参数为本次提交涉及的变更: {模型类名: 主键集合}，批量更新/删除无法确定主键时值为 None
+    回调在 after_commit 中执行，不能再操作数据库
+    """
+    if callback not in _commit_listeners:
+        _commit_listeners.append(callback)
+    return callback
+
+
+def on_commit(session, callback):
+    """
+    注册在当前事务提交后执行一次的回调，事务回滚时丢弃
+    适用于删除文件等不能随事务回滚的操作
+    """
+    session.info.setdefault(_ON_COMMIT_KEY, []).append(callback)
+
+
+def on_rollback(session, callback):
+    """
+    注册在当前事务回滚后执行一次的回调，事务提交时丢弃
+    适用于清理已写入但不能随事务回滚的文件
+    """
+    # 确保事务已占用连接，回滚时才会触发 after_rollback
+    session.connection()
+    session.info.setdefault(_ON_ROLLBACK_KEY, []).append(callback)
+
+
+def _record(session, class_name, pk=None, unknown=False):
+    changes = session.info.setdefault(_CHANGES_KEY, {})
+    if unknown or changes.get(class_name, set()) is None:
+        changes[class_name] = None
+        return
+    changes.setdefault(class_name, set()).add(pk)
+
+
+def _primary_key(obj):
+    identity = inspect(obj).identity
+    if not identity:
+        return None
+    return identity[0] if len(identity) == 1 else identity
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    """记录ORM对象的新增、修改和删除"""
+    for obj in session.new:
+        _record(session, type(obj).__name__, _primary_key(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _record(session, type(obj).__name__, _primary_key(obj))
+    for obj in session.deleted:
+        _record(session, type(obj).__name__, _primary_key(obj))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(orm_execute_state):
+    """记录 query.update()/delete() 及 insert()/update()/delete() 语句的批量变更"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _record(orm_execute_state.session, mapper.class_.__name__, unknown=True)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    session.info.pop(_ON_ROLLBACK_KEY, None)
+    for callback in session.info.pop(_ON_COMMIT_KEY, []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("事务提交回调执行失败")
+
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    for callback in list(_commit_listeners):
+        try:
+            callback(changes)
+        except Exception:
+            logger.exception("事务提交回调执行失败")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    # 回滚到保存点时外层事务仍会提交，保留已记录的变更（多记录只会导致多余的缓存失效）
+    if session.in_nested_transaction():
+        return
+    session.info.pop(_CHANGES_KEY, None)
+    session.info.pop(_ON_COMMIT_KEY, None)
+    for callback in session.info.pop(_ON_ROLLBACK_KEY, []):
+        try:
+            callback()
+        except Exception:
+            logger.exception("事务回滚回调执行失败")
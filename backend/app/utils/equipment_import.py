@@ -0,0 +1,133 @@
+from sqlalchemy import insert
+from app import db
+from app.models import Equipment
+from app.utils.tabular import iter_table_chunks, DEFAULT_CHUNK_SIZE
+
+# 导入文件必需的列
+REQUIRED_COLUMNS = ['设备ID', '设备位置']
+
+# 允许导入的设备状态
+IMPORT_STATUSES = ('online', 'offline', 'error')
+
+# 导入模式: partial 每块单独提交，失败行跳过；atomic 任意一行失败则全部不导入
+IMPORT_MODES = ('partial', 'atomic')
+
+
+def _validate_chunk(chunk, seen_ids):
+    """
+    校验一块数据，返回 (待插入的设备数据, 失败行列表)
+    设备ID是否已存在通过一次 IN 查询批量判断
+    """
+    failed_items = []
+    candidates = []
+    for row_number, row in chunk:
+        equipment_id = row.get('设备ID')
+        location = row.get('设备位置')
+        if not equipment_id:
+            failed_items.append({'row': row_number, 'error': '设备ID不能为空'})
+        elif len(equipment_id) > 50:
+            failed_items.append({'row': row_number, 'error': '设备ID长度不能超过50个字符'})
+        elif not location:
+            failed_items.append({'row': row_number, 'error': '设备位置不能为空'})
+        elif equipment_id in seen_ids:
+            failed_items.append({'row': row_number, 'error': '文件中设备ID重复'})
+        else:
+            seen_ids.add(equipment_id)
+            candidates.append((row_number, row))
+
+    existing_ids = set()
+    if candidates:
+        existing_ids = {
+            equipment_id for equipment_id, in db.session.query(Equipment.id).filter(
+                Equipment.id.in_([row['设备ID'] for _, row in candidates])
+            )
+        }
+
+    mappings = []
+    for row_number, row in candidates:
+        if row['设备ID'] in existing_ids:
+            failed_items.append({'row': row_number, 'error': '设备ID已存在'})
+            continue
+
+        status = (row.get('状态') or 'offline').lower()
+        if status not in IMPORT_STATUSES:
+            status = 'offline'
+        mappings.append({
+            'id': row['设备ID'],
+            'location': row['设备位置'],
+            'ip_address': row.get('IP地址'),
+            'status': status,
+            'usage_rate': row.get('使用率') or '0%',
+            'is_offline': status == 'offline',
+            'has_error': status == 'error'
+        })
+
+    return mappings, failed_items
+
+
+def import_equipment(stream, filename, mode='partial', dry_run=False,
+                     chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    流式批量导入设备
+    每块数据一次 IN 查询校验、一次批量插入；partial 模式每块一个事务，atomic 模式整体一个事务
+    :param progress: 进度回调 progress(已处理行数, 成功数, 失败数)
+    :return: 导入结果统计
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"不支持的导入模式: {mode}")
+
+    success_count = 0
+    total_count = 0
+    failed_items = []
+    seen_ids = set()
+
+    try:
+        for chunk in iter_table_chunks(stream, filename, chunk_size):
+            total_count += len(chunk)
+            mappings, chunk_failed = _validate_chunk(chunk, seen_ids)
+            failed_items.extend(chunk_failed)
+
+            if mappings and not dry_run:
+                if mode == 'partial':
+                    try:
+                        db.session.execute(insert(Equipment), mappings)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        rows = {mapping['id'] for mapping in mappings}
+                        failed_items.extend(
+                            {'row': row_number, 'error': f'处理错误: {str(e)}'}
+                            for row_number, row in chunk if row.get('设备ID') in rows
+                        )
+                        mappings = []
+                else:
+                    db.session.execute(insert(Equipment), mappings)
+            success_count += len(mappings)
+
+            if progress:
+                progress(total_count, success_count, len(failed_items))
+
+        committed = not dry_run
+        if mode == 'atomic' and not dry_run:
+            if failed_items:
+                db.session.rollback()
+                committed = False
+            else:
+                db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    failed_items.sort(key=lambda item: item['row'])
+    if mode == 'atomic' and failed_items:
+        success_count = 0
+
+    return {
+        'success_count': success_count,
+        'failed_count': len(failed_items),
+        'total_count': total_count,
+        'failed_items': failed_items,
+        'mode': mode,
+        'dry_run': dry_run,
+        'committed': committed
+    }
@@ -0,0 +1,21 @@
+import logging
+from flask import current_app
+from app.models.equipment import Equipment
+
+logger = logging.getLogger(__name__)
+
+
+def complete_equipment_transitions():
+    """
+    定时完成重启类过渡状态
+    设备在重启时长内未通过心跳上报完成的，按重启完成处理
+    :return: 完成的设备数量
+    """
+    duration = current_app.config['EQUIPMENT_RESTART_DURATION']
+    completed = 0
+    for equipment in Equipment.get_expired_transitions(duration):
+        if equipment.complete_transition(reason='重启完成(定时确认)'):
+            completed += 1
+    if completed:
+        logger.info(f"已完成 {completed} 台设备的重启")
+    return completed
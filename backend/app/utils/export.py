@@ -0,0 +1,97 @@
+import csv
+import io
+import tempfile
+from urllib.parse import quote
+from flask import Response, send_file, stream_with_context
+
+# 支持的导出格式
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class ExportColumn(object):
+    """导出列定义"""
+
+    def __init__(self, key, header, getter, width=15):
+        self.key = key
+        self.header = header
+        self.getter = getter
+        self.width = width
+
+
+def select_columns(columns, keys=None):
+    """按列键名选择导出列，保持请求中的顺序，未指定时导出全部列"""
+    if not keys:
+        return list(columns)
+    by_key = {column.key: column for column in columns}
+    unknown = [key for key in keys if key not in by_key]
+    if unknown:
+        raise ValueError(f"不支持的导出列: {', '.join(unknown)}")
+    return [by_key[key] for key in keys]
+
+
+def iter_csv(columns, records):
+    """逐行生成CSV内容，带BOM以便Excel正确识别UTF-8"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow([column.header for column in columns])
+    for index, record in enumerate(records, start=1):
+        writer.writerow([column.getter(record) for column in columns])
+        # 每100行输出一次，避免过多的小块写入
+        if index % 100 == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def write_xlsx(fileobj, columns, records, sheet_name='Sheet1'):
+    """使用只写模式工作簿逐行写入XLSX，内存占用与行数无关"""
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    # 只写模式下无法按内容测量列宽，使用列定义中的固定宽度
+    for index, column in enumerate(columns, start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = column.width
+
+    worksheet.append([column.header for column in columns])
+    count = 0
+    for record in records:
+        worksheet.append([column.getter(record) for column in columns])
+        count += 1
+    workbook.save(fileobj)
+    return count
+
+
+def attachment_headers(filename):
+    """生成支持中文文件名的下载响应头"""
+    return {'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+
+def export_response(columns, records, filename, export_format='xlsx', sheet_name='Sheet1'):
+    """
+    生成流式导出响应
+    CSV 直接流式写入响应，XLSX 写入临时文件后发送
+    :param filename: 不含扩展名的文件名
+    """
+    if export_format == 'csv':
+        return Response(
+            stream_with_context(iter_csv(columns, records)),
+            mimetype='text/csv',
+            headers=attachment_headers(f"{filename}.csv")
+        )
+
+    output = tempfile.TemporaryFile()
+    write_xlsx(output, columns, records, sheet_name)
+    output.seek(0)
+    return send_file(
+        output,
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=f"{filename}.xlsx"
+    )
@@ -0,0 +1,145 @@
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import current_app, request, send_file, Response
+from werkzeug.utils import send_file as werkzeug_send_file
+
+# 文件发送方式：direct 由 Python 进程读取并发送文件；
+# x-accel 返回 X-Accel-Redirect 由 nginx 发送；x-sendfile 返回 X-Sendfile 由 Apache/lighttpd 发送
+DELIVERY_MODES = ('direct', 'x-accel', 'x-sendfile')
+
+
+class FileValidators(object):
+    """文件的条件请求校验信息"""
+
+    def __init__(self, etag, last_modified, size):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+
+
+def get_file_validators(path, file_hash=None):
+    """
+    生成文件的 ETag 和 Last-Modified
+    有内容哈希时用哈希作为强 ETag，否则由修改时间和文件大小生成
+    """
+    stat = os.stat(path)
+    etag = file_hash or f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+    return FileValidators(etag, last_modified, stat.st_size)
+
+
+def is_not_modified(validators):
+    """
+    请求的条件头是否表明客户端缓存仍然有效
+    If-None-Match 优先于 If-Modified-Since
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validators.etag)
+    if request.if_modified_since:
+        return validators.last_modified <= request.if_modified_since
+    return False
+
+
+def not_modified_response(validators):
+    """返回 304 响应，不读取文件、不写数据库"""
+    response = Response(status=304)
+    response.set_etag(validators.etag)
+    response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def is_initial_request():
+    """
+    是否为一次新的读取
+    无 Range 或 Range 从第 0 字节开始的请求才记录使用统计，拖动进度和断点续传的后续分段不重复记录
+    """
+    byte_range = request.range
+    if byte_range is None or not byte_range.ranges:
+        return True
+    start, _ = byte_range.ranges[0]
+    return start == 0
+
+
+def get_delivery_mode():
+    """获取当前配置的文件发送方式，未知配置按 direct 处理"""
+    mode = str(current_app.config.get('FILE_DELIVERY_MODE') or 'direct').lower()
+    return mode if mode in DELIVERY_MODES else 'direct'
+
+
+def _accel_redirect_uri(path):
+    """
+    将文件路径转换为 nginx 内部 location 的 URI
+    文件不在 FILE_DELIVERY_ROOT 下时返回 None，由 Python 直接发送
+    """
+    root = os.path.abspath(current_app.config['FILE_DELIVERY_ROOT'])
+    path = os.path.abspath(path)
+    if not path.startswith(root + os.sep):
+        return None
+    relative_path = os.path.relpath(path, root).replace(os.sep, '/')
+    prefix = current_app.config.get('FILE_ACCEL_PREFIX', '/protected-files').rstrip('/')
+    return f"{prefix}/{quote(relative_path)}"
+
+
+def _offload_response(path, validators, mimetype, as_attachment, download_name):
+    """
+    生成交给前端 Web 服务器发送文件的响应，响应体为空
+    Range 分段和文件读取由 Web 服务器处理，条件请求已在调用前由 is_not_modified 判断
+    :return: Response，direct 模式或文件无法交由 Web 服务器发送时返回 None
+    """
+    mode = get_delivery_mode()
+    if mode == 'direct':
+        return None
+
+    accel_uri = None
+    if mode == 'x-accel':
+        accel_uri = _accel_redirect_uri(path)
+        if accel_uri is None:
+            return None
+
+    # 复用 werkzeug 生成 Content-Type、Content-Disposition 等响应头
+    response = werkzeug_send_file(
+        os.path.abspath(path),
+        request.environ,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=False,
+        etag=validators.etag,
+        last_modified=validators.last_modified,
+        use_x_sendfile=True,
+        response_class=current_app.response_class
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    if accel_uri is not None:
+        response.headers.pop('X-Sendfile', None)
+        response.headers['X-Accel-Redirect'] = accel_uri
+    return response
+
+
+def send_file_conditional(path, validators, mimetype=None, as_attachment=False, download_name=None, max_age=None):
+    """
+    发送文件，支持 Range/206 分段读取和 If-None-Match/If-Modified-Since 条件请求
+    配置 FILE_DELIVERY_MODE 后由 nginx 等 Web 服务器发送文件内容，Python 只负责认证和统计
+    :param max_age: 客户端缓存时间(秒)，未指定时每次使用前重新校验
+    """
+    response = _offload_response(path, validators, mimetype, as_attachment, download_name)
+    if response is None:
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=True,
+            etag=validators.etag,
+            last_modified=validators.last_modified
+        )
+    # 课件需要认证，只允许客户端私有缓存
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.no_cache = False
+        response.cache_control.max_age = max_age
+    return response
@@ -0,0 +1,174 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import update, bindparam
+
+logger = logging.getLogger(__name__)
+
+def parse_heartbeat(data, now=None):
+    """
+    解析单条心跳数据
+    :return: (设备ID, 待更新字段)
+    :raises ValueError: 数据不合法
+    """
+    if not isinstance(data, dict):
+        raise ValueError("心跳数据格式错误")
+    equipment_id = data.get('equipment_id')
+    if not equipment_id or not isinstance(equipment_id, str):
+        raise ValueError("设备ID不能为空")
+
+    now = now or datetime.utcnow()
+    last_active = now
+    if data.get('last_active'):
+        try:
+            value = data['last_active']
+            if isinstance(value, (int, float)):
+                last_active = datetime.utcfromtimestamp(value)
+            else:
+                last_active = datetime.fromisoformat(str(value).replace('Z', '')).replace(tzinfo=None)
+        except (TypeError, ValueError, OverflowError, OSError):
+            raise ValueError(f"设备 {equipment_id} 的 last_active 格式错误")
+        # 设备时钟超前时以服务器时间为准
+        last_active = min(last_active, now)
+
+    values = {'last_active': last_active}
+    if data.get('usage_rate') is not None:
+        usage_rate = str(data['usage_rate']).strip()
+        values['usage_rate'] = usage_rate if usage_rate.endswith('%') else f"{usage_rate}%"
+    if data.get('has_error') is not None:
+        values['has_error'] = bool(data['has_error'])
+    return equipment_id, values
+
+
+class HeartbeatBuffer(object):
+    """
+    设备心跳写缓冲
+    心跳在内存中按设备合并，只保留每台设备最新的字段值，
+    定时任务调用 flush() 时用一次 IN 查询和按主键的批量 UPDATE 写入 equipment 表
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.received = 0
+        self.flushed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['heartbeat_buffer'] = self
+
+    def record(self, equipment_id, values):
+        """合并一条心跳"""
+        with self._lock:
+            current = self._pending.get(equipment_id)
+            if current is None:
+                self._pending[equipment_id] = dict(values)
+            elif values['last_active'] >= current['last_active']:
+                current.update(values)
+            self.received += 1
+
+    def pending_count(self):
+        """待写入的设备数"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        将缓冲的心跳写入数据库
+        处于重启类过渡状态的设备按重启完成处理，离线设备恢复在线，不存在的设备丢弃
+        :return: 写入的设备数
+        """
+        from app import db
+        from app.models.equipment import Equipment
+        from app.models.equipment_status_history import EquipmentStatusHistory
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            current = {
+                row.id: row for row in db.session.query(Equipment.id, Equipment.status, Equipment.has_error).filter(
+                    Equipment.id.in_(list(pending.keys()))
+                )
+            }
+            statuses = {equipment_id: row.status for equipment_id, row in current.items()}
+            unknown = len(pending) - len(statuses)
+            if unknown:
+                logger.warning(f"丢弃 {unknown} 台未知设备的心跳")
+
+            now = datetime.utcnow()
+            # 字段组合相同的行一起执行，保证批量 UPDATE 的参数结构一致；
+            # 状态或故障标记变化的行走 ORM 更新以触发缓存失效，只刷新活跃时间的行走 Core 更新
+            changed_batches = {}
+            touch_batches = {}
+            for equipment_id, values in pending.items():
+                if equipment_id not in statuses:
+                    continue
+                row = dict(values, id=equipment_id, is_offline=False, updated_at=now)
+                if statuses[equipment_id] in Equipment.TRANSITION_STATUSES:
+                    row.update(status='online', has_error=values.get('has_error', False), transition_started_at=None)
+                elif statuses[equipment_id] in (None, 'offline'):
+                    # 离线设备收到心跳即恢复在线，教学/维护等业务状态保持不变
+                    row['status'] = 'online'
+                changed = 'status' in row or (
+                    'has_error' in row and bool(row['has_error']) != bool(current[equipment_id].has_error)
+                )
+                batches = changed_batches if changed else touch_batches
+                batches.setdefault(tuple(sorted(row)), []).append(row)
+
+            for rows in changed_batches.values():
+                db.session.execute(update(Equipment), rows)
+            table = Equipment.__table__
+            for rows in touch_batches.values():
+                # 经 Connection 执行不触发会话事件，不会使依赖设备表的缓存失效
+                db.session.connection().execute(
+                    table.update().where(table.c.id == bindparam('equipment_id')),
+                    [dict({k: v for k, v in row.items() if k != 'id'}, equipment_id=row['id']) for row in rows]
+                )
+            # 心跳完成的重启与批量 UPDATE 在同一事务中记录状态历史
+            db.session.add_all([
+                EquipmentStatusHistory(
+                    equipment_id=equipment_id,
+                    previous_status=status,
+                    current_status='online',
+                    change_reason='重启完成'
+                )
+                for equipment_id, status in statuses.items() if status in Equipment.TRANSITION_STATUSES
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            # 写入失败时放回缓冲区，保留期间收到的更新的心跳
+            with self._lock:
+                for equipment_id, values in pending.items():
+                    current = self._pending.get(equipment_id)
+                    if current is None or current['last_active'] < values['last_active']:
+                        self._pending[equipment_id] = values
+            raise
+
+        count = sum(len(rows) for batches in (changed_batches, touch_batches) for rows in batches.values())
+        self.flushed += count
+        return count
+
+    def flush_if_due(self, interval):
+        """距上次写入超过 interval 秒时写入，用于调度线程未运行时的兜底"""
+        if time.monotonic() - self._last_flush >= interval:
+            return self.flush()
+        return 0
+
+    def get_stats(self):
+        """缓冲区统计"""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'received': self.received,
+                'flushed': self.flushed
+            }
@@ -0,0 +1,217 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+
+logger = logging.getLogger(__name__)
+
+# 热点查询注册表：名称 -> 返回 select 语句的无参函数
+_hot_queries = {}
+
+
+def hot_query(name):
+    """注册热点查询的装饰器，被装饰函数返回与接口访问模式一致的 select 语句"""
+    def decorator(f):
+        _hot_queries[name] = f
+        return f
+    return decorator
+
+
+def get_hot_queries():
+    """获取已注册的热点查询"""
+    _register_builtin_queries()
+    return dict(_hot_queries)
+
+
+def _explain_mysql(conn, sql, params):
+    rows = conn.exec_driver_sql('EXPLAIN ' + sql, params).mappings().all()
+    plan = []
+    warnings = []
+    for row in rows:
+        access_type = row.get('type')
+        extra = row.get('Extra') or ''
+        plan.append({
+            'table': row.get('table'),
+            'type': access_type,
+            'key': row.get('key'),
+            'rows': row.get('rows'),
+            'extra': extra
+        })
+        if access_type == 'ALL':
+            warnings.append(f"{row.get('table')}: 全表扫描")
+        if 'Using filesort' in extra:
+            warnings.append(f"{row.get('table')}: 使用文件排序")
+    return plan, warnings
+
+
+def _explain_sqlite(conn, sql, params):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params).all()
+    plan = []
+    warnings = []
+    for row in rows:
+        detail = row[-1]
+        plan.append({'detail': detail})
+        if detail.startswith('SCAN') and 'USING' not in detail:
+            warnings.append(f"全表扫描: {detail}")
+        if 'TEMP B-TREE' in detail:
+            warnings.append(f"临时排序: {detail}")
+    return plan, warnings
+
+
+def explain(statement):
+    """
+    对查询执行 EXPLAIN，标记全表扫描和文件排序
+    :return: {'sql', 'plan', 'warnings'}
+    :raises ValueError: 当前数据库不支持
+    """
+    from app import db
+
+    engine = db.engine
+    compiled = statement.compile(dialect=engine.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    explainers = {'mysql': _explain_mysql, 'sqlite': _explain_sqlite}
+    explainer = explainers.get(engine.dialect.name)
+    if explainer is None:
+        raise ValueError(f"不支持对 {engine.dialect.name} 数据库执行 EXPLAIN，仅支持 mysql 和 sqlite")
+
+    with engine.connect() as conn:
+        plan, warnings = explainer(conn, compiled.string, params)
+    return {'sql': compiled.string, 'plan': plan, 'warnings': warnings}
+
+
+def build_index_report():
+    """
+    对全部热点查询执行 EXPLAIN
+    :return: [{'name', 'sql', 'plan', 'warnings'}]，执行失败的查询包含 error
+    """
+    report = []
+    for name, builder in sorted(get_hot_queries().items()):
+        try:
+            item = explain(builder())
+        except Exception as e:
+            logger.exception(f"EXPLAIN 执行失败: {name}")
+            item = {'sql': None, 'plan': [], 'warnings': [], 'error': str(e)}
+        item['name'] = name
+        report.append(item)
+    return report
+
+
+_builtin_registered = False
+
+
+def _last_week():
+    """当前时间和 7 天前，每次构造查询时重新计算，避免长时间运行的进程使用启动时的时间"""
+    now = datetime.utcnow()
+    return now, now - timedelta(days=7)
+
+
+def _register_builtin_queries():
+    """注册各接口的热点查询，过滤和排序条件与路由中的写法一致"""
+    global _builtin_registered
+    if _builtin_registered:
+        return
+    _builtin_registered = True
+
+    from app.models.operation_log import OperationLog
+    from app.models.equipment import Equipment
+    from app.models.equipment_log import EquipmentLog
+    from app.models.equipment_status_history import EquipmentStatusHistory
+    from app.models.courseware_usage import CoursewareUsage
+    from app.models.user_session import UserSession
+
+    @hot_query('operation_logs.list')
+    def operation_logs_list():
+        _, week_ago = _last_week()
+        return select(OperationLog).where(
+            OperationLog.created_at >= week_ago
+        ).order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(51)
+
+    @hot_query('operation_logs.by_user')
+    def operation_logs_by_user():
+        return select(OperationLog).where(OperationLog.user_id == 1).order_by(
+            OperationLog.created_at.desc(), OperationLog.id.desc()
+        ).limit(51)
+
+    @hot_query('operation_logs.by_entity')
+    def operation_logs_by_entity():
+        return select(OperationLog).where(
+            OperationLog.entity_type == 'equipment', OperationLog.entity_id == 'G1-EDU-001'
+        ).order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).limit(51)
+
+    @hot_query('operation_logs.today_logins')
+    def operation_logs_today_logins():
+        now = datetime.utcnow()
+        return select(func.count(OperationLog.id)).where(
+            OperationLog.action_type == 'login', OperationLog.created_at >= now.replace(hour=0, minute=0, second=0)
+        )
+
+    @hot_query('equipment_logs.by_equipment')
+    def equipment_logs_by_equipment():
+        return select(EquipmentLog).where(EquipmentLog.equipment_id == 'G1-EDU-001').order_by(
+            EquipmentLog.created_at.desc(), EquipmentLog.id.desc()
+        ).limit(51)
+
+    @hot_query('equipment_logs.errors')
+    def equipment_logs_errors():
+        return select(EquipmentLog).where(EquipmentLog.log_type == 'error').order_by(
+            EquipmentLog.created_at.desc(), EquipmentLog.id.desc()
+        ).limit(51)
+
+    @hot_query('equipment_logs.daily')
+    def equipment_logs_daily():
+        _, week_ago = _last_week()
+        return select(func.date(EquipmentLog.created_at), func.count(EquipmentLog.id)).where(
+            EquipmentLog.created_at >= week_ago
+        ).group_by(func.date(EquipmentLog.created_at))
+
+    @hot_query('equipment_status_history.latest')
+    def equipment_status_history_latest():
+        return select(EquipmentStatusHistory).where(
+            EquipmentStatusHistory.equipment_id == 'G1-EDU-001'
+        ).order_by(EquipmentStatusHistory.created_at.desc()).limit(1)
+
+    @hot_query('equipment_status_history.range')
+    def equipment_status_history_range():
+        now, week_ago = _last_week()
+        return select(func.count(EquipmentStatusHistory.id)).where(
+            EquipmentStatusHistory.created_at >= week_ago,
+            EquipmentStatusHistory.created_at < now
+        )
+
+    @hot_query('courseware_usage.play_range')
+    def courseware_usage_play_range():
+        now, week_ago = _last_week()
+        return select(func.count(CoursewareUsage.id)).where(
+            CoursewareUsage.action == 'play',
+            CoursewareUsage.created_at >= week_ago,
+            CoursewareUsage.created_at < now
+        )
+
+    @hot_query('courseware_usage.by_courseware')
+    def courseware_usage_by_courseware():
+        return select(CoursewareUsage).where(CoursewareUsage.courseware_id == 1).order_by(
+            CoursewareUsage.created_at.desc()
+        ).limit(20)
+
+    @hot_query('user_sessions.online')
+    def user_sessions_online():
+        return select(func.count(func.distinct(UserSession.user_id))).where(UserSession.online_criteria())
+
+    @hot_query('user_sessions.by_user')
+    def user_sessions_by_user():
+        return select(UserSession).where(UserSession.user_id == 1, UserSession.is_active == True)
+
+    @hot_query('user_sessions.expired')
+    def user_sessions_expired():
+        now = datetime.utcnow()
+        return select(UserSession.id).where(UserSession.expires_at < now)
+
+    @hot_query('equipment.by_status')
+    def equipment_by_status():
+        return select(Equipment).where(Equipment.status == 'online').order_by(Equipment.updated_at.desc()).limit(20)
+
+    @hot_query('equipment.recently_updated')
+    def equipment_recently_updated():
+        return select(Equipment).order_by(Equipment.updated_at.desc()).limit(20)
@@ -0,0 +1,362 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+class JobContext(object):
+    """
+    任务执行上下文，供任务处理函数汇报进度、记录逐项结果和检查取消请求
+    进度通过独立的数据库连接写入，不影响处理函数自身的事务
+    """
+
+    # 进度写入和取消检查的最小间隔(秒)
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self, runner, job_id, params):
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+        self.total = 0
+        self.processed = 0
+        self.success_count = 0
+        self.failed_count = 0
+        self.results = []
+        self.summary = None
+        self.result_file = None
+        self._last_flush = 0
+        self._cancelled = False
+
+    @property
+    def folder(self):
+        """任务文件目录"""
+        return self.runner.job_folder(self.job_id)
+
+    def set_total(self, total):
+        """设置总项数"""
+        self.total = total
+        self.flush(force=True)
+
+    def add_result(self, item, success=None):
+        """
+        记录单项处理结果并推进进度
+        :param success: 是否成功，未指定时按 item['status'] == 'success' 判断
+        """
+        if success is None:
+            success = item.get('status') == 'success'
+        self.results.append(item)
+        self.processed += 1
+        if success:
+            self.success_count += 1
+        else:
+            self.failed_count += 1
+        self.flush()
+
+    def update(self, processed, success_count, failed_count):
+        """直接设置进度计数"""
+        self.processed = processed
+        self.success_count = success_count
+        self.failed_count = failed_count
+        self.flush()
+
+    def check_cancelled(self):
+        """检查取消请求，已取消时抛出 JobCancelled"""
+        if self.is_cancelled():
+            raise JobCancelled()
+
+    def is_cancelled(self):
+        """是否已请求取消"""
+        if self._cancelled or self.runner.is_cancel_requested(self.job_id):
+            self._cancelled = True
+        return self._cancelled
+
+    def flush(self, force=False):
+        """写入进度，按时间间隔节流"""
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        values = {
+            'total': self.total,
+            'processed': self.processed,
+            'success_count': self.success_count,
+            'failed_count': self.failed_count
+        }
+        cancel_requested = self.runner.update_job(self.job_id, **values)
+        if cancel_requested:
+            self._cancelled = True
+
+
+class JobRunner(object):
+    """
+    后台任务执行器
+    任务记录持久化在 jobs 表中，处理函数在线程池中执行，每个任务使用独立的应用上下文。
+    本进程提交的未完成任务由心跳线程定时刷新 updated_at，心跳超时的任务视为所属进程已退出
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._handlers = {}
+        self._executor = None
+        self._cancel_requests = set()
+        self._active = set()
+        self._heartbeat_thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['job_runner'] = self
+
+    def handler(self, job_type):
+        """注册任务处理函数的装饰器，处理函数签名为 func(context, **params)"""
+        def decorator(f):
+            self._handlers[job_type] = f
+            return f
+        return decorator
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config.get('JOB_MAX_WORKERS', 2),
+                    thread_name_prefix='job-worker'
+                )
+                self._stop_event.clear()
+                self._heartbeat_thread = threading.Thread(target=self._run_heartbeat, name='job-heartbeat',
+                                                          daemon=True)
+                self._heartbeat_thread.start()
+            return self._executor
+
+    def job_folder(self, job_id):
+        """获取任务文件目录，不存在时创建"""
+        folder = os.path.join(self.app.config['JOB_FOLDER'], job_id)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def create(self, job_type, params=None, user_id=None):
+        """创建任务记录但不提交执行，用于提交前需要先保存文件的场景"""
+        from app import db
+        from app.models.job import Job
+
+        if job_type not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {job_type}")
+        job = Job(job_type=job_type, params=json.dumps(params or {}, ensure_ascii=False), created_by=user_id)
+        # 工作线程通过独立连接读取任务，即使处于请求级工作单元中也需要立即提交
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def submit(self, job_type, params=None, user_id=None, job=None):
+        """创建并提交任务，立即返回任务记录"""
+        if job is None:
+            job = self.create(job_type, params, user_id)
+        with self._lock:
+            self._active.add(job.id)
+        self.executor.submit(self._execute, job.id)
+        return job
+
+    def dispatch(self, func, *args, **kwargs):
+        """在线程池中执行不需要任务记录的轻量后台函数，函数在独立的应用上下文中运行"""
+        return self.executor.submit(self._run_in_context, func, args, kwargs)
+
+    def _run_in_context(self, func, args, kwargs):
+        from app import db
+
+        with self.app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                db.session.rollback()
+                logger.exception(f"后台函数执行失败: {getattr(func, '__name__', func)}")
+            finally:
+                db.session.remove()
+
+    def cancel(self, job):
+        """请求取消任务，未开始的任务直接取消"""
+        from app import db
+
+        if job.is_finished():
+            return False
+        with self._lock:
+            self._cancel_requests.add(job.id)
+        job.cancel_requested = True
+        if job.status == 'pending':
+            job.status = 'cancelled'
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+
+    def is_cancel_requested(self, job_id):
+        with self._lock:
+            return job_id in self._cancel_requests
+
+    def update_job(self, job_id, **values):
+        """通过独立会话更新任务记录，返回是否已请求取消"""
+        from app import db
+        from app.models.job import Job
+
+        with Session(db.engine) as session:
+            if values:
+                session.execute(update(Job).where(Job.id == job_id).values(updated_at=datetime.utcnow(), **values))
+            cancel_requested = session.query(Job.cancel_requested).filter(Job.id == job_id).scalar()
+            session.commit()
+        return bool(cancel_requested)
+
+    def active_jobs(self):
+        """本进程已提交且尚未结束的任务ID"""
+        with self._lock:
+            return set(self._active)
+
+    def heartbeat(self):
+        """刷新本进程未完成任务的 updated_at"""
+        from app import db
+        from app.models.job import Job
+
+        job_ids = self.active_jobs()
+        if not job_ids:
+            return 0
+        with Session(db.engine) as session:
+            count = session.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status.in_(['pending', 'running']))
+                .values(updated_at=datetime.utcnow())
+            ).rowcount
+            session.commit()
+        return count
+
+    def _run_heartbeat(self):
+        interval = max(float(self.app.config['JOB_HEARTBEAT_INTERVAL']), 1)
+        while not self._stop_event.wait(interval):
+            with self.app.app_context():
+                try:
+                    self.heartbeat()
+                except Exception:
+                    logger.exception("任务心跳写入失败")
+
+    def recover_interrupted(self):
+        """
+        将心跳超时的未完成任务标记为失败
+        其他进程仍在执行的任务会持续刷新 updated_at，不受影响；本进程提交的任务始终跳过
+        """
+        from app import db
+        from app.models.job import Job
+
+        stale_before = datetime.utcnow() - timedelta(seconds=self.app.config['JOB_STALE_TIMEOUT'])
+        query = Job.query.filter(Job.status.in_(['pending', 'running']), Job.updated_at < stale_before)
+        active = self.active_jobs()
+        if active:
+            query = query.filter(Job.id.notin_(active))
+        count = query.update({
+            'status': 'failed',
+            'error_message': '执行进程已退出，任务中断',
+            'finished_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if count:
+            logger.warning(f"已将 {count} 个中断的后台任务标记为失败")
+        return count
+
+    def expire_finished(self, days=None, batch_size=500):
+        """
+        删除结束超过保留天数的任务记录及其文件目录
+        :param days: 保留天数，默认使用配置 jobs.retention_days，0 表示不清理
+        :return: 删除的任务数
+        """
+        from app import db
+        from app.models.job import Job
+
+        days = self.app.config['JOB_RETENTION_DAYS'] if days is None else days
+        if not days:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = 0
+        while True:
+            job_ids = [row.id for row in db.session.query(Job.id).filter(
+                Job.status.in_(Job.FINISHED_STATUSES),
+                Job.finished_at < cutoff
+            ).limit(batch_size)]
+            if not job_ids:
+                break
+            Job.query.filter(Job.id.in_(job_ids)).delete(synchronize_session=False)
+            db.session.commit()
+            for job_id in job_ids:
+                self.cleanup(job_id)
+            deleted += len(job_ids)
+        return deleted
+
+    def cleanup(self, job_id):
+        """删除任务文件目录"""
+        shutil.rmtree(os.path.join(self.app.config['JOB_FOLDER'], job_id), ignore_errors=True)
+
+    def _execute(self, job_id):
+        from app import db
+        from app.models.job import Job
+
+        with self.app.app_context():
+            job = Job.query.get(job_id)
+            if job is None or job.status != 'pending':
+                db.session.remove()
+                with self._lock:
+                    self._active.discard(job_id)
+                return
+            handler = self._handlers[job.job_type]
+            context = JobContext(self, job_id, job.get_params())
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+
+            final = {}
+            try:
+                summary = handler(context, **context.params)
+                final['status'] = 'cancelled' if context.is_cancelled() else 'succeeded'
+                context.summary = summary if summary is not None else context.summary
+            except JobCancelled:
+                db.session.rollback()
+                final['status'] = 'cancelled'
+            except Exception as e:
+                db.session.rollback()
+                logger.exception(f"任务执行失败: {job_id}")
+                final['status'] = 'failed'
+                final['error_message'] = str(e)
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._cancel_requests.discard(job_id)
+
+            self.update_job(
+                job_id,
+                total=context.total or context.processed,
+                processed=context.processed,
+                success_count=context.success_count,
+                failed_count=context.failed_count,
+                results=json.dumps(context.results, ensure_ascii=False, default=str),
+                summary=json.dumps(context.summary, ensure_ascii=False, default=str) if context.summary else None,
+                result_file=context.result_file,
+                finished_at=datetime.utcnow(),
+                **final
+            )
+            with self._lock:
+                self._active.discard(job_id)
+
+    def shutdown(self, wait=False):
+        """停止线程池和心跳线程"""
+        self._stop_event.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,67 @@
+from sqlalchemy import func
+from app import db
+
+
+class DataLoader(object):
+    """
+    批量数据加载器
+    收集一页记录的键，用一次 IN 查询解析全部键，结果按键缓存，
+    使列表接口的查询次数与每页条数无关
+    """
+
+    def __init__(self, batch_fn, default=None):
+        """
+        :param batch_fn: 批量查询函数 batch_fn(keys) -> {key: value}
+        :param default: 查询结果中不存在的键对应的值，可为无参可调用对象
+        """
+        self.batch_fn = batch_fn
+        self.default = default
+        self._cache = {}
+
+    def _default(self):
+        return self.default() if callable(self.default) else self.default
+
+    def load_many(self, keys):
+        """批量加载，返回 {key: value}，已加载过的键不再查询"""
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        missing = [key for key in keys if key not in self._cache]
+        if missing:
+            results = self.batch_fn(missing)
+            for key in missing:
+                self._cache[key] = results.get(key, self._default())
+        return {key: self._cache[key] for key in keys}
+
+    def get(self, key):
+        """获取已加载的值，未加载的键单独加载"""
+        if key is None:
+            return self._default()
+        if key not in self._cache:
+            self.load_many([key])
+        return self._cache[key]
+
+
+def count_loader(column, *criteria):
+    """
+    按列分组计数的加载器
+    :param column: 分组列，如 CoursewareUsage.courseware_id
+    :param criteria: 附加过滤条件
+    """
+    def batch(keys):
+        return dict(
+            db.session.query(column, func.count()).filter(column.in_(keys), *criteria).group_by(column).all()
+        )
+    return DataLoader(batch, default=0)
+
+
+def group_loader(query, column):
+    """
+    按键分组加载记录列表的加载器
+    :param query: 返回 (键, 实体) 的查询，如 db.session.query(RolePermission.role_id, Permission).join(...)
+    :param column: 分组键列，用于生成 IN 条件
+    """
+    def batch(keys):
+        groups = {}
+        for key, entity in query.filter(column.in_(keys)):
+            groups.setdefault(key, []).append(entity)
+        return groups
+    return DataLoader(batch, default=list)
@@ -0,0 +1,199 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+
+logger = logging.getLogger(__name__)
+
+# 支持清理的日志表
+RETENTION_TABLES = ('operation_logs', 'equipment_logs')
+
+# 每张表同时只允许一个清理在执行；状态文件的读改写串行进行，避免不同表的进度互相覆盖
+_table_locks = {table: threading.Lock() for table in RETENTION_TABLES}
+_state_lock = threading.Lock()
+
+
+class RetentionBusy(Exception):
+    """日志表正在被另一个清理任务处理"""
+
+
+def _get_model(table):
+    from app.models.operation_log import OperationLog
+    from app.models.equipment_log import EquipmentLog
+    return {'operation_logs': OperationLog, 'equipment_logs': EquipmentLog}[table]
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class LogRetention(object):
+    """
+    日志保留清理
+    按主键顺序分块删除过期日志，每块独立提交并在块之间暂停，避免长事务锁表和 undo 日志膨胀；
+    删除前可将每块归档到 gzip 压缩的 JSONL 文件。
+    进度保存在归档目录的状态文件中，进程中断后再次运行从上次删除到的主键继续，被取消的清理不再继续
+    """
+
+    def __init__(self, config):
+        self.folder = config['RETENTION_FOLDER']
+        self.chunk_size = max(int(config['RETENTION_CHUNK_SIZE']), 1)
+        self.pause = config['RETENTION_PAUSE']
+        self.archive = config['RETENTION_ARCHIVE']
+
+    @property
+    def state_path(self):
+        return os.path.join(self.folder, 'retention_state.json')
+
+    def load_state(self):
+        """读取各表的清理进度"""
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_progress(self, table, progress):
+        """保存单表进度，重新读取状态文件后只替换本表的条目"""
+        with _state_lock:
+            state = self.load_state()
+            state[table] = progress
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = self.state_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.state_path)
+
+    def run(self, days, tables=RETENTION_TABLES, context=None):
+        """
+        清理各表 days 天前的日志
+        :param context: 后台任务上下文，用于汇报进度和响应取消
+        :return: {表名: 本次删除条数}
+        """
+        unknown = set(tables) - set(RETENTION_TABLES)
+        if unknown:
+            raise ValueError(f"不支持清理的日志表: {', '.join(sorted(unknown))}")
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = {}
+        for table in tables:
+            deleted[table] = self.purge_table(table, cutoff, context)
+        return deleted
+
+    def purge_table(self, table, cutoff, context=None):
+        """
+        清理单表，先继续上次中断的清理，再按本次截止时间清理
+        继续时使用上次与本次截止时间中较早的一个，不会删除本次要求保留的日志
+        :raises RetentionBusy: 该表正在被另一个清理任务处理
+        :return: 本次删除条数
+        """
+        lock = _table_locks[table]
+        if not lock.acquire(blocking=False):
+            raise RetentionBusy(f"日志表 {table} 正在清理中")
+        try:
+            progress = self.load_state().get(table)
+            deleted = 0
+            if progress and progress['status'] == 'running':
+                resume_cutoff = min(datetime.fromisoformat(progress['cutoff']), cutoff)
+                progress['cutoff'] = resume_cutoff.isoformat()
+                logger.info(f"继续未完成的日志清理: {table}，已删除至ID {progress['last_id']}")
+                deleted += self._purge(table, progress, context)
+                if resume_cutoff >= cutoff:
+                    return deleted
+
+            progress = {
+                'status': 'running',
+                'cutoff': cutoff.isoformat(),
+                'last_id': 0,
+                'deleted': 0,
+                'archive_file': None,
+                'started_at': datetime.utcnow().isoformat(),
+                'finished_at': None
+            }
+            if self.archive:
+                progress['archive_file'] = f"{table}-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.jsonl.gz"
+            self._save_progress(table, progress)
+            return deleted + self._purge(table, progress, context)
+        finally:
+            lock.release()
+
+    def _purge(self, table, progress, context):
+        from app import db
+
+        model = _get_model(table)
+        columns = model.__table__.columns
+        cutoff = datetime.fromisoformat(progress['cutoff'])
+        deleted = 0
+        while True:
+            if context is not None and context.is_cancelled():
+                # 取消的清理不再自动继续
+                progress['status'] = 'cancelled'
+                progress['finished_at'] = datetime.utcnow().isoformat()
+                self._save_progress(table, progress)
+                context.check_cancelled()
+
+            rows = db.session.execute(
+                select(model.__table__).where(
+                    model.id > progress['last_id'],
+                    model.created_at < cutoff
+                ).order_by(model.id).limit(self.chunk_size)
+            ).mappings().all()
+            if not rows:
+                break
+
+            if progress['archive_file']:
+                self._archive(progress['archive_file'], rows, columns)
+
+            ids = [row['id'] for row in rows]
+            db.session.execute(delete(model).where(model.id.in_(ids)))
+            db.session.commit()
+
+            deleted += len(ids)
+            progress['last_id'] = ids[-1]
+            progress['deleted'] += len(ids)
+            self._save_progress(table, progress)
+            if context is not None:
+                context.update(context.processed + len(ids), context.success_count + len(ids), 0)
+
+            if len(rows) < self.chunk_size:
+                break
+            time.sleep(self.pause)
+
+        progress['status'] = 'completed'
+        progress['finished_at'] = datetime.utcnow().isoformat()
+        self._save_progress(table, progress)
+        logger.info(f"日志清理完成: {table}，删除 {progress['deleted']} 条")
+        return deleted
+
+    def _archive(self, filename, rows, columns):
+        """追加写入归档文件，每块写入一个 gzip 成员并立即关闭，保证删除前已落盘"""
+        os.makedirs(self.folder, exist_ok=True)
+        with gzip.open(os.path.join(self.folder, filename), 'ab') as f:
+            for row in rows:
+                record = {column.name: _encode(row[column.name]) for column in columns}
+                f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+
+
+def submit_retention_job(params, user_id=None):
+    """
+    提交日志清理后台任务，已有等待中或执行中的清理任务时不重复提交
+    :return: (任务, 是否新提交)
+    """
+    from app import job_runner
+    from app.models.job import Job
+
+    existing = Job.query.filter(
+        Job.job_type == 'logs.retention', Job.status.in_(('pending', 'running'))
+    ).first()
+    if existing is not None:
+        return existing, False
+    return job_runner.submit('logs.retention', params, user_id=user_id), True
+
+
+def purge_expired_logs():
+    """定时任务：提交日志清理后台任务，避免长时间占用调度线程"""
+    from flask import current_app
+    submit_retention_job({'days': current_app.config['RETENTION_DAYS']})
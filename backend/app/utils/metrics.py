@@ -0,0 +1,305 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from array import array
+
+logger = logging.getLogger(__name__)
+
+# 每个采样点记录的指标，网络字段为两次采样间的速率(字节/秒、包/秒)
+SAMPLE_FIELDS = (
+    'timestamp',
+    'cpu_percent',
+    'load_1', 'load_5', 'load_15',
+    'memory_total', 'memory_available', 'memory_percent',
+    'disk_total', 'disk_used', 'disk_percent',
+    'net_sent_rate', 'net_recv_rate', 'net_packets_sent_rate', 'net_packets_recv_rate',
+    'process_rss', 'process_threads'
+)
+
+
+class RingBuffer(object):
+    """
+    固定容量的时间序列环形缓冲区
+    每个指标一个 array('d')，写满后覆盖最旧的采样点，内存占用固定为 字段数 × 容量 × 8 字节
+    """
+
+    def __init__(self, fields, capacity):
+        self.fields = tuple(fields)
+        self.capacity = max(int(capacity), 1)
+        self._columns = {field: array('d', bytes(8 * self.capacity)) for field in self.fields}
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, values):
+        """写入一个采样点，缺少的指标记为 0"""
+        with self._lock:
+            for field in self.fields:
+                self._columns[field][self._next] = float(values.get(field) or 0)
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def latest(self):
+        """最近一个采样点，缓冲区为空时返回 None"""
+        with self._lock:
+            if not self._count:
+                return None
+            index = (self._next - 1) % self.capacity
+            return {field: column[index] for field, column in self._columns.items()}
+
+    def series(self, points=None, since=None):
+        """
+        按时间顺序返回各指标的序列
+        :param points: 最多返回的点数，采样点更多时按相邻分组取平均值降采样
+        :param since: 只返回该时间戳(秒)之后的采样点
+        :return: {指标: [值, ...]}
+        """
+        with self._lock:
+            start = (self._next - self._count) % self.capacity
+            order = [(start + i) % self.capacity for i in range(self._count)]
+            columns = {field: [column[i] for i in order] for field, column in self._columns.items()}
+
+        if since is not None:
+            skip = sum(1 for ts in columns['timestamp'] if ts <= since)
+            columns = {field: values[skip:] for field, values in columns.items()}
+
+        size = len(columns['timestamp'])
+        if not points or points <= 0 or size <= points:
+            return columns
+
+        downsampled = {}
+        for field, values in columns.items():
+            buckets = []
+            for i in range(points):
+                bucket = values[i * size // points:(i + 1) * size // points]
+                buckets.append(round(sum(bucket) / len(bucket), 2))
+            downsampled[field] = buckets
+        return downsampled
+
+
+def _read_lines(path):
+    with open(path, 'r') as f:
+        return f.read().splitlines()
+
+
+def read_cpu_times():
+    """读取 /proc/stat 中的总 CPU 时间，返回 (空闲, 总计)"""
+    values = [int(v) for v in _read_lines('/proc/stat')[0].split()[1:]]
+    # user nice system idle iowait irq softirq steal，guest 已计入 user
+    idle = values[3] + (values[4] if len(values) > 4 else 0)
+    return idle, sum(values[:8])
+
+
+def read_loadavg():
+    """读取系统 1/5/15 分钟平均负载"""
+    try:
+        return tuple(float(v) for v in _read_lines('/proc/loadavg')[0].split()[:3])
+    except (OSError, ValueError):
+        return os.getloadavg()
+
+
+def read_meminfo():
+    """读取 /proc/meminfo，返回 (总内存, 可用内存)，单位字节"""
+    info = {}
+    for line in _read_lines('/proc/meminfo'):
+        key, _, value = line.partition(':')
+        info[key] = int(value.split()[0]) * 1024
+    available = info.get('MemAvailable')
+    if available is None:
+        available = info.get('MemFree', 0) + info.get('Buffers', 0) + info.get('Cached', 0)
+    return info['MemTotal'], available
+
+
+def read_net_counters():
+    """读取 /proc/net/dev 中除回环外所有网卡的累计计数 (发送字节, 接收字节, 发送包, 接收包)"""
+    sent = recv = packets_sent = packets_recv = 0
+    for line in _read_lines('/proc/net/dev')[2:]:
+        name, _, data = line.partition(':')
+        if name.strip() == 'lo':
+            continue
+        values = data.split()
+        recv += int(values[0])
+        packets_recv += int(values[1])
+        sent += int(values[8])
+        packets_sent += int(values[9])
+    return sent, recv, packets_sent, packets_recv
+
+
+def read_process_status():
+    """读取当前进程的常驻内存(字节)和线程数"""
+    rss = threads = 0
+    for line in _read_lines('/proc/self/status'):
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) * 1024
+        elif line.startswith('Threads:'):
+            threads = int(line.split()[1])
+    return rss, threads
+
+
+class MetricsSampler(object):
+    """
+    主机和进程指标采样器
+    守护线程按固定间隔读取 /proc 中的 CPU、负载、内存、网络计数和当前进程的内存、线程数，
+    写入环形缓冲区；接口只读取缓冲区，请求本身不产生采样开销。
+    采样线程由启动脚本调用 start() 启动，未启动时在读取最新值时按采样间隔补采
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.buffer = None
+        self.interval = 5
+        self.disk_path = '/'
+        self.started_at = time.time()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._last_cpu = None
+        self._last_net = None
+        self._last_time = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """绑定Flask应用"""
+        self.app = app
+        self.interval = max(float(app.config['METRICS_INTERVAL']), 1)
+        self.buffer = RingBuffer(SAMPLE_FIELDS, app.config['METRICS_CAPACITY'])
+        self.disk_path = app.config['FILE_DELIVERY_ROOT']
+        app.extensions['metrics_sampler'] = self
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        启动采样线程
+        使用 reloader 时只应在重载子进程中启动（WERKZEUG_RUN_MAIN=true）
+        """
+        if self.app is None or self.running:
+            return False
+        if not self.app.config.get('METRICS_ENABLED', True):
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='metrics-sampler', daemon=True)
+        self._thread.start()
+        return True
+
+    def shutdown(self, timeout=None):
+        """停止采样线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("系统指标采样失败")
+            self._stop_event.wait(self.interval)
+
+    def _disk_usage(self):
+        path = self.disk_path
+        while path and not os.path.exists(path):
+            path = os.path.dirname(path)
+        return shutil.disk_usage(path or '/')
+
+    def sample(self):
+        """
+        采集一个采样点并写入缓冲区
+        CPU 使用率和网络速率由与上一次采样的差值计算，首次采样没有网络速率；无法读取的指标记为 0
+        """
+        with self._lock:
+            now = time.time()
+            values = {'timestamp': now}
+            elapsed = now - self._last_time if self._last_time else None
+
+            try:
+                idle, total = read_cpu_times()
+                # 首次采样使用开机以来的平均值
+                last_idle, last_total = self._last_cpu or (0, 0)
+                if total > last_total:
+                    busy = (total - last_total) - (idle - last_idle)
+                    values['cpu_percent'] = round(busy * 100.0 / (total - last_total), 2)
+                self._last_cpu = (idle, total)
+            except (OSError, ValueError, IndexError):
+                pass
+
+            try:
+                values['load_1'], values['load_5'], values['load_15'] = read_loadavg()
+            except (OSError, ValueError):
+                pass
+
+            try:
+                mem_total, mem_available = read_meminfo()
+                values['memory_total'] = mem_total
+                values['memory_available'] = mem_available
+                values['memory_percent'] = round((mem_total - mem_available) * 100.0 / mem_total, 2)
+            except (OSError, ValueError, KeyError, ZeroDivisionError):
+                pass
+
+            try:
+                disk = self._disk_usage()
+                values['disk_total'] = disk.total
+                values['disk_used'] = disk.used
+                values['disk_percent'] = round(disk.used * 100.0 / disk.total, 2) if disk.total else 0
+            except OSError:
+                pass
+
+            try:
+                counters = read_net_counters()
+                if self._last_net is not None and elapsed:
+                    rates = [max(c - p, 0) / elapsed for c, p in zip(counters, self._last_net)]
+                    (values['net_sent_rate'], values['net_recv_rate'],
+                     values['net_packets_sent_rate'], values['net_packets_recv_rate']) = rates
+                self._last_net = counters
+            except (OSError, ValueError, IndexError):
+                pass
+
+            try:
+                values['process_rss'], values['process_threads'] = read_process_status()
+            except (OSError, ValueError, IndexError):
+                values['process_threads'] = threading.active_count()
+
+            self._last_time = now
+            self.buffer.append(values)
+            return values
+
+    def get_current(self):
+        """
+        最新采样点，附带累计网络计数和 CPU 核数
+        采样线程未运行且最新采样点已超过采样间隔时先补采一次
+        """
+        latest = self.buffer.latest()
+        if not self.running and (latest is None or time.time() - latest['timestamp'] >= self.interval):
+            self.sample()
+            latest = self.buffer.latest()
+        current = dict(latest)
+        with self._lock:
+            counters = self._last_net
+        if counters is not None:
+            current['net_bytes_sent'], current['net_bytes_recv'], \
+                current['net_packets_sent'], current['net_packets_recv'] = counters
+        current['cpu_cores'] = os.cpu_count() or 1
+        current['uptime'] = round(time.time() - self.started_at)
+        return current
+
+    def get_history(self, points=60, since=None):
+        """
+        降采样后的历史序列
+        :return: {'interval': 采样间隔, 'points': 点数, 'series': {指标: [值, ...]}}
+        """
+        series = self.buffer.series(points, since)
+        return {
+            'interval': self.interval,
+            'points': len(series['timestamp']),
+            'series': series
+        }
@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+# 每页最大条数
+MAX_PER_PAGE = 200
+
+# 缓存总数的命名空间，总数在缓存有效期内可能略有滞后
+TOTAL_CACHE_NAMESPACE = 'pagination_totals'
+
+# 不影响总数的分页参数，不参与总数缓存键
+PAGING_ARGS = ('cursor', 'page', 'per_page', 'total')
+
+
+class InvalidCursor(ValueError):
+    """分页游标格式错误，接口应返回 400"""
+
+
+def clamp_per_page(per_page, default=50):
+    """限制每页条数在 1 到 MAX_PER_PAGE 之间"""
+    if not per_page or per_page < 1:
+        return default
+    return min(per_page, MAX_PER_PAGE)
+
+
+def encode_cursor(created_at, record_id):
+    """将 (created_at, id) 编码为不透明的游标字符串"""
+    payload = json.dumps([created_at.isoformat(), record_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+    :raises InvalidCursor: 游标格式错误
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except Exception:
+        raise InvalidCursor("无效的分页游标")
+
+
+def keyset_paginate(query, model, cursor=None, per_page=50):
+    """
+    按 (created_at, id) 倒序的游标分页
+    每页只读取 per_page + 1 条判断是否还有下一页，不使用 OFFSET，翻到任意深度的代价相同
+    :return: (当前页记录, 下一页游标)，没有下一页时游标为 None
+    """
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        # 展开为 OR/AND 比较，不依赖数据库对行值比较的支持
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < record_id)
+        ))
+
+    items = query.order_by(model.created_at.desc(), model.id.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
+
+
+def cached_total(query, cache_key, timeout=None):
+    """
+    获取查询总数，结果按过滤条件缓存，缓存有效期内不重复执行 COUNT(*)
+    :param cache_key: 区分接口和过滤条件的缓存键
+    """
+    from app import cache
+
+    total = cache.get(TOTAL_CACHE_NAMESPACE, cache_key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(TOTAL_CACHE_NAMESPACE, cache_key, total, timeout)
+    return total
+
+
+def paginate_logs(query, model, args, cache_key):
+    """
+    日志列表分页，支持游标和页码两种方式
+    请求带 cursor 参数或未指定 page 时使用游标分页；指定 page 时兼容原有页码分页。
+    total 参数为 none 时不统计总数，否则返回缓存的总数
+    :param args: 请求参数 request.args
+    :param cache_key: 总数缓存键前缀，与过滤参数组合后作为缓存键
+    :return: 响应数据字典，记录在 items 中
+    :raises InvalidCursor: cursor 参数格式错误
+    """
+    per_page = clamp_per_page(args.get('per_page', 50, type=int))
+    cursor = args.get('cursor')
+    page = args.get('page', type=int)
+
+    data = {'per_page': per_page}
+    if cursor or not page:
+        items, next_cursor = keyset_paginate(query, model, cursor, per_page)
+        data.update(next_cursor=next_cursor, has_next=next_cursor is not None)
+    else:
+        page = max(page, 1)
+        items = query.order_by(model.created_at.desc(), model.id.desc()).offset(
+            (page - 1) * per_page
+        ).limit(per_page + 1).all()
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        data.update(
+            current_page=page,
+            has_next=has_next,
+            has_prev=page > 1,
+            next_cursor=encode_cursor(items[-1].created_at, items[-1].id) if has_next else None
+        )
+
+    if args.get('total', '').lower() != 'none':
+        filters = '&'.join(f'{k}={v}' for k, v in sorted(args.items(multi=True)) if k not in PAGING_ARGS)
+        total = cached_total(query, f'{cache_key}?{filters}')
+        data['total'] = total
+        data['pages'] = (total + per_page - 1) // per_page
+    data['items'] = items
+    return data
@@ -0,0 +1,215 @@
+import logging
+import random
+import re
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.request_metrics import route_key
+
+logger = logging.getLogger(__name__)
+
+# 按请求开启分析的请求头
+PROFILE_HEADER = 'X-Query-Profile'
+
+# 每个路由保留的重复语句条数
+MAX_SHAPES_PER_ROUTE = 5
+
+# 语句形态归一化：字符串和数字字面量、IN 列表中的多个占位符、连续空白
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """归一化 SQL 语句，参数不同但结构相同的语句得到相同的形态"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestProfile(object):
+    """单个请求的 SQL 执行记录"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes = {}
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        shape = statement_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            entry = self.shapes[shape] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def repeated(self, threshold):
+        """重复执行次数达到阈值的语句形态(疑似 N+1)，按次数倒序: [(形态, 次数, 耗时毫秒)]"""
+        items = [(shape, count, total) for shape, (count, total) in self.shapes.items() if count >= threshold]
+        items.sort(key=lambda item: item[1], reverse=True)
+        return items
+
+
+class QueryProfiler(object):
+    """
+    请求级 SQL 分析器
+    通过引擎的 before/after_cursor_execute 事件统计每个请求执行的语句数和数据库耗时，
+    结构相同的语句重复执行达到阈值时记为疑似 N+1。
+    开启方式：配置 profiler.enabled 对全部请求开启；或按 profiler.sample_rate 抽样；
+    profiler.header 为 true 时，已登录的管理员可用请求头 X-Query-Profile: 1 对单个请求开启。
+    分析结果按路由累计供 /api/system/query-profile 查询，只有请求头开启的请求在响应头中返回结果
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """绑定Flask应用并注册引擎事件"""
+        self.app = app
+        app.extensions['query_profiler'] = self
+        if not self._listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+    @property
+    def threshold(self):
+        return self.app.config['PROFILER_N_PLUS_ONE_THRESHOLD']
+
+    def _header_allowed(self):
+        """请求头开启分析只对已登录的管理员生效"""
+        if request.headers.get(PROFILE_HEADER) not in ('1', 'true'):
+            return False
+        if not self.app.config.get('PROFILER_ALLOW_HEADER', False):
+            return False
+        from app.auth import get_request_user
+        user = get_request_user()
+        return user is not None and user.role == 'admin'
+
+    def _should_profile(self):
+        """
+        判断是否分析当前请求
+        :return: (是否分析, 是否在响应头中返回结果)，按配置或抽样分析的请求不返回响应头
+        """
+        if self._header_allowed():
+            return True, True
+        config = self.app.config
+        if config.get('PROFILER_ENABLED', False):
+            return True, False
+        sample_rate = config.get('PROFILER_SAMPLE_RATE', 0)
+        return sample_rate > 0 and random.random() < sample_rate, False
+
+    def instrument(self, blueprint):
+        """为蓝图及其子蓝图的全部路由按配置开启 SQL 分析"""
+
+        @blueprint.before_request
+        def start_query_profile():
+            if self.app is None:
+                return
+            profiled, g.query_profile_headers = self._should_profile()
+            if profiled:
+                g.query_profile = RequestProfile()
+
+        @blueprint.after_request
+        def finish_query_profile(response):
+            profile = g.pop('query_profile', None)
+            if profile is None:
+                return response
+
+            repeated = profile.repeated(self.threshold)
+            if g.pop('query_profile_headers', False):
+                response.headers['X-Query-Count'] = str(profile.count)
+                response.headers['X-Query-Time'] = f'{profile.total_time:.2f}'
+                response.headers['X-Query-N-Plus-One'] = str(len(repeated))
+                response.headers.add('Server-Timing', f'db;dur={profile.total_time:.2f};desc="{profile.count} queries"')
+
+            route = route_key()
+            self._record(route, profile, repeated)
+            for shape, count, _ in repeated:
+                logger.warning(f"疑似 N+1 查询: {route} 同一语句执行 {count} 次: {shape[:200]}")
+            return response
+
+        return blueprint
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # 开始时间记在本次执行的上下文上，与连接无关，嵌套执行时也不会错配
+        if context is not None and has_request_context() and g.get('query_profile') is not None:
+            context._query_profile_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_query_profile_start', None)
+        if start is None:
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        if has_request_context():
+            profile = g.get('query_profile')
+            if profile is not None:
+                profile.record(statement, elapsed)
+
+    def _record(self, route, profile, repeated):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'requests': 0,
+                    'queries': 0,
+                    'max_queries': 0,
+                    'db_time': 0.0,
+                    'max_db_time': 0.0,
+                    'n_plus_one_requests': 0,
+                    'shapes': {}
+                }
+            stats['requests'] += 1
+            stats['queries'] += profile.count
+            stats['max_queries'] = max(stats['max_queries'], profile.count)
+            stats['db_time'] += profile.total_time
+            stats['max_db_time'] = max(stats['max_db_time'], profile.total_time)
+            if repeated:
+                stats['n_plus_one_requests'] += 1
+
+            shapes = stats['shapes']
+            for shape, count, _ in repeated:
+                shapes[shape] = max(shapes.get(shape, 0), count)
+            if len(shapes) > MAX_SHAPES_PER_ROUTE:
+                keep = sorted(shapes.items(), key=lambda item: item[1], reverse=True)[:MAX_SHAPES_PER_ROUTE]
+                stats['shapes'] = dict(keep)
+
+    def get_routes(self, sort='queries_avg', limit=20):
+        """
+        各路由的 SQL 统计，按指定字段倒序
+        :param sort: queries_avg/queries_max/db_time_avg/db_time_max/n_plus_one_requests
+        """
+        with self._lock:
+            routes = []
+            for route, stats in self._routes.items():
+                routes.append({
+                    'route': route,
+                    'requests': stats['requests'],
+                    'queries_avg': round(stats['queries'] / stats['requests'], 2),
+                    'queries_max': stats['max_queries'],
+                    'db_time_avg': round(stats['db_time'] / stats['requests'], 2),
+                    'db_time_max': round(stats['max_db_time'], 2),
+                    'n_plus_one_requests': stats['n_plus_one_requests'],
+                    'repeated_statements': [
+                        {'statement': shape, 'max_count': count}
+                        for shape, count in sorted(stats['shapes'].items(), key=lambda item: item[1], reverse=True)
+                    ]
+                })
+        routes.sort(key=lambda item: item[sort], reverse=True)
+        return routes[:limit] if limit else routes
+
+    def reset(self):
+        """清空按路由累计的统计"""
+        with self._lock:
+            self._routes = {}
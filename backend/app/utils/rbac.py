@@ -0,0 +1,145 @@
+import threading
+from app import db, cache
+
+# 权限快照所在的缓存命名空间，角色、权限或菜单变更提交后版本号递增
+RBAC_NAMESPACE = 'rbac'
+
+# 未分配 RBAC 角色时，按旧角色字段授予的权限
+LEGACY_ROLE_PERMISSIONS = {
+    'admin': ('read', 'write', 'delete', 'manage'),
+    'operator': ('read', 'write'),
+    'viewer': ('read',),
+}
+
+cache.depends_on(RBAC_NAMESPACE, 'Role', 'RolePermission', 'Permission', 'Menu')
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+class RBACSnapshot(object):
+    """
+    编译后的权限快照
+    权限编码映射为整数位，每个角色的权限集合保存为位集合，并预先构建各角色的前端路由树
+    """
+
+    def __init__(self, version, codes, role_masks, menus):
+        self.version = version
+        self.codes = codes
+        self.bits = {code: index for index, code in enumerate(codes)}
+        self.role_masks = role_masks
+        self.legacy_masks = {
+            role: self.mask_of(role_codes) for role, role_codes in LEGACY_ROLE_PERMISSIONS.items()
+        }
+        self.role_routes = {role_id: self._build_routes(menus, mask) for role_id, mask in role_masks.items()}
+        self.legacy_routes = {role: self._build_routes(menus, mask) for role, mask in self.legacy_masks.items()}
+
+    def mask_of(self, codes):
+        """权限编码集合转换为位集合"""
+        mask = 0
+        for code in codes:
+            bit = self.bits.get(code)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def codes_of(self, mask):
+        """位集合转换为权限编码列表"""
+        return [code for index, code in enumerate(self.codes) if mask >> index & 1]
+
+    def mask_for(self, role_id, role):
+        """获取用户的权限位集合，RBAC 角色不存在时兼容旧的角色字段"""
+        if role_id in self.role_masks:
+            return self.role_masks[role_id]
+        return self.legacy_masks.get(role, self.legacy_masks['viewer'])
+
+    def permissions_for(self, role_id, role):
+        """获取用户的权限编码列表"""
+        return self.codes_of(self.mask_for(role_id, role))
+
+    def has_permission(self, role_id, role, permission_code):
+        """检查用户是否有指定权限"""
+        return self._has_bit(self.mask_for(role_id, role), permission_code)
+
+    def routes_for(self, role_id, role):
+        """获取用户可访问的前端路由树"""
+        if role_id in self.role_routes:
+            return self.role_routes[role_id]
+        return self.legacy_routes.get(role, self.legacy_routes['viewer'])
+
+    def _build_routes(self, menus, mask):
+        """按权限过滤启用的菜单并构建路由树，无权限菜单的子菜单一并排除"""
+        children = {}
+        for menu in menus:
+            if menu.permission_code and not self._has_bit(mask, menu.permission_code):
+                continue
+            children.setdefault(menu.parent_id, []).append(menu)
+
+        def build(menu):
+            route = {
+                'name': menu.name,
+                'path': menu.path,
+                'meta': {
+                    'title': menu.title,
+                    'icon': menu.icon,
+                    'hidden': menu.is_hidden,
+                    'keepAlive': menu.is_keepalive,
+                    'affix': menu.is_affix,
+                    'permission': menu.permission_code
+                }
+            }
+            if menu.component:
+                route['component'] = menu.component
+            if menu.redirect:
+                route['redirect'] = menu.redirect
+            if children.get(menu.id):
+                route['children'] = [build(child) for child in children[menu.id]]
+            return route
+
+        return [build(menu) for menu in children.get(None, [])]
+
+    def _has_bit(self, mask, permission_code):
+        bit = self.bits.get(permission_code)
+        return bit is not None and bool(mask >> bit & 1)
+
+
+def _build_snapshot(version):
+    from app.models.permission import Permission
+    from app.models.role import Role, RolePermission
+    from app.models.menu import Menu
+
+    # 启用的权限按ID分配位，旧角色使用的权限编码追加在后面
+    permissions = db.session.query(Permission.id, Permission.code).filter(
+        Permission.status == True
+    ).order_by(Permission.id.asc()).all()
+    codes = [code for _, code in permissions]
+    for role_codes in LEGACY_ROLE_PERMISSIONS.values():
+        codes.extend(code for code in role_codes if code not in codes)
+    bit_by_permission = {permission_id: index for index, (permission_id, _) in enumerate(permissions)}
+
+    role_masks = {role_id: 0 for role_id, in db.session.query(Role.id).all()}
+    for role_id, permission_id in db.session.query(RolePermission.role_id, RolePermission.permission_id).all():
+        bit = bit_by_permission.get(permission_id)
+        if bit is not None and role_id in role_masks:
+            role_masks[role_id] |= 1 << bit
+
+    menus = db.session.query(
+        Menu.id, Menu.parent_id, Menu.name, Menu.title, Menu.path, Menu.component, Menu.icon,
+        Menu.is_hidden, Menu.is_keepalive, Menu.is_affix, Menu.redirect, Menu.permission_code
+    ).filter(Menu.status == True).order_by(Menu.sort_order.asc(), Menu.created_at.asc()).all()
+
+    return RBACSnapshot(version, codes, role_masks, menus)
+
+
+def get_rbac_snapshot():
+    """获取当前权限快照，角色、权限或菜单变更后在下次访问时重建"""
+    global _snapshot
+    version = cache.version(RBAC_NAMESPACE)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build_snapshot(version)
+        return _snapshot
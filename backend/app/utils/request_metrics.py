@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# 延迟直方图桶上界(毫秒)，最后一个桶收集超过最大上界的请求
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# 慢请求日志中隐藏取值的参数
+SENSITIVE_PARAMS = ('token', 'password', 'old_password', 'new_password', 'secret')
+
+# 保留的按小时汇总数
+HOURLY_WINDOWS = 48
+
+
+class RouteStats(object):
+    """单个路由的请求统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.error_count = 0
+        self.in_flight = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, elapsed, success):
+        self.count += 1
+        if not success:
+            self.error_count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.histogram[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def percentile(self, q):
+        """
+        由直方图估算百分位延迟，在命中的桶内按线性插值
+        :param q: 0-100
+        """
+        if not self.count:
+            return 0.0
+        rank = self.count * q / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.histogram):
+            if bucket_count and seen + bucket_count >= rank:
+                if index == len(LATENCY_BUCKETS):
+                    return round(self.max_time, 2)
+                lower = LATENCY_BUCKETS[index - 1] if index else 0
+                upper = min(LATENCY_BUCKETS[index], self.max_time)
+                return round(lower + (upper - lower) * (rank - seen) / bucket_count, 2)
+            seen += bucket_count
+        return round(self.max_time, 2)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'error_count': self.error_count,
+            'error_rate': round(self.error_count * 100.0 / self.count, 2) if self.count else 0,
+            'in_flight': self.in_flight,
+            'avg': round(self.total_time / self.count, 2) if self.count else 0,
+            'max': round(self.max_time, 2),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99)
+        }
+
+
+def route_key():
+    """当前请求的路由标识: 方法 + 路由规则，未匹配路由时使用请求路径"""
+    rule = request.url_rule.rule if request.url_rule is not None else request.path
+    return f'{request.method} {rule}'
+
+
+def _mask_params(params):
+    return {key: '***' if key.lower() in SENSITIVE_PARAMS else value for key, value in params.items()}
+
+
+class RequestMetrics(object):
+    """
+    接口请求指标
+    按路由记录请求数、错误数、进行中的请求数和延迟直方图(p50/p95/p99)，超过阈值的请求写入慢请求日志。
+    错误按HTTP状态码和 Result 响应体中的 code 判断。统计保存在进程内存中，重启后清零
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.started_at = time.time()
+        self._routes = {}
+        self._hourly = {}
+        self._slow_requests = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """绑定Flask应用"""
+        self.app = app
+        self._slow_requests = deque(maxlen=app.config['SLOW_REQUEST_LOG_SIZE'])
+        app.extensions['request_metrics'] = self
+
+    @property
+    def enabled(self):
+        return self.app is not None and self.app.config.get('REQUEST_METRICS_ENABLED', True)
+
+    def instrument(self, blueprint):
+        """为蓝图及其子蓝图的全部路由记录请求指标"""
+        from app.utils.unit_of_work import is_successful_response
+
+        @blueprint.before_request
+        def start_request_timer():
+            if not self.enabled:
+                return
+            g.request_metrics_route = route_key()
+            g.request_metrics_started = time.perf_counter()
+            with self._lock:
+                self._get_route(g.request_metrics_route).in_flight += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        @blueprint.after_request
+        def mark_request_result(response):
+            if 'request_metrics_started' in g:
+                g.request_metrics_success = is_successful_response(response)
+                g.request_metrics_status = response.status_code
+            return response
+
+        @blueprint.teardown_request
+        def stop_request_timer(exc):
+            started = g.pop('request_metrics_started', None)
+            if started is None:
+                return
+            elapsed = (time.perf_counter() - started) * 1000
+            success = exc is None and g.pop('request_metrics_success', False)
+            self._record(g.pop('request_metrics_route'), elapsed, success,
+                         g.pop('request_metrics_status', 500))
+
+        return blueprint
+
+    def _get_route(self, route):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = RouteStats()
+        return stats
+
+    def _record(self, route, elapsed, success, status_code):
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        with self._lock:
+            stats = self._get_route(route)
+            stats.in_flight -= 1
+            self.in_flight -= 1
+            stats.record(elapsed, success)
+
+            window = self._hourly.get(hour)
+            if window is None:
+                window = self._hourly[hour] = [0, 0, 0.0]
+                for old in sorted(self._hourly)[:-HOURLY_WINDOWS]:
+                    del self._hourly[old]
+            window[0] += 1
+            window[1] += 0 if success else 1
+            window[2] += elapsed
+
+        if elapsed >= self.app.config['SLOW_REQUEST_THRESHOLD']:
+            self._log_slow_request(route, elapsed, status_code)
+
+    def _log_slow_request(self, route, elapsed, status_code):
+        params = _mask_params(request.args.to_dict())
+        entry = {
+            'route': route,
+            'path': request.path,
+            'params': params,
+            'view_args': request.view_args or {},
+            'status_code': status_code,
+            'duration': round(elapsed, 2),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        self._slow_requests.append(entry)
+        logger.warning(f"慢请求: {route} 耗时 {elapsed:.0f}ms 状态 {status_code} "
+                       f"路径 {request.path} 参数 {params}")
+
+    def get_summary(self):
+        """全部接口的汇总指标"""
+        with self._lock:
+            routes = list(self._routes.values())
+            count = sum(stats.count for stats in routes)
+            errors = sum(stats.error_count for stats in routes)
+            total_time = sum(stats.total_time for stats in routes)
+            return {
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'total_requests': count,
+                'error_count': errors,
+                'error_rate': round(errors * 100.0 / count, 2) if count else 0,
+                'response_time_avg': round(total_time / count, 2) if count else 0,
+                'since': datetime.utcfromtimestamp(self.started_at).isoformat()
+            }
+
+    def get_routes(self, sort='p95', limit=20):
+        """
+        各路由的指标，按指定字段倒序
+        :param sort: count/error_count/avg/max/p50/p95/p99
+        """
+        with self._lock:
+            routes = [dict(stats.to_dict(), route=route) for route, stats in self._routes.items()]
+        routes.sort(key=lambda item: item.get(sort, 0), reverse=True)
+        return routes[:limit] if limit else routes
+
+    def get_slow_requests(self, limit=20):
+        """最近的慢请求，按时间倒序"""
+        return list(self._slow_requests)[::-1][:limit]
+
+    def get_window(self, start, end):
+        """
+        时间段内的请求汇总，按小时累计，用于写入看板统计
+        :return: (请求数, 错误数, 平均响应时间毫秒)，没有请求时返回 None
+        """
+        with self._lock:
+            windows = [value for hour, value in self._hourly.items() if start <= hour < end]
+        count = sum(window[0] for window in windows)
+        if not count:
+            return None
+        errors = sum(window[1] for window in windows)
+        return count, errors, sum(window[2] for window in windows) / count
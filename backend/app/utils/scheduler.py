@@ -0,0 +1,117 @@
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler(object):
+    """
+    进程内定时任务调度器
+    使用守护线程按固定间隔执行已注册的任务，每次执行都在应用上下文中进行
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._jobs = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """绑定Flask应用"""
+        self.app = app
+        app.extensions['scheduler'] = self
+
+    def add_job(self, name, func, interval):
+        """
+        注册定时任务
+        :param name: 任务名称（唯一）
+        :param func: 无参可调用对象
+        :param interval: 执行间隔(秒)
+        """
+        with self._lock:
+            self._jobs[name] = {
+                'func': func,
+                'interval': max(int(interval), 1),
+                'next_run': time.monotonic() + int(interval),
+                'last_run': None,
+                'last_error': None
+            }
+
+    def remove_job(self, name):
+        """移除定时任务"""
+        with self._lock:
+            self._jobs.pop(name, None)
+
+    def get_jobs(self):
+        """获取任务状态"""
+        with self._lock:
+            return {
+                name: {
+                    'interval': job['interval'],
+                    'last_run': job['last_run'],
+                    'last_error': job['last_error']
+                }
+                for name, job in self._jobs.items()
+            }
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        启动调度线程
+        使用 reloader 时只应在重载子进程中启动（WERKZEUG_RUN_MAIN=true），避免重复执行
+        """
+        if self.app is None or self.running:
+            return False
+        if not self.app.config.get('SCHEDULER_ENABLED', True):
+            return False
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='app-scheduler', daemon=True)
+        self._thread.start()
+        return True
+
+    def shutdown(self, timeout=None):
+        """停止调度线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_job(self, name):
+        """立即执行指定任务"""
+        with self._lock:
+            job = self._jobs.get(name)
+        if job is None:
+            raise KeyError(name)
+        self._execute(name, job)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [(name, job) for name, job in self._jobs.items() if job['next_run'] <= now]
+            for name, job in due:
+                self._execute(name, job)
+                job['next_run'] = time.monotonic() + job['interval']
+            self._stop_event.wait(1)
+
+    def _execute(self, name, job):
+        from app import db
+        with self.app.app_context():
+            try:
+                job['func']()
+                job['last_error'] = None
+            except Exception as e:
+                db.session.rollback()
+                job['last_error'] = str(e)
+                logger.exception(f"定时任务执行失败: {name}")
+            finally:
+                job['last_run'] = time.time()
+                db.session.remove()
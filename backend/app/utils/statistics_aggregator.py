@@ -0,0 +1,272 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app import db, request_metrics
+from app.models import (DashboardStatistics, OperationLog, CoursewareUsage, EquipmentStatusHistory,
+                        UserSession, SystemSettings, User, Equipment, Courseware, NavigationPoint)
+from app.utils.time_series import bucket_expression, grouped_counts, parse_bucket_label
+
+# 水位线保存在系统设置中
+WATERMARK_CATEGORY = 'statistics'
+
+# 以自增ID作为水位线的数据源: (水位线键名, 模型)
+ID_SOURCES = (
+    ('operation_logs', OperationLog),
+    ('courseware_usage', CoursewareUsage),
+    ('equipment_status_history', EquipmentStatusHistory),
+)
+
+# 小时行累加到天行的计数字段
+ADDITIVE_FIELDS = ('total_operations', 'total_interactions', 'total_courses_delivered')
+
+# 保存在 additional_metrics 中的计数指标
+EXTRA_METRICS = ('equipment_changes', 'user_logins')
+
+
+def _get_watermark_setting(key, value_type):
+    setting = SystemSettings.get_by_key(WATERMARK_CATEGORY, f'watermark.{key}')
+    if setting is None:
+        setting = SystemSettings(
+            category=WATERMARK_CATEGORY,
+            setting_key=f'watermark.{key}',
+            value_type=value_type,
+            description='统计汇总水位线',
+            is_system=True
+        )
+        db.session.add(setting)
+    return setting
+
+
+def _collect_id_source(key, model, hours):
+    """
+    收集自增ID水位线之后新增记录涉及的小时，返回新的水位线设置
+    未提交事务已分配的较小ID会在之后才可见，这类记录由 _recent_hours 的重算窗口收录
+    """
+    setting = _get_watermark_setting(key, 'integer')
+    watermark = setting.get_value() or 0
+
+    # 先确定本次处理的上界，避免统计过程中插入的记录被跳过
+    upper = db.session.query(func.max(model.id)).scalar() or 0
+    if upper <= watermark:
+        return None
+
+    bucket = bucket_expression(model.created_at, 'hour')
+    rows = db.session.query(bucket).filter(model.id > watermark, model.id <= upper).distinct().all()
+    hours.update(parse_bucket_label(row[0], 'hour') for row in rows if row[0])
+
+    setting.set_value(upper)
+    return setting
+
+
+def _collect_sessions(hours):
+    """收集登录时间水位线之后的会话涉及的小时（会话ID非自增，使用登录时间作为水位线）"""
+    setting = _get_watermark_setting('user_sessions', 'string')
+    watermark = setting.get_value()
+
+    upper = db.session.query(func.max(UserSession.login_time)).scalar()
+    if upper is None:
+        return None
+
+    query = db.session.query(bucket_expression(UserSession.login_time, 'hour')).filter(
+        UserSession.login_time <= upper
+    )
+    if watermark:
+        # 小时重算是幂等的，使用 >= 保证同一时间点的后续会话不会遗漏
+        query = query.filter(UserSession.login_time >= datetime.fromisoformat(watermark))
+    hours.update(parse_bucket_label(row[0], 'hour') for row in query.distinct().all() if row[0])
+
+    setting.set_value(upper.isoformat())
+    return setting
+
+
+def _recent_hours(now, count):
+    """当前小时及之前 count 个小时"""
+    current = now.replace(minute=0, second=0, microsecond=0)
+    return {current - timedelta(hours=i) for i in range(count + 1)} if count > 0 else set()
+
+
+def _distinct_users(start, end, granularity):
+    """统计各时间桶内的活跃用户（有操作日志或登录记录的用户）"""
+    users = {}
+    sources = (
+        (OperationLog.created_at, OperationLog.user_id),
+        (UserSession.login_time, UserSession.user_id),
+    )
+    for column, user_column in sources:
+        bucket = bucket_expression(column, granularity)
+        rows = db.session.query(bucket, user_column).filter(
+            column >= start, column < end, user_column.isnot(None)
+        ).distinct().all()
+        for label, user_id in rows:
+            label = label.strftime('%Y-%m-%d') if hasattr(label, 'strftime') else str(label)
+            users.setdefault(label, set()).add(user_id)
+    return {label: len(user_ids) for label, user_ids in users.items()}
+
+
+def _compute_hourly(hours):
+    """重算指定小时的汇总数据"""
+    start = min(hours)
+    end = max(hours) + timedelta(hours=1)
+
+    metrics = {
+        'total_operations': grouped_counts(OperationLog.created_at, start, end, 'hour'),
+        'total_interactions': grouped_counts(CoursewareUsage.created_at, start, end, 'hour'),
+        'total_courses_delivered': grouped_counts(
+            CoursewareUsage.created_at, start, end, 'hour', filters=[CoursewareUsage.action == 'play']
+        ),
+        'active_users': _distinct_users(start, end, 'hour'),
+        'equipment_changes': grouped_counts(EquipmentStatusHistory.created_at, start, end, 'hour'),
+        'user_logins': grouped_counts(UserSession.login_time, start, end, 'hour'),
+    }
+
+    existing = {
+        (row.statistic_date, row.statistic_hour): row
+        for row in DashboardStatistics.query.filter(
+            DashboardStatistics.statistic_date.in_({hour.date() for hour in hours}),
+            DashboardStatistics.statistic_hour.isnot(None)
+        ).all()
+    }
+
+    for hour in sorted(hours):
+        label = hour.strftime('%Y-%m-%d %H:00')
+        row = existing.get((hour.date(), hour.hour))
+        if row is None:
+            row = DashboardStatistics(statistic_date=hour.date(), statistic_hour=hour.hour)
+            db.session.add(row)
+
+        for field in ADDITIVE_FIELDS + ('active_users',):
+            setattr(row, field, metrics[field].get(label, 0))
+
+        extra = row.get_additional_metrics()
+        for name in EXTRA_METRICS:
+            extra[name] = metrics[name].get(label, 0)
+        row.set_additional_metrics(extra)
+        row.updated_at = datetime.utcnow()
+
+
+def _compute_daily(dates):
+    """由小时汇总行重新累加指定日期的天汇总行"""
+    db.session.flush()
+
+    hourly_rows = DashboardStatistics.query.filter(
+        DashboardStatistics.statistic_date.in_(dates),
+        DashboardStatistics.statistic_hour.isnot(None)
+    ).all()
+    daily_rows = {
+        row.statistic_date: row
+        for row in DashboardStatistics.query.filter(
+            DashboardStatistics.statistic_date.in_(dates),
+            DashboardStatistics.statistic_hour.is_(None)
+        ).all()
+    }
+
+    start = datetime.combine(min(dates), datetime.min.time())
+    end = datetime.combine(max(dates), datetime.min.time()) + timedelta(days=1)
+    # 天活跃用户需要跨小时去重，不能直接累加
+    active_users = _distinct_users(start, end, 'day')
+
+    for day in dates:
+        rows = [row for row in hourly_rows if row.statistic_date == day]
+        daily = daily_rows.get(day)
+        if daily is None:
+            daily = DashboardStatistics(statistic_date=day)
+            db.session.add(daily)
+
+        for field in ADDITIVE_FIELDS:
+            setattr(daily, field, sum(getattr(row, field) or 0 for row in rows))
+        daily.active_users = active_users.get(day.strftime('%Y-%m-%d'), 0)
+
+        extra = daily.get_additional_metrics()
+        for name in EXTRA_METRICS:
+            extra[name] = sum(row.get_additional_metrics().get(name, 0) for row in rows)
+        daily.set_additional_metrics(extra)
+        daily.updated_at = datetime.utcnow()
+
+
+def _snapshot_gauges(now):
+    """记录当天和当前小时的总量类指标快照"""
+    device_counts = dict(
+        db.session.query(Equipment.status, func.count(Equipment.id)).group_by(Equipment.status).all()
+    )
+    online_users = UserSession.count_online_users()
+    gauges = {
+        'total_users': User.query.count(),
+        'total_devices': sum(device_counts.values()),
+        'total_online_devices': device_counts.get('online', 0),
+        'total_offline_devices': device_counts.get('offline', 0),
+        'total_error_devices': device_counts.get('error', 0),
+        'total_maintenance_devices': device_counts.get('maintenance', 0),
+        'total_courseware': Courseware.query.count(),
+        'total_navigation_points': NavigationPoint.query.count(),
+    }
+
+    today = now.date()
+    rows = DashboardStatistics.query.filter(
+        DashboardStatistics.statistic_date == today,
+        db.or_(DashboardStatistics.statistic_hour.is_(None), DashboardStatistics.statistic_hour == now.hour)
+    ).all()
+    for hour in (None, now.hour):
+        row = next((r for r in rows if r.statistic_hour == hour), None)
+        if row is None:
+            row = DashboardStatistics(statistic_date=today, statistic_hour=hour)
+            db.session.add(row)
+        for field, value in gauges.items():
+            setattr(row, field, value)
+        row.peak_concurrent_users = max(row.peak_concurrent_users or 0, online_users)
+        _apply_request_metrics(row, now)
+        row.updated_at = datetime.utcnow()
+
+
+def _apply_request_metrics(row, now):
+    """
+    写入平均响应时间和错误率，取自进程内按小时累计的请求指标
+    重启后内存中没有数据的时段保留已写入的值
+    """
+    start = datetime.combine(row.statistic_date, datetime.min.time())
+    if row.statistic_hour is None:
+        end = start + timedelta(days=1)
+    else:
+        start += timedelta(hours=row.statistic_hour)
+        end = start + timedelta(hours=1)
+
+    window = request_metrics.get_window(start, end)
+    if window is None:
+        return
+    count, errors, avg_time = window
+    row.average_response_time = round(avg_time, 2)
+    row.error_rate = round(errors * 100.0 / count, 2)
+
+
+def aggregate_statistics(snapshot=True):
+    """
+    增量汇总看板统计数据
+    只处理各数据源水位线之后的新记录，重算涉及的小时汇总行，再由小时行重新累加天汇总行，
+    水位线与汇总数据在同一事务中提交。
+    最近 STATS_RESCAN_HOURS 个小时每次都重算，晚于水位线提交的较小ID记录不会被遗漏
+    :param snapshot: 是否同时记录总量类指标快照
+    :return: 本次重算的小时数
+    """
+    now = datetime.utcnow()
+    hours = _recent_hours(now, current_app.config['STATS_RESCAN_HOURS'])
+    for key, model in ID_SOURCES:
+        _collect_id_source(key, model, hours)
+    _collect_sessions(hours)
+
+    if hours:
+        _compute_hourly(hours)
+        _compute_daily(sorted({hour.date() for hour in hours}))
+
+    if snapshot:
+        _snapshot_gauges(now)
+
+    db.session.commit()
+    return len(hours)
+
+
+def rebuild_statistics():
+    """清空水位线，下次汇总时全量重算"""
+    SystemSettings.query.filter(
+        SystemSettings.category == WATERMARK_CATEGORY,
+        SystemSettings.setting_key.like('watermark.%')
+    ).delete(synchronize_session=False)
+    db.session.commit()
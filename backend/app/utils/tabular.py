@@ -0,0 +1,103 @@
+import csv
+import io
+
+# 表格文件按块读取的默认行数
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def normalize_cell(value):
+    """单元格值转换为去除首尾空白的字符串，空值返回 None"""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _detect_encoding(stream, sample_size=64 * 1024):
+    """根据文件开头判断CSV编码，兼容Excel另存的GBK文件"""
+    position = stream.tell()
+    sample = stream.read(sample_size)
+    stream.seek(position)
+    try:
+        sample.decode('utf-8')
+        return 'utf-8-sig'
+    except UnicodeDecodeError as e:
+        # 截断在多字节字符中间时仍视为UTF-8
+        if e.start >= len(sample) - 3:
+            return 'utf-8-sig'
+        return 'gb18030'
+
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding=_detect_encoding(stream), newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        # 避免关闭底层上传文件
+        text.detach()
+
+
+def _iter_xlsx(stream):
+    from openpyxl import load_workbook
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls(stream):
+    # 旧版 .xls 无法流式读取，整表读取后逐行输出
+    import pandas as pd
+    df = pd.read_excel(stream, sheet_name=0, header=None, dtype=object)
+    for row in df.itertuples(index=False):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def _iter_rows(stream, filename):
+    lower_name = filename.lower()
+    if lower_name.endswith('.csv'):
+        return _iter_csv(stream)
+    if lower_name.endswith('.xls'):
+        return _iter_xls(stream)
+    return _iter_xlsx(stream)
+
+
+def read_table_header(stream, filename):
+    """读取表头行并将文件位置复位"""
+    position = stream.tell()
+    rows = _iter_rows(stream, filename)
+    try:
+        header = [normalize_cell(value) for value in next(rows, [])]
+    finally:
+        rows.close()
+    stream.seek(position)
+    return header
+
+
+def iter_table_chunks(stream, filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    流式读取CSV/XLSX表格，第一行为表头，按块输出数据行
+    :return: 迭代器，每项为 [(Excel行号, {列名: 值}), ...]，空行跳过
+    """
+    rows = _iter_rows(stream, filename)
+    header = None
+    chunk = []
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if header is None:
+                header = [normalize_cell(value) for value in row]
+                continue
+            values = [normalize_cell(value) for value in row]
+            if not any(values):
+                continue
+            chunk.append((row_number, dict(zip(header, values))))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        rows.close()
@@ -0,0 +1,126 @@
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# 缩略图最长边(像素)
+THUMBNAIL_SIZE = 320
+
+# 缩略图文件后缀，保存在原文件旁边
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+
+IMAGE_TYPES = ('jpg', 'jpeg', 'png', 'gif')
+VIDEO_TYPES = ('mp4',)
+PDF_TYPES = ('pdf',)
+
+# 外部工具执行超时(秒)
+TOOL_TIMEOUT = 60
+
+
+def thumbnail_path_for(file_path):
+    """获取文件对应的缩略图路径"""
+    return file_path + THUMBNAIL_SUFFIX
+
+
+def _pillow():
+    """Pillow 已列入 requirements.txt，本地环境未安装时不生成图片缩略图"""
+    try:
+        from PIL import Image
+        return Image
+    except ImportError:
+        return None
+
+
+def supports_thumbnail(file_type):
+    """当前环境是否能为该类型生成缩略图"""
+    file_type = (file_type or '').lower()
+    if file_type in IMAGE_TYPES:
+        return _pillow() is not None
+    if file_type in VIDEO_TYPES:
+        return shutil.which('ffmpeg') is not None
+    if file_type in PDF_TYPES:
+        return shutil.which('pdftoppm') is not None
+    return False
+
+
+def _image_thumbnail(source, target):
+    Image = _pillow()
+    with Image.open(source) as image:
+        image.seek(0)
+        image = image.convert('RGB')
+        image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        image.save(target, 'JPEG', quality=85, optimize=True)
+
+
+def _video_poster(source, target):
+    # 取第1秒的画面作为封面，视频不足1秒时取首帧
+    for offset in ('1', '0'):
+        subprocess.run(
+            ['ffmpeg', '-y', '-loglevel', 'error', '-ss', offset, '-i', source, '-frames:v', '1',
+             '-vf', f"scale='min({THUMBNAIL_SIZE},iw)':-2", '-f', 'image2', '-c:v', 'mjpeg', target],
+            check=True, timeout=TOOL_TIMEOUT, stdin=subprocess.DEVNULL
+        )
+        if os.path.exists(target) and os.path.getsize(target) > 0:
+            return
+
+
+def _pdf_first_page(source, target):
+    # pdftoppm 输出文件名会自动追加 .jpg
+    prefix = target[:-len('.jpg')] if target.endswith('.jpg') else target
+    subprocess.run(
+        ['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-jpeg', '-scale-to', str(THUMBNAIL_SIZE), source, prefix],
+        check=True, timeout=TOOL_TIMEOUT, stdin=subprocess.DEVNULL
+    )
+    if prefix + '.jpg' != target:
+        os.replace(prefix + '.jpg', target)
+
+
+def generate_thumbnail(file_path, file_type):
+    """
+    为文件生成缩略图：图片缩放、视频封面帧、PDF首页
+    缩略图已存在时直接返回，相同内容的课件共用同一个缩略图
+    :return: 缩略图路径，类型不支持或生成失败时返回 None
+    """
+    file_type = (file_type or '').lower()
+    target = thumbnail_path_for(file_path)
+    if os.path.exists(target):
+        return target
+    if not os.path.exists(file_path) or not supports_thumbnail(file_type):
+        return None
+
+    # 先写入临时文件再替换，避免读取到不完整的缩略图
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp.jpg"
+    try:
+        if file_type in IMAGE_TYPES:
+            _image_thumbnail(file_path, tmp_path)
+        elif file_type in VIDEO_TYPES:
+            _video_poster(file_path, tmp_path)
+        else:
+            _pdf_first_page(file_path, tmp_path)
+        os.replace(tmp_path, target)
+        return target
+    except Exception:
+        logger.exception(f"缩略图生成失败: {file_path}")
+        return None
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_courseware_thumbnail(file_path, file_type):
+    """生成缩略图并更新引用该文件的全部课件"""
+    from app import db
+    from app.models.courseware import Courseware
+
+    thumbnail_path = generate_thumbnail(file_path, file_type)
+    if thumbnail_path is None:
+        return None
+    Courseware.query.filter(
+        Courseware.file_path == file_path,
+        Courseware.thumbnail_path.is_(None)
+    ).update({'thumbnail_path': thumbnail_path}, synchronize_session=False)
+    db.session.commit()
+    return thumbnail_path
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, literal_column
+from app import db
+
+# 支持的时间粒度
+GRANULARITIES = ('hour', 'day', 'week')
+
+
+def align_to_bucket(value, granularity='day'):
+    """将时间对齐到所属时间桶的起点（周以周一为起点）"""
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    day_start = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'week':
+        return day_start - timedelta(days=day_start.weekday())
+    return day_start
+
+
+def bucket_label(value, granularity='day'):
+    """获取时间桶的显示标签"""
+    if granularity == 'hour':
+        return value.strftime('%Y-%m-%d %H:00')
+    return value.strftime('%Y-%m-%d')
+
+
+def iter_buckets(start, end, granularity='day'):
+    """生成 [start, end) 范围内所有时间桶的起点"""
+    step = {
+        'hour': timedelta(hours=1),
+        'day': timedelta(days=1),
+        'week': timedelta(weeks=1)
+    }[granularity]
+    current = align_to_bucket(start, granularity)
+    while current < end:
+        yield current
+        current += step
+
+
+def bucket_expression(column, granularity='day'):
+    """
+    构建按时间粒度分桶的SQL表达式，返回值与 bucket_label 的格式一致
+    MySQL 使用 DATE/DATE_FORMAT，SQLite（本地开发）使用 strftime
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        if granularity == 'hour':
+            return func.strftime('%Y-%m-%d %H:00', column)
+        if granularity == 'week':
+            return func.date(column, 'weekday 0', '-6 days')
+        return func.date(column)
+
+    if granularity == 'hour':
+        return func.date_format(column, literal_column("'%Y-%m-%d %H:00'"))
+    if granularity == 'week':
+        # WEEKDAY() 周一为0，回退到本周一
+        return func.date(func.subdate(column, func.weekday(column)))
+    return func.date(column)
+
+
+def parse_bucket_label(label, granularity='day'):
+    """将时间桶标签解析为时间桶起点"""
+    if granularity == 'hour':
+        return datetime.strptime(label, '%Y-%m-%d %H:00')
+    return datetime.strptime(label, '%Y-%m-%d')
+
+
+def grouped_counts(column, start, end, granularity='day', filters=None, count_column=None, distinct=False):
+    """
+    单次 GROUP BY 查询统计 [start, end) 内各时间桶的记录数
+    :param column: 时间列，如 OperationLog.created_at
+    :param filters: 额外过滤条件列表
+    :param count_column: 计数列，默认 COUNT(*)
+    :param distinct: 是否对计数列去重
+    :return: {时间桶标签: 数量}，只包含有数据的时间桶
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"不支持的时间粒度: {granularity}")
+
+    bucket = bucket_expression(column, granularity).label('bucket')
+    if count_column is None:
+        counter = func.count()
+    elif distinct:
+        counter = func.count(func.distinct(count_column))
+    else:
+        counter = func.count(count_column)
+
+    query = db.session.query(bucket, counter).filter(column >= start, column < end)
+    for criterion in filters or []:
+        query = query.filter(criterion)
+    rows = query.group_by(bucket).all()
+
+    # 数据库返回 date 对象或字符串，统一转换为标签
+    counts = {}
+    for key, count in rows:
+        if key is None:
+            continue
+        label = key.strftime('%Y-%m-%d') if hasattr(key, 'strftime') else str(key)
+        counts[label] = count
+    return counts
+
+
+def count_by_bucket(column, start, end, granularity='day', filters=None, count_column=None):
+    """
+    统计 [start, end) 内每个时间桶的记录数，空桶补0
+    :return: [{"date": 标签, "count": 数量}, ...]
+    """
+    counts = grouped_counts(column, start, end, granularity, filters, count_column)
+    return fill_buckets(counts, start, end, granularity)
+
+
+def fill_buckets(counts, start, end, granularity='day'):
+    """按时间桶顺序输出序列，缺失的时间桶补0"""
+    return [
+        {"date": bucket_label(point, granularity), "count": counts.get(bucket_label(point, granularity), 0)}
+        for point in iter_buckets(start, end, granularity)
+    ]
+
+
+def resolve_range(periods, granularity='day', now=None):
+    """
+    根据时间粒度和周期数计算统计区间 [start, end)，包含当前时间桶
+    """
+    now = now or datetime.utcnow()
+    step = {
+        'hour': timedelta(hours=1),
+        'day': timedelta(days=1),
+        'week': timedelta(weeks=1)
+    }[granularity]
+    end = align_to_bucket(now, granularity) + step
+    start = end - step * periods
+    return start, end
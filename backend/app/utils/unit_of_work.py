@@ -0,0 +1,122 @@
+import logging
+from contextlib import contextmanager
+from flask import g, has_request_context, jsonify
+from app import db
+from app.utils.db_events import on_commit, on_rollback
+
+logger = logging.getLogger(__name__)
+
+
+def in_unit_of_work():
+    """当前请求是否处于请求级工作单元模式"""
+    return has_request_context() and g.get('unit_of_work', False)
+
+
+def commit():
+    """
+    提交当前会话
+    工作单元模式下只 flush（生成主键、触发约束检查），由请求结束时统一提交
+    """
+    if in_unit_of_work():
+        db.session.flush()
+    else:
+        db.session.commit()
+
+
+def after_commit(callback):
+    """
+    在变更提交后执行回调
+    工作单元模式下延迟到请求结束提交成功后执行，回滚时不执行；否则变更已提交，立即执行
+    """
+    if in_unit_of_work():
+        on_commit(db.session(), callback)
+    else:
+        callback()
+
+
+def after_rollback(callback):
+    """
+    在变更回滚后执行回调，用于清理已写入但不随事务回滚的文件
+    工作单元模式下请求失败、提交失败或发生异常回滚时执行；否则在当前事务回滚时执行，提交后丢弃
+    """
+    on_rollback(db.session(), callback)
+
+
+@contextmanager
+def savepoint():
+    """
+    逐项处理时隔离单项失败
+    工作单元模式下使用保存点，只回滚失败项；否则失败时回滚整个会话。
+    也可作为装饰器用于逐项处理函数，函数自行捕获异常时需调用 rollback_savepoint()
+    """
+    if in_unit_of_work():
+        with db.session.begin_nested():
+            yield
+        return
+
+    try:
+        yield
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rollback_savepoint():
+    """
+    回滚当前项的变更，用于在 savepoint() 内自行捕获异常的逐项处理函数
+    工作单元模式下只回滚当前保存点；否则回滚整个会话
+    """
+    if in_unit_of_work():
+        nested = db.session().get_nested_transaction()
+        if nested is not None:
+            nested.rollback()
+    else:
+        db.session.rollback()
+
+
+def is_successful_response(response):
+    """按HTTP状态码和 Result 响应体中的 code 判断请求是否成功"""
+    if response.status_code >= 400:
+        return False
+    if response.is_json and not response.direct_passthrough:
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict) and 'code' in payload:
+            return payload['code'] == 200
+    return True
+
+
+def enable_unit_of_work(blueprint):
+    """
+    为蓝图启用请求级工作单元
+    请求内模型的 save()/delete() 只暂存变更，请求成功时统一提交一次，失败或异常时回滚
+    """
+
+    @blueprint.before_request
+    def begin_unit_of_work():
+        g.unit_of_work = True
+
+    @blueprint.after_request
+    def finish_unit_of_work(response):
+        if not g.pop('unit_of_work', False):
+            return response
+
+        if not is_successful_response(response):
+            db.session.rollback()
+            return response
+
+        try:
+            db.session.commit()
+        except Exception as e:
+            from app.models.result import Result
+            db.session.rollback()
+            logger.exception("请求提交失败")
+            return jsonify(Result.error(message=f"数据保存失败: {str(e)}").to_dict())
+        return response
+
+    @blueprint.teardown_request
+    def abort_unit_of_work(exc):
+        # 未处理的异常不会经过 after_request，在此回滚未提交的变更
+        if g.pop('unit_of_work', False):
+            db.session.rollback()
+
+    return blueprint
@@ -1,4 +1,5 @@
-from app import create_app, db
+import os
+from app import create_app, db, scheduler, job_runner, audit_sink, metrics_sampler
 from app.models import User
 
 app = create_app()
@@ -17,5 +18,13 @@ if __name__ == '__main__':
         # 创建数据库表
         db.create_all()
         print("数据库表创建完成")
+        # 心跳超时的未完成后台任务标记为失败，之后由定时任务持续检查
+        job_runner.recover_interrupted()
+    
+    # 启动定时任务（统计汇总等）、操作日志写入线程和系统指标采样线程，debug 模式下只在重载子进程中启动
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start()
+        audit_sink.start()
+        metrics_sampler.start()
     
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Add transition_started_at to equipment
+
+Revision ID: a7b3e9c4d651
+Revises: f6a9d4e2b538
+Create Date: 2026-10-18 18:42:10.551317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b3e9c4d651'
+down_revision = 'f6a9d4e2b538'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('transition_started_at', sa.DateTime(), nullable=True, comment='进入重启类过渡状态的时间'))
+    # 已处于过渡状态的设备以最后更新时间作为开始时间
+    op.execute(
+        "UPDATE equipment SET transition_started_at = updated_at "
+        "WHERE status IN ('restarting', 'rebooting')"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.drop_column('transition_started_at')
@@ -0,0 +1,52 @@
+"""Add jobs table
+
+Revision ID: b7e41c9a2d10
+Revises: 3afcca7d5822
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+# revision identifiers, used by Alembic.
+revision = 'b7e41c9a2d10'
+down_revision = '3afcca7d5822'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+    sa.Column('id', sa.String(length=36), nullable=False, comment='任务ID'),
+    sa.Column('job_type', sa.String(length=100), nullable=False, comment='任务类型'),
+    sa.Column('status', sa.Enum('pending', 'running', 'succeeded', 'failed', 'cancelled'), nullable=False, comment='任务状态'),
+    sa.Column('params', sa.Text(), nullable=True, comment='任务参数(JSON)'),
+    sa.Column('total', sa.Integer(), nullable=True, comment='总项数'),
+    sa.Column('processed', sa.Integer(), nullable=True, comment='已处理项数'),
+    sa.Column('success_count', sa.Integer(), nullable=True, comment='成功项数'),
+    sa.Column('failed_count', sa.Integer(), nullable=True, comment='失败项数'),
+    sa.Column('results', sa.Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=True, comment='逐项结果(JSON)'),
+    sa.Column('summary', sa.Text(), nullable=True, comment='任务结果摘要(JSON)'),
+    sa.Column('result_file', sa.String(length=500), nullable=True, comment='结果文件路径'),
+    sa.Column('error_message', sa.Text(), nullable=True, comment='错误信息'),
+    sa.Column('cancel_requested', sa.Boolean(), nullable=True, comment='是否请求取消'),
+    sa.Column('created_by', sa.Integer(), nullable=True, comment='创建用户ID'),
+    sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+    sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+    sa.Column('created_at', sa.DateTime(), nullable=False, comment='创建时间'),
+    sa.Column('updated_at', sa.DateTime(), nullable=False, comment='更新时间'),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.create_index('idx_jobs_created_by', ['created_by', 'created_at'], unique=False)
+        batch_op.create_index('idx_jobs_status', ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('jobs', schema=None) as batch_op:
+        batch_op.drop_index('idx_jobs_status')
+        batch_op.drop_index('idx_jobs_created_by')
+
+    op.drop_table('jobs')
@@ -0,0 +1,30 @@
+"""Add file_hash to courseware
+
+Revision ID: c3d5a8f1e702
+Revises: b7e41c9a2d10
+Create Date: 2026-10-18 11:02:45.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d5a8f1e702'
+down_revision = 'b7e41c9a2d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('courseware', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_hash', sa.String(length=64), nullable=True, comment='文件内容SHA-256'))
+        batch_op.create_index(batch_op.f('ix_courseware_file_hash'), ['file_hash'], unique=False)
+        batch_op.create_index(batch_op.f('ix_courseware_file_path'), ['file_path'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('courseware', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_courseware_file_path'))
+        batch_op.drop_index(batch_op.f('ix_courseware_file_hash'))
+        batch_op.drop_column('file_hash')
@@ -0,0 +1,35 @@
+"""Add FULLTEXT ngram index to knowledge_base
+
+Revision ID: d4e7b2c9f310
+Revises: c3d5a8f1e702
+Create Date: 2026-10-18 14:20:11.402517
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e7b2c9f310'
+down_revision = 'c3d5a8f1e702'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FULLTEXT 和 ngram 分词器仅 MySQL 支持，其他数据库继续使用 LIKE 搜索
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.create_index(
+        'ft_knowledge_base_search',
+        'knowledge_base',
+        ['title', 'content', 'description', 'tags'],
+        unique=False,
+        mysql_prefix='FULLTEXT',
+        mysql_with_parser='ngram'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_knowledge_base_search', table_name='knowledge_base')
@@ -0,0 +1,75 @@
+"""Add indexes for log time ranges and hot filter columns
+
+Revision ID: e5f8c3d1a427
+Revises: d4e7b2c9f310
+Create Date: 2026-10-18 16:40:27.913064
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f8c3d1a427'
+down_revision = 'd4e7b2c9f310'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        batch_op.create_index('idx_operation_logs_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_operation_logs_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('equipment_logs', schema=None) as batch_op:
+        batch_op.create_index('idx_equipment_logs_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_equipment_logs_equipment_created', ['equipment_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_equipment_logs_type_created', ['log_type', 'created_at'], unique=False)
+
+    with op.batch_alter_table('equipment_status_history', schema=None) as batch_op:
+        batch_op.create_index('idx_equipment_status_history_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_equipment_status_history_equipment_created', ['equipment_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('courseware_usage', schema=None) as batch_op:
+        batch_op.create_index('idx_courseware_usage_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_courseware_usage_courseware_created', ['courseware_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_courseware_usage_action_created', ['action', 'created_at'], unique=False)
+
+    with op.batch_alter_table('user_sessions', schema=None) as batch_op:
+        batch_op.create_index('idx_user_sessions_user_active', ['user_id', 'is_active'], unique=False)
+        batch_op.create_index('idx_user_sessions_active_expires', ['is_active', 'expires_at'], unique=False)
+        batch_op.create_index('idx_user_sessions_expires_at', ['expires_at'], unique=False)
+        batch_op.create_index('idx_user_sessions_login_time', ['login_time'], unique=False)
+
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.create_index('idx_equipment_status_updated', ['status', 'updated_at'], unique=False)
+        batch_op.create_index('idx_equipment_updated_at', ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.drop_index('idx_equipment_updated_at')
+        batch_op.drop_index('idx_equipment_status_updated')
+
+    with op.batch_alter_table('user_sessions', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_sessions_login_time')
+        batch_op.drop_index('idx_user_sessions_expires_at')
+        batch_op.drop_index('idx_user_sessions_active_expires')
+        batch_op.drop_index('idx_user_sessions_user_active')
+
+    with op.batch_alter_table('courseware_usage', schema=None) as batch_op:
+        batch_op.drop_index('idx_courseware_usage_action_created')
+        batch_op.drop_index('idx_courseware_usage_courseware_created')
+        batch_op.drop_index('idx_courseware_usage_created_at')
+
+    with op.batch_alter_table('equipment_status_history', schema=None) as batch_op:
+        batch_op.drop_index('idx_equipment_status_history_equipment_created')
+        batch_op.drop_index('idx_equipment_status_history_created_at')
+
+    with op.batch_alter_table('equipment_logs', schema=None) as batch_op:
+        batch_op.drop_index('idx_equipment_logs_type_created')
+        batch_op.drop_index('idx_equipment_logs_equipment_created')
+        batch_op.drop_index('idx_equipment_logs_created_at')
+
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        batch_op.drop_index('idx_operation_logs_user_created')
+        batch_op.drop_index('idx_operation_logs_created_at')
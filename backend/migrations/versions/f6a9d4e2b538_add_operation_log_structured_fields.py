@@ -0,0 +1,35 @@
+"""Add action_type and entity columns to operation_logs
+
+Revision ID: f6a9d4e2b538
+Revises: e5f8c3d1a427
+Create Date: 2026-10-18 17:05:48.226190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a9d4e2b538'
+down_revision = 'e5f8c3d1a427'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 历史数据由 flask backfill-operation-logs 补全
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('action_type', sa.String(length=50), nullable=True, comment='操作类型，如 login/create/update/delete/export'))
+        batch_op.add_column(sa.Column('entity_type', sa.String(length=50), nullable=True, comment='操作对象类型，如 equipment/courseware/user'))
+        batch_op.add_column(sa.Column('entity_id', sa.String(length=100), nullable=True, comment='操作对象ID'))
+        batch_op.create_index('idx_operation_logs_type_created', ['action_type', 'created_at'], unique=False)
+        batch_op.create_index('idx_operation_logs_entity', ['entity_type', 'entity_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('operation_logs', schema=None) as batch_op:
+        batch_op.drop_index('idx_operation_logs_entity')
+        batch_op.drop_index('idx_operation_logs_type_created')
+        batch_op.drop_column('entity_id')
+        batch_op.drop_column('entity_type')
+        batch_op.drop_column('action_type')
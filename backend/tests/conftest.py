@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config
+
+# 测试使用内存 SQLite，不连接 MySQL
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'
+Config.AUDIT_ASYNC = False
+Config.SCHEDULER_ENABLED = False
+
+from app import create_app, db
+
+
+@pytest.fixture(scope='session')
+def app():
+    return create_app()
+
+
+@pytest.fixture(autouse=True)
+def app_context(app, tmp_path):
+    app.config['RETENTION_FOLDER'] = str(tmp_path / 'archive')
+    app.config['RETENTION_PAUSE'] = 0
+    with app.app_context():
+        db.create_all()
+        yield
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user():
+    from app.models import User
+    user = User(username='admin', real_name='admin', email='admin@example.com', role='admin', status=True)
+    user.set_password('admin123')
+    user.save()
+    return user
+
+
+def login(client, username, password):
+    """登录并返回带令牌的请求头"""
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['data']['token']}"}
+
+
+@pytest.fixture
+def auth_headers(client, user):
+    return login(client, 'admin', 'admin123')
@@ -0,0 +1,110 @@
+import fcntl
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from app.models import OperationLog
+from app.utils.audit import AuditSink
+
+
+@pytest.fixture
+def sink(app, tmp_path):
+    app.config['AUDIT_ASYNC'] = True
+    app.config['AUDIT_JOURNAL'] = str(tmp_path / 'audit_journal.jsonl')
+    sink = AuditSink(app)
+    yield sink
+    sink.shutdown()
+    app.config['AUDIT_ASYNC'] = False
+
+
+def make_row(user, action):
+    return {'user_id': user.id, 'action': action, 'action_type': 'create', 'created_at': datetime.utcnow()}
+
+
+def test_create_log_saves_synchronously_without_sink(user):
+    log = OperationLog.create_log(user_id=user.id, action='创建课件', details='课件ID: 1')
+    assert log.id is not None
+    assert OperationLog.query.count() == 1
+
+
+def test_create_log_returns_none_when_queued(app, user, monkeypatch, sink):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'audit_sink', sink)
+    assert sink.start()
+
+    assert OperationLog.create_log(user_id=user.id, action='创建课件') is None
+    log = OperationLog.create_log(user_id=user.id, action='删除课件', sync=True)
+    assert log.id is not None
+
+
+def test_journal_locked_by_other_process_is_not_used(app, sink):
+    with open(app.config['AUDIT_JOURNAL'] + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        assert not sink.start()
+        assert not sink.running
+
+
+def test_queued_logs_are_batch_inserted(app, user, monkeypatch, sink):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'audit_sink', sink)
+    assert sink.start()
+
+    for index in range(5):
+        assert OperationLog.create_log(user_id=user.id, action=f"创建课件{index}") is None
+    sink.shutdown()
+
+    assert sorted(log.action for log in OperationLog.query.all()) == [f"创建课件{index}" for index in range(5)]
+    assert sink.written == 5
+    # 全部写入后 journal 被清空，检查点归零
+    assert os.path.getsize(sink.journal_path) == 0
+    with open(sink.checkpoint_path) as f:
+        assert f.read() == '0'
+
+
+def test_unwritten_logs_are_replayed_after_crash(app, user, monkeypatch, sink):
+    assert sink.start()
+
+    def fail(rows):
+        raise RuntimeError('数据库不可用')
+
+    monkeypatch.setattr(sink, '_insert', fail)
+    assert sink.enqueue(make_row(user, '创建课件'))
+    assert sink.enqueue(make_row(user, '删除课件'))
+    sink.shutdown()
+    assert OperationLog.query.count() == 0
+
+    # 模拟进程重启，新的写入器从 journal 重放
+    restarted = AuditSink(app)
+    assert restarted.replay() == 2
+    assert sorted(log.action for log in OperationLog.query.all()) == ['创建课件', '删除课件']
+    assert os.path.getsize(sink.journal_path) == 0
+    assert restarted.replay() == 0
+
+
+def test_write_saves_checkpoint_and_truncates_when_drained(app, user, sink):
+    rows = [make_row(user, '创建课件'), make_row(user, '删除课件')]
+    lines = [(json.dumps({**row, 'created_at': row['created_at'].isoformat()}) + '\n').encode('utf-8') for row in rows]
+    with open(sink.journal_path, 'wb') as f:
+        f.write(b''.join(lines))
+    sink._journal = open(sink.journal_path, 'ab')
+    sink._journal_offset = len(lines[0]) + len(lines[1])
+
+    # 只写入了第一条：记录检查点，保留 journal
+    assert sink._write([(rows[0], len(lines[0]))])
+    with open(sink.checkpoint_path) as f:
+        assert int(f.read()) == len(lines[0])
+    assert os.path.getsize(sink.journal_path) == sink._journal_offset
+
+    # 崩溃后只重放检查点之后的日志
+    assert AuditSink(app).replay() == 1
+    assert sorted(log.action for log in OperationLog.query.all()) == ['创建课件', '删除课件']
+
+    sink._journal.write(lines[1])
+    sink._journal.flush()
+    sink._journal_offset = len(lines[1])
+    assert sink._write([(rows[1], len(lines[1]))])
+    assert os.path.getsize(sink.journal_path) == 0
+    with open(sink.checkpoint_path) as f:
+        assert f.read() == '0'
@@ -0,0 +1,119 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import db
+from app.models import Courseware, CoursewareUsage, User
+from app.routes import courseware_routes
+from app.utils.blob_store import BlobStore
+from tests.conftest import login
+
+CONTENT = b'%PDF-1.4 courseware'
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def blob_store(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / 'blobs'))
+    monkeypatch.setattr(courseware_routes, 'blob_store', store)
+    return store
+
+
+@pytest.fixture
+def operator(client):
+    user = User(username='operator', real_name='operator', email='operator@example.com', role='operator', status=True)
+    user.set_password('operator123')
+    user.save()
+    return login(client, 'operator', 'operator123')
+
+
+def _upload(client, headers, title, data=None):
+    form = {'title': title}
+    if data is None:
+        form.update(file_hash=DIGEST, file_name='lesson.pdf')
+    else:
+        form['file'] = (io.BytesIO(data), 'lesson.pdf')
+    return client.post('/api/courseware/upload', data=form, headers=headers,
+                       content_type='multipart/form-data').get_json()
+
+
+def test_instant_upload_requires_own_upload(client, auth_headers, operator):
+    assert _upload(client, auth_headers, '第一课', CONTENT)['code'] == 200
+
+    # 其他用户仅凭哈希不能引用文件，也无法探测文件是否存在
+    assert _upload(client, operator, '第二课')['code'] == 404
+    check = client.get(f'/api/courseware/upload/check?file_hash={DIGEST}&file_name=lesson.pdf',
+                       headers=operator).get_json()
+    assert check['data']['exists'] is False
+
+    # 上传者本人可以秒传
+    result = _upload(client, auth_headers, '第三课')
+    assert result['code'] == 200
+    assert result['data']['instant'] is True
+
+
+def test_release_keeps_claimed_file(blob_store):
+    blob = blob_store.save(io.BytesIO(CONTENT), '.pdf')
+    blob_store.claim(blob.path)
+
+    blob_store.release(blob.path, 0)
+    assert os.path.exists(blob.path)
+
+
+def test_release_rechecks_committed_references(blob_store):
+    blob = blob_store.save(io.BytesIO(CONTENT), '.pdf')
+    blob_store._claims.clear()
+
+    blob_store.release(blob.path, 0, recount=lambda path: 1)
+    assert os.path.exists(blob.path)
+
+    blob_store.release(blob.path, 0, recount=lambda path: 0)
+    assert not os.path.exists(blob.path)
+
+
+def test_range_requests_record_usage_once(client, auth_headers):
+    courseware_id = _upload(client, auth_headers, '第一课', CONTENT)['data']['id']
+    url = f'/api/courseware/{courseware_id}/download'
+
+    response = client.get(url, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+    # 断点续传的后续分段和缓存验证都不重复记录
+    partial = client.get(url, headers=dict(auth_headers, Range='bytes=5-'))
+    assert partial.status_code == 206
+    assert partial.data == CONTENT[5:]
+    cached = client.get(url, headers=dict(auth_headers, **{'If-None-Match': response.headers['ETag']}))
+    assert cached.status_code == 304
+
+    assert Courseware.get_by_id(courseware_id).download_count == 1
+    assert CoursewareUsage.query.filter_by(courseware_id=courseware_id, action='download').count() == 1
+
+
+def test_discard_keeps_file_claimed_by_other_upload(blob_store):
+    first = blob_store.save(io.BytesIO(CONTENT), '.pdf')
+    second = blob_store.save(io.BytesIO(CONTENT), '.pdf')
+    assert first.created and not second.created
+
+    # 第一次上传失败时，第二次上传的记录仍要引用该文件
+    blob_store.discard(first)
+    assert os.path.exists(first.path)
+
+    blob_store.discard(second)
+    blob_store.discard(first)
+    assert not os.path.exists(first.path)
+
+
+def test_failed_commit_discards_new_file(client, auth_headers, blob_store, monkeypatch):
+    def fail_commit():
+        raise RuntimeError('提交失败')
+
+    monkeypatch.setattr(db.session, 'commit', fail_commit)
+    result = _upload(client, auth_headers, '第一课', CONTENT)
+    monkeypatch.undo()
+
+    assert result['message'].startswith('数据保存失败')
+    assert not os.path.exists(blob_store.blob_path(DIGEST, '.pdf'))
+    assert Courseware.query.count() == 0
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Equipment
+from app.utils.equipment_transitions import complete_equipment_transitions
+
+
+def _restarting_equipment(started_seconds_ago):
+    equipment = Equipment(id='G1-EDU-001', location='教室', status='online')
+    equipment.save()
+    equipment.restart()
+    equipment.transition_started_at = datetime.utcnow() - timedelta(seconds=started_seconds_ago)
+    db.session.commit()
+    return equipment
+
+
+def test_edit_during_transition_does_not_postpone_completion(app):
+    equipment = _restarting_equipment(app.config['EQUIPMENT_RESTART_DURATION'] + 10)
+
+    # 过渡期间编辑设备会刷新 updated_at
+    equipment.location = '实验室'
+    db.session.commit()
+
+    assert complete_equipment_transitions() == 1
+    equipment = Equipment.get_by_id('G1-EDU-001')
+    assert equipment.status == 'online'
+    assert equipment.transition_started_at is None
+
+
+def test_recent_transition_is_not_completed(app):
+    _restarting_equipment(1)
+    Equipment.query.update({'updated_at': datetime.utcnow() - timedelta(hours=1)})
+    db.session.commit()
+
+    assert complete_equipment_transitions() == 0
+    assert Equipment.get_by_id('G1-EDU-001').status == 'restarting'
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from app import cache, heartbeat_buffer
+from app.models import Equipment
+
+
+def _equipment(status):
+    equipment = Equipment(id='G1-EDU-001', location='教室', status=status, ip_address='192.168.1.100')
+    equipment.save()
+    return equipment
+
+
+def _heartbeat(**values):
+    heartbeat_buffer.record('G1-EDU-001', dict(values, last_active=datetime.utcnow()))
+    return heartbeat_buffer.flush()
+
+
+def test_heartbeat_of_online_equipment_keeps_cache():
+    _equipment('online')
+    version = cache.version('dashboard.overview')
+
+    assert _heartbeat(usage_rate='35%') == 1
+    assert cache.version('dashboard.overview') == version
+    assert Equipment.get_by_id('G1-EDU-001').usage_rate == '35%'
+
+
+def test_status_change_invalidates_cache():
+    _equipment('offline')
+    version = cache.version('dashboard.overview')
+
+    _heartbeat()
+    assert cache.version('dashboard.overview') != version
+    assert Equipment.get_by_id('G1-EDU-001').status == 'online'
+
+
+def test_error_flag_change_invalidates_cache():
+    _equipment('online')
+    version = cache.version('dashboard.overview')
+
+    _heartbeat(has_error=True)
+    assert cache.version('dashboard.overview') != version
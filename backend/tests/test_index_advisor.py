@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.utils import index_advisor
+from app.utils.index_advisor import build_index_report, explain, get_hot_queries
+
+
+def test_report_explains_every_hot_query():
+    report = build_index_report()
+    assert [item['name'] for item in report] == sorted(get_hot_queries())
+    assert not [item for item in report if item.get('error')]
+
+
+def test_unsupported_dialect_is_reported(monkeypatch):
+    monkeypatch.setattr(db.engine.dialect, 'name', 'oracle')
+    with pytest.raises(ValueError):
+        explain(get_hot_queries()['equipment.recently_updated']())
+
+    report = build_index_report()
+    assert all('oracle' in item['error'] for item in report)
+
+
+def test_query_time_window_is_computed_per_call(monkeypatch):
+    builder = get_hot_queries()['user_sessions.expired']
+    first = builder().compile().params['expires_at_1']
+
+    class LaterDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime(2100, 1, 1)
+
+    monkeypatch.setattr(index_advisor, 'datetime', LaterDatetime)
+    assert builder().compile().params['expires_at_1'] == datetime(2100, 1, 1)
+    assert first < datetime(2100, 1, 1)
@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, job_runner
+from app.models.job import Job
+
+
+@pytest.fixture(autouse=True)
+def job_folder(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'JOB_FOLDER', str(tmp_path / 'jobs'))
+    monkeypatch.setitem(app.config, 'JOB_STALE_TIMEOUT', 300)
+    monkeypatch.setitem(app.config, 'JOB_RETENTION_DAYS', 7)
+
+
+def _create_job(status, updated_minutes=0, finished_days=None):
+    now = datetime.utcnow()
+    job = Job(job_type='test', status=status, updated_at=now - timedelta(minutes=updated_minutes))
+    if finished_days is not None:
+        job.finished_at = now - timedelta(days=finished_days)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_recover_only_marks_stale_jobs():
+    stale = _create_job('running', updated_minutes=10)
+    stale_pending = _create_job('pending', updated_minutes=10)
+    fresh = _create_job('running', updated_minutes=1)
+    done = _create_job('succeeded', updated_minutes=60, finished_days=0)
+
+    assert job_runner.recover_interrupted() == 2
+    db.session.expire_all()
+    assert db.session.get(Job, stale).status == 'failed'
+    assert db.session.get(Job, stale_pending).status == 'failed'
+    assert db.session.get(Job, fresh).status == 'running'
+    assert db.session.get(Job, done).status == 'succeeded'
+
+
+def test_recover_skips_jobs_of_this_process(monkeypatch):
+    job_id = _create_job('running', updated_minutes=10)
+    monkeypatch.setattr(job_runner, '_active', {job_id})
+
+    assert job_runner.recover_interrupted() == 0
+    assert job_runner.heartbeat() == 1
+    db.session.expire_all()
+    job = db.session.get(Job, job_id)
+    assert job.status == 'running'
+    assert job.updated_at > datetime.utcnow() - timedelta(minutes=1)
+
+
+def test_expire_finished_removes_records_and_files():
+    expired = _create_job('succeeded', finished_days=10)
+    recent = _create_job('failed', finished_days=1)
+    running = _create_job('running')
+    for job_id in (expired, recent):
+        open(os.path.join(job_runner.job_folder(job_id), 'result.xlsx'), 'w').close()
+
+    assert job_runner.expire_finished() == 1
+    assert db.session.get(Job, expired) is None
+    assert not os.path.exists(os.path.join(job_runner.app.config['JOB_FOLDER'], expired))
+    assert db.session.get(Job, recent) is not None
+    assert os.path.exists(job_runner.job_folder(recent))
+    assert db.session.get(Job, running) is not None
@@ -0,0 +1,33 @@
+from sqlalchemy.dialects import mysql
+
+from app import db
+from app.models.knowledge_base import KnowledgeBase
+
+
+def _create(title, content, tags=None):
+    item = KnowledgeBase(title=title, content=content, tags=tags, status='published')
+    db.session.add(item)
+    db.session.commit()
+    return item
+
+
+def _titles(keyword):
+    return sorted(item.title for item in KnowledgeBase.search_by_keyword(keyword))
+
+
+def test_like_fallback_requires_every_term_in_any_column():
+    _create('机器人入门', '基础编程课程')
+    _create('机器人导览', '展厅讲解')
+    _create('编程进阶', '算法')
+
+    assert _titles('机器人 编程') == ['机器人入门']
+    assert _titles('机器人') == ['机器人入门', '机器人导览']
+
+
+def test_fulltext_uses_the_same_terms(monkeypatch):
+    monkeypatch.setattr(KnowledgeBase, 'get_fulltext_token_size', classmethod(lambda cls: 2))
+
+    query, fulltext = KnowledgeBase.filter_by_keyword(KnowledgeBase.query, '机器人 "编程"')
+    sql = str(query.statement.compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True}))
+    assert fulltext
+    assert '+"机器人" +"编程"' in sql
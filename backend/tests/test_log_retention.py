@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db, job_runner
+from app.models import OperationLog
+from app.utils.jobs import JobCancelled
+from app.utils.log_retention import LogRetention, RetentionBusy, submit_retention_job, _table_locks
+
+
+class StubContext(object):
+    """在处理完指定块数后取消或中断的任务上下文"""
+
+    def __init__(self, stop_after, error=None):
+        self.stop_after = stop_after
+        self.error = error
+        self.processed = 0
+        self.success_count = 0
+        self.chunks = 0
+
+    def update(self, processed, success_count, failed_count):
+        self.processed = processed
+        self.success_count = success_count
+        self.chunks += 1
+        if self.error is not None and self.chunks >= self.stop_after:
+            raise self.error
+
+    def is_cancelled(self):
+        return self.error is None and self.chunks >= self.stop_after
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelled()
+
+
+@pytest.fixture
+def retention(app):
+    app.config['RETENTION_CHUNK_SIZE'] = 2
+    return LogRetention(app.config)
+
+
+def _create_logs(ages):
+    now = datetime.utcnow()
+    for days in ages:
+        db.session.add(OperationLog(action=f'{days}天前', created_at=now - timedelta(days=days)))
+    db.session.commit()
+
+
+def _remaining_ages():
+    return sorted(int(log.action[:-2]) for log in OperationLog.query.all())
+
+
+def test_cancelled_run_is_not_resumed(retention):
+    _create_logs([2, 3, 5, 10, 40, 100, 120])
+
+    with pytest.raises(JobCancelled):
+        retention.run(1, ('operation_logs',), StubContext(stop_after=1))
+    assert retention.load_state()['operation_logs']['status'] == 'cancelled'
+
+    # 第一块在取消前已删除，其余 90 天内的日志必须保留
+    retention.run(90, ('operation_logs',))
+    assert _remaining_ages() == [5, 10, 40]
+
+
+def test_interrupted_run_resumes_with_current_cutoff(retention):
+    _create_logs([2, 3, 5, 10, 40, 100, 120])
+
+    with pytest.raises(RuntimeError):
+        retention.run(1, ('operation_logs',), StubContext(stop_after=1, error=RuntimeError('中断')))
+    assert retention.load_state()['operation_logs']['status'] == 'running'
+
+    deleted = retention.run(90, ('operation_logs',))
+    assert _remaining_ages() == [5, 10, 40]
+    assert deleted == {'operation_logs': 2}
+    assert retention.load_state()['operation_logs']['status'] == 'completed'
+
+
+def test_interrupted_run_finishes_when_current_cutoff_is_later(retention):
+    _create_logs([2, 3, 5, 10, 40, 100, 120])
+
+    with pytest.raises(RuntimeError):
+        retention.run(90, ('operation_logs',), StubContext(stop_after=1, error=RuntimeError('中断')))
+
+    retention.run(30, ('operation_logs',))
+    assert _remaining_ages() == [2, 3, 5, 10]
+
+
+def test_table_being_purged_is_rejected(retention):
+    lock = _table_locks['operation_logs']
+    lock.acquire()
+    try:
+        with pytest.raises(RetentionBusy):
+            retention.run(90, ('operation_logs',))
+    finally:
+        lock.release()
+
+
+def test_state_of_other_tables_is_preserved(retention):
+    _create_logs([100])
+    retention.run(90, ('equipment_logs',))
+    retention.run(90, ('operation_logs',))
+    assert set(retention.load_state()) == {'operation_logs', 'equipment_logs'}
+
+
+def test_submit_returns_existing_job():
+    job = job_runner.create('logs.retention', {'days': 90})
+
+    existing, created = submit_retention_job({'days': 30})
+    assert not created
+    assert existing.id == job.id
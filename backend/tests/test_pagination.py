@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import ImmutableMultiDict
+
+from app import cache, db
+from app.models import OperationLog
+from app.utils.pagination import (
+    TOTAL_CACHE_NAMESPACE, InvalidCursor, decode_cursor, encode_cursor, paginate_logs
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_totals():
+    cache.invalidate(TOTAL_CACHE_NAMESPACE)
+
+
+@pytest.fixture
+def logs(user):
+    """5 条日志，其中第 2~4 条的 created_at 相同"""
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    times = [base, base + timedelta(minutes=1), base + timedelta(minutes=1),
+             base + timedelta(minutes=1), base + timedelta(minutes=2)]
+    for index, created_at in enumerate(times):
+        db.session.add(OperationLog(user_id=user.id, action=f"操作{index}", created_at=created_at))
+    db.session.commit()
+    return OperationLog.query.order_by(OperationLog.created_at.desc(), OperationLog.id.desc()).all()
+
+
+def paginate(**args):
+    return paginate_logs(OperationLog.query, OperationLog, ImmutableMultiDict(args), 'test_logs')
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize('cursor', ['不是游标', 'abc', encode_cursor(datetime(2024, 1, 1), 1)[:-3]])
+def test_malformed_cursor_raises_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_cursor_pages_cover_ties_on_created_at(logs):
+    seen = []
+    cursor = None
+    while True:
+        args = {'per_page': '2'}
+        if cursor:
+            args['cursor'] = cursor
+        data = paginate(**args)
+        seen.extend(log.id for log in data['items'])
+        cursor = data['next_cursor']
+        assert data['has_next'] == (cursor is not None)
+        if not cursor:
+            break
+
+    # 同一时间的记录按 id 倒序，跨页时不重复也不遗漏
+    assert seen == [log.id for log in logs]
+
+
+def test_page_mode_returns_next_cursor(logs):
+    data = paginate(page='2', per_page='2')
+    assert [log.id for log in data['items']] == [log.id for log in logs[2:4]]
+    assert data['current_page'] == 2
+    assert data['has_prev'] and data['has_next']
+
+    # 页码分页返回的游标可以接着翻页
+    data = paginate(cursor=data['next_cursor'], per_page='2')
+    assert [log.id for log in data['items']] == [logs[4].id]
+    assert data['next_cursor'] is None
+
+
+def test_total_is_counted_unless_disabled(logs):
+    data = paginate(per_page='2')
+    assert data['total'] == 5
+    assert data['pages'] == 3
+
+    data = paginate(per_page='2', total='none')
+    assert 'total' not in data and 'pages' not in data
+
+
+def test_invalid_cursor_returns_400(client, auth_headers):
+    response = client.get('/api/logs/operations?cursor=abc', headers=auth_headers)
+    assert response.get_json()['code'] == 400
@@ -0,0 +1,69 @@
+import pytest
+
+from app import query_profiler
+from app.models import User
+from tests.conftest import login
+
+PROFILE = {'X-Query-Profile': '1'}
+
+
+@pytest.fixture(autouse=True)
+def profiler_config(app):
+    app.config['PROFILER_ALLOW_HEADER'] = True
+    yield
+    app.config['PROFILER_ALLOW_HEADER'] = False
+    app.config['PROFILER_SAMPLE_RATE'] = 0.0
+    query_profiler.reset()
+
+
+def _login_request(client, headers):
+    return client.post('/api/auth/login', json={'username': 'nobody', 'password': 'x'}, headers=headers)
+
+
+def test_header_ignored_for_anonymous_client(client):
+    response = _login_request(client, PROFILE)
+    assert 'X-Query-Count' not in response.headers
+
+
+def test_header_ignored_for_non_admin(client):
+    viewer = User(username='viewer', real_name='viewer', email='viewer@example.com', role='viewer', status=True)
+    viewer.set_password('viewer123')
+    viewer.save()
+    headers = dict(login(client, 'viewer', 'viewer123'), **PROFILE)
+
+    response = client.get('/api/dashboard/realtime', headers=headers)
+    assert 'X-Query-Count' not in response.headers
+
+
+def test_header_honoured_for_admin(client, auth_headers):
+    response = client.get('/api/dashboard/realtime', headers=dict(auth_headers, **PROFILE))
+    assert int(response.headers['X-Query-Count']) > 0
+    assert 'Server-Timing' in response.headers
+
+
+def test_header_disabled_by_default(app, client, auth_headers):
+    app.config['PROFILER_ALLOW_HEADER'] = False
+    response = client.get('/api/dashboard/realtime', headers=dict(auth_headers, **PROFILE))
+    assert 'X-Query-Count' not in response.headers
+
+
+def test_sampled_requests_are_recorded_without_headers(app, client):
+    app.config['PROFILER_SAMPLE_RATE'] = 1.0
+    response = _login_request(client, {})
+    assert 'X-Query-Count' not in response.headers
+    assert [route['route'] for route in query_profiler.get_routes()] == ['POST /api/auth/login']
+
+
+def test_header_requires_admin_in_debug_mode(app, client):
+    app.debug = True
+    try:
+        response = _login_request(client, PROFILE)
+    finally:
+        app.debug = False
+    assert 'X-Query-Count' not in response.headers
+
+
+def test_query_time_is_recorded_per_execution(client, auth_headers):
+    response = client.get('/api/dashboard/realtime', headers=dict(auth_headers, **PROFILE))
+    assert int(response.headers['X-Query-Count']) > 0
+    assert float(response.headers['X-Query-Time']) > 0
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from app import db
+from app.models import DashboardStatistics, OperationLog
+from app.utils.statistics_aggregator import aggregate_statistics
+
+
+def _current_hour_operations():
+    now = datetime.utcnow()
+    row = DashboardStatistics.query.filter_by(statistic_date=now.date(), statistic_hour=now.hour).first()
+    return row.total_operations
+
+
+def test_late_commit_below_watermark_is_counted():
+    db.session.add(OperationLog(id=100, action='先提交'))
+    db.session.commit()
+    aggregate_statistics(snapshot=False)
+    assert _current_hour_operations() == 1
+
+    # 较早分配ID、在水位线推进后才提交的记录
+    db.session.add(OperationLog(id=50, action='后提交'))
+    db.session.commit()
+    aggregate_statistics(snapshot=False)
+    assert _current_hour_operations() == 2
@@ -0,0 +1,113 @@
+import pytest
+from flask import Blueprint, Flask, abort, jsonify, request
+
+from app import db
+from app.models import CoursewareCategory
+from app.models.result import Result
+from app.utils.unit_of_work import after_commit, enable_unit_of_work, rollback_savepoint, savepoint
+
+
+@pytest.fixture
+def uow_app():
+    """只注册一个启用工作单元的测试蓝图的应用"""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', TESTING=True)
+    db.init_app(app)
+    app.callbacks = []
+
+    bp = Blueprint('uow', __name__)
+
+    @bp.route('/categories', methods=['POST'])
+    def create_category():
+        data = request.get_json()
+        CoursewareCategory(name=data['name']).save()
+        after_commit(lambda: app.callbacks.append(data['name']))
+        outcome = data.get('outcome')
+        if outcome == 'error':
+            return jsonify(Result.error(message="业务校验失败", code=400).to_dict())
+        if outcome == 'http_error':
+            abort(500)
+        if outcome == 'exception':
+            raise RuntimeError('处理失败')
+        if outcome == 'conflict':
+            # 与已有分类主键冲突，提交时才报错
+            db.session.add(CoursewareCategory(id=1, name='重复'))
+        return jsonify(Result.success(message="创建成功").to_dict())
+
+    @savepoint()
+    def create_item(name):
+        try:
+            CoursewareCategory(name=name).save()
+            if name == '失败':
+                # 主键冲突，只回滚本项
+                db.session.add(CoursewareCategory(id=1, name='重复'))
+                db.session.flush()
+            return True
+        except Exception:
+            rollback_savepoint()
+            return False
+
+    @bp.route('/categories/batch', methods=['POST'])
+    def create_categories():
+        results = [create_item(name) for name in request.get_json()['names']]
+        return jsonify(Result.success(data=results).to_dict())
+
+    app.register_blueprint(enable_unit_of_work(bp))
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _category_names(app):
+    with app.app_context():
+        return [category.name for category in CoursewareCategory.query.order_by(CoursewareCategory.id)]
+
+
+def test_success_commits_and_runs_callbacks(uow_app):
+    response = uow_app.test_client().post('/categories', json={'name': '机器人'})
+
+    assert response.get_json()['code'] == 200
+    assert _category_names(uow_app) == ['机器人']
+    assert uow_app.callbacks == ['机器人']
+
+
+def test_result_error_rolls_back(uow_app):
+    response = uow_app.test_client().post('/categories', json={'name': '机器人', 'outcome': 'error'})
+
+    assert response.get_json()['code'] == 400
+    assert _category_names(uow_app) == []
+    assert uow_app.callbacks == []
+
+
+@pytest.mark.parametrize('outcome', ['http_error', 'exception'])
+def test_failed_request_rolls_back(uow_app, outcome):
+    uow_app.config['PROPAGATE_EXCEPTIONS'] = False
+    response = uow_app.test_client().post('/categories', json={'name': '机器人', 'outcome': outcome})
+
+    assert response.status_code == 500
+    assert _category_names(uow_app) == []
+    assert uow_app.callbacks == []
+
+
+def test_commit_failure_returns_error_and_skips_callbacks(uow_app):
+    client = uow_app.test_client()
+    client.post('/categories', json={'name': '机器人'})
+    uow_app.callbacks.clear()
+
+    response = client.post('/categories', json={'name': '编程', 'outcome': 'conflict'})
+
+    payload = response.get_json()
+    assert payload['code'] == 500
+    assert payload['message'].startswith('数据保存失败')
+    assert _category_names(uow_app) == ['机器人']
+    assert uow_app.callbacks == []
+
+
+def test_savepoint_rolls_back_only_failed_item(uow_app):
+    response = uow_app.test_client().post('/categories/batch', json={'names': ['机器人', '失败', '编程']})
+
+    assert response.get_json()['data'] == [True, False, True]
+    assert _category_names(uow_app) == ['机器人', '编程']